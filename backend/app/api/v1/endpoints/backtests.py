@@ -1,7 +1,8 @@
 # backend/app/api/v1/endpoints/backtests.py
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Body
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from sqlalchemy.orm import Session
 
 from app.api import deps
@@ -11,15 +12,41 @@ from app.schemas.backtest import (
     BacktestRequest,
     BacktestResultInDB,
     BacktestResultCreate,
+    OptimizationMethod,
+    OptimizationMode,
     OptimizationParameter,
     OptimizationRequest,
     BacktestRunResponse,
     BacktestResultInfo,
+    DownsampleMethod,
 )
+from app.core.config import RESULT_CACHE_ENABLED
+from app.services import downsample, result_cache, walk_forward
 from app.tasks import run_backtest_task, run_optimization_task
 
 router = APIRouter()
 
+
+def _find_cached_backtest(db: Session, strategy, backtest_in: BacktestRequest):
+    try:
+        with open(strategy.script_path, 'r', encoding='utf-8') as f:
+            strategy_code = f.read()
+    except (FileNotFoundError, TypeError):
+        return None
+    fingerprint = result_cache.fingerprint(
+        strategy.id, strategy_code, backtest_in.symbol, backtest_in.duration, backtest_in.start_dt,
+        backtest_in.end_dt, backtest_in.commission_rate, backtest_in.slippage,
+    )
+    return crud_backtest.get_backtest_by_fingerprint(db, fingerprint) if fingerprint else None
+
+
+def _backtest_report(db_result) -> BacktestResultInDB:
+    # 压缩存储的权益曲线和成交只在返回报告时解码
+    report = BacktestResultInDB.model_validate(db_result)
+    report.daily_pnl = crud_backtest.get_daily_pnl(db_result)
+    return report
+
+
 @router.post("/run/{strategy_id}", response_model=BacktestRunResponse)
 def run_backtest(
     strategy_id: int,
@@ -34,6 +61,12 @@ def run_backtest(
     if not strategy or strategy.owner != current_user["username"]:
         raise HTTPException(status_code=403, detail="Not enough permissions for this strategy")
 
+    # 相同输入（含策略源码）已有成功结果时直接返回，不再走一遍 Celery 流程
+    if RESULT_CACHE_ENABLED and not backtest_in.bypass_cache:
+        cached = _find_cached_backtest(db, strategy, backtest_in)
+        if cached is not None:
+            return {"task_id": None, "backtest_id": cached.id, "status": cached.status, "cached": True}
+
     backtest_create = BacktestResultCreate(
         strategy_id=strategy_id,
         symbol=backtest_in.symbol,
@@ -71,6 +104,16 @@ def run_optimization(
     if not strategy or strategy.owner != current_user["username"]:
         raise HTTPException(status_code=403, detail="Not enough permissions for this strategy")
 
+    if optim_request.mode == OptimizationMode.tasks and optim_request.method != OptimizationMethod.grid:
+        raise HTTPException(status_code=400, detail="Adaptive optimization methods cannot run in mode 'tasks'")
+    if optim_request.mode == OptimizationMode.walk_forward:
+        try:
+            walk_forward.make_folds(optim_request.start_dt.date(), optim_request.end_dt.date(),
+                                    optim_request.walk_forward.in_sample_days,
+                                    optim_request.walk_forward.out_of_sample_days)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     optimization_id = str(uuid.uuid4())
 
     # 【修正】: 将 datetime 对象转换为 ISO 格式的字符串，确保可序列化
@@ -87,7 +130,12 @@ def run_optimization(
         strategy_id=strategy_id,
         backtest_params=serializable_backtest_params,
         optimization_params=[p.model_dump() for p in optim_request.optim_params],
-        optimization_id=optimization_id
+        optimization_id=optimization_id,
+        mode=optim_request.mode.value,
+        method=optim_request.method.value,
+        budget=optim_request.budget,
+        seed=optim_request.seed,
+        walk_forward_params=optim_request.walk_forward.model_dump(),
     )
 
     return {"message": "Optimization task has been dispatched.", "optimization_id": optimization_id}
@@ -114,9 +162,17 @@ def get_backtest_history_for_strategy(
 @router.get("/{backtest_id}", response_model=BacktestResultInDB)
 def get_backtest_report(
     backtest_id: int,
+    resolution: Optional[int] = Query(None, ge=3),
+    method: DownsampleMethod = DownsampleMethod.lttb,
+    start_dt: Optional[datetime] = None,
+    end_dt: Optional[datetime] = None,
     db: Session = Depends(deps.get_db),
     current_user: dict = Depends(deps.get_current_user),
 ):
+    """
+    Get a backtest report. With resolution and/or a start_dt..end_dt window, the equity curve is
+    cut to the window and downsampled to about `resolution` points; without them the full series is returned.
+    """
     db_result = crud_backtest.get_backtest_result(db, backtest_id=backtest_id)
     if not db_result:
         raise HTTPException(status_code=404, detail="Backtest result not found")
@@ -125,7 +181,15 @@ def get_backtest_report(
     if not db_strategy or db_strategy.owner != current_user["username"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    return db_result
+    if resolution is None and start_dt is None and end_dt is None:
+        return _backtest_report(db_result)
+
+    report = BacktestResultInDB.model_validate(db_result)
+    report.daily_pnl = downsample.cached_equity_view(
+        db_result.id, db_result.status == "SUCCESS", lambda: crud_backtest.get_series_columns(db_result),
+        resolution, method.value, start_dt, end_dt,
+    )
+    return report
 
 @router.get("/optimization/{optimization_id}", response_model=List[BacktestResultInDB])
 def get_optimization_results(
@@ -146,4 +210,4 @@ def get_optimization_results(
     if not strategy or strategy.owner != current_user["username"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    return results
\ No newline at end of file
+    return [_backtest_report(result) for result in results]
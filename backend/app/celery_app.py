@@ -1,6 +1,7 @@
 # backend/app/celery_app.py
 from celery import Celery
-from app.core.config import CELERY_BROKER_URL, CELERY_RESULT_BACKEND
+from celery.schedules import crontab
+from app.core.config import CELERY_BROKER_URL, CELERY_RESULT_BACKEND, PREFETCH_HOUR, PREFETCH_MINUTE
 
 # 创建 Celery 实例
 celery_app = Celery(
@@ -16,4 +17,12 @@ celery_app.conf.update(
     task_serializer='json',
     result_serializer='json',
     accept_content=['json'],
+    timezone='Asia/Shanghai',
+    # 开盘前（夜盘结束后）把活跃策略和近期回测用到的K线补齐到本地存储
+    beat_schedule={
+        "prefetch-klines": {
+            "task": "app.tasks.prefetch_klines_task",
+            "schedule": crontab(hour=PREFETCH_HOUR, minute=PREFETCH_MINUTE, day_of_week="mon-fri"),
+        },
+    },
 )
\ No newline at end of file
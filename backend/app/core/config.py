@@ -29,3 +29,69 @@ TQ_PASSWORD = os.getenv("TQ_PASSWORD")
 # Celery and Redis Settings
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+
+# K线数据源: tq（通过 data_fetcher 子进程访问天勤）或 synthetic（确定性合成数据，离线测试和基准测试用），
+# 以及合成数据的随机种子
+DATA_PROVIDER = os.getenv("DATA_PROVIDER", "tq")
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+
+# 本地K线存储目录（Parquet，按 合约/周期/月份 分区），设为空字符串可关闭。
+# 默认放在 backend/kline_data，docker 中设为挂载的 /kline_data
+KLINE_STORE_DIR = os.getenv("KLINE_STORE_DIR", str(Path(__file__).resolve().parents[2] / "kline_data"))
+
+# 常驻K线获取服务的 Unix socket 路径，为空时每次获取都启动 data_fetcher 子进程
+FETCHER_SOCKET = os.getenv("FETCHER_SOCKET", "")
+
+# data_fetcher 与 DataService 之间的传输格式: binary（列式二进制）或 json（兜底）
+FETCHER_WIRE_FORMAT = os.getenv("FETCHER_WIRE_FORMAT", "binary")
+
+# 每个 worker 进程内K线 LRU 缓存的字节上限（0 表示关闭），以及包含当天数据的缓存有效期（秒）
+KLINE_CACHE_MAX_BYTES = int(os.getenv("KLINE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+KLINE_CACHE_LIVE_TTL = float(os.getenv("KLINE_CACHE_LIVE_TTL", "60"))
+
+# 5m/15m/1h/1d 是否由本地 1m K线合成（只下载 1m，切换周期不再访问网络）
+RESAMPLE_FROM_1M = os.getenv("RESAMPLE_FROM_1M", "false").lower() == "true"
+
+# 收盘后预热K线（Celery beat，北京时间）：执行时间、合约数与字节数预算，
+# 近期回测的统计窗口（天），以及只出现在策略中的合约预热多少天的 1m 数据
+PREFETCH_HOUR = int(os.getenv("PREFETCH_HOUR", "7"))
+PREFETCH_MINUTE = int(os.getenv("PREFETCH_MINUTE", "30"))
+PREFETCH_MAX_SYMBOLS = int(os.getenv("PREFETCH_MAX_SYMBOLS", "20"))
+PREFETCH_MAX_BYTES = int(os.getenv("PREFETCH_MAX_BYTES", str(1024 * 1024 * 1024)))
+PREFETCH_RECENT_DAYS = int(os.getenv("PREFETCH_RECENT_DAYS", "14"))
+PREFETCH_HISTORY_DAYS = int(os.getenv("PREFETCH_HISTORY_DAYS", "30"))
+
+# 同一节点的 worker 进程通过共享内存共用历史K线，索引文件所在目录，节点上共享内存段的总字节上限
+# （超出时按最近使用淘汰，应明显小于 /dev/shm 的大小），以及没有进程使用的段保留多久（秒）后 unlink
+SHARED_KLINES_ENABLED = os.getenv("SHARED_KLINES_ENABLED", "false").lower() == "true"
+SHARED_KLINES_STATE_DIR = os.getenv("SHARED_KLINES_STATE_DIR", "/tmp/quant_trade_shm")
+SHARED_KLINES_MAX_BYTES = int(os.getenv("SHARED_KLINES_MAX_BYTES", str(1024 * 1024 * 1024)))
+SHARED_KLINES_IDLE_SECONDS = float(os.getenv("SHARED_KLINES_IDLE_SECONDS", "3600"))
+
+# 扫描模式参数优化使用的本地进程数，0 表示使用全部 CPU
+SWEEP_PROCESSES = int(os.getenv("SWEEP_PROCESSES", "0"))
+
+# 相同输入（策略源码、合约、周期、日期、手续费、滑点、参数）的回测直接返回已有结果
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+
+# 每个 worker 进程内按源码哈希缓存的已编译策略条数（0 表示关闭）
+STRATEGY_CACHE_SIZE = int(os.getenv("STRATEGY_CACHE_SIZE", "64"))
+
+# 随机采样、TPE、逐次减半等参数优化方法未指定预算时的默认评估次数
+OPTIMIZATION_BUDGET = int(os.getenv("OPTIMIZATION_BUDGET", "50"))
+
+# 回测权益曲线和成交列表的存储格式: binary（压缩列式二进制，存入 backtest_series 表）或 json（旧格式，写入 daily_pnl 列）
+SERIES_STORAGE = os.getenv("SERIES_STORAGE", "binary")
+
+# API 进程内缓存的降采样权益曲线条数（按 回测、分辨率、方法、时间窗口），0 表示关闭
+DOWNSAMPLE_CACHE_SIZE = int(os.getenv("DOWNSAMPLE_CACHE_SIZE", "128"))
+
+# 回测报告中随权益曲线返回的滚动夏普比率的窗口（bar 数）
+ROLLING_SHARPE_WINDOW = int(os.getenv("ROLLING_SHARPE_WINDOW", "60"))
+
+# 运行中回测的进度推送：通道 redis（worker 与 API 进程之间，默认使用 Celery broker 的 Redis）、
+# memory（进程内，测试用）或 none（关闭），pub/sub 频道名，以及同一回测两次进度事件的最小间隔（秒）
+PROGRESS_BACKEND = os.getenv("PROGRESS_BACKEND", "redis")
+PROGRESS_REDIS_URL = os.getenv("PROGRESS_REDIS_URL", CELERY_BROKER_URL)
+PROGRESS_CHANNEL = os.getenv("PROGRESS_CHANNEL", "backtest_progress")
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "0.5"))
@@ -1,8 +1,12 @@
 # backend/app/crud/crud_backtest.py
-from sqlalchemy.orm import Session
-from app.models.backtest import BacktestResult
+import numpy as np
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session, selectinload
+from app.models.backtest import BacktestFingerprint, BacktestResult, BacktestSeries
 from app.schemas.backtest import BacktestResultCreate, BacktestResultUpdate
-from typing import Any, Dict, Union, List
+from typing import Any, Dict, Optional, Union, List
+from datetime import datetime
+from app.services import series_codec
 
 def create_backtest_result(db: Session, *, obj_in: BacktestResultCreate) -> BacktestResult:
     db_obj = BacktestResult(
@@ -21,6 +25,39 @@ def create_backtest_result(db: Session, *, obj_in: BacktestResultCreate) -> Back
     db.refresh(db_obj)
     return db_obj
 
+def create_backtest_results(db: Session, *, objs_in: List[BacktestResultCreate]) -> List[int]:
+    """
+    Inserts many backtest results in one INSERT ... RETURNING statement and a single commit.
+    Returns the new IDs in the same order as objs_in.
+    """
+    if not objs_in:
+        return []
+    rows = [obj_in.model_dump() for obj_in in objs_in]
+    ids = db.scalars(
+        insert(BacktestResult).returning(BacktestResult.id, sort_by_parameter_order=True),
+        rows,
+    ).all()
+    db.commit()
+    return list(ids)
+
+def update_backtest_results(db: Session, updates: List[Dict[str, Any]]) -> None:
+    """
+    Applies many per-row updates (each a dict with the row 'id' and the fields to set,
+    e.g. status, summary, daily_pnl) as one executemany UPDATE and a single commit.
+    An optional 'series' entry (a series_codec payload) is stored in backtest_series in the same commit.
+    """
+    if not updates:
+        return
+    series = [
+        {"backtest_id": row["id"], "payload": row["series"]}
+        for row in updates if row.get("series") is not None
+    ]
+    db.execute(update(BacktestResult), [{k: v for k, v in row.items() if k != "series"} for row in updates])
+    if series:
+        db.execute(delete(BacktestSeries).where(BacktestSeries.backtest_id.in_([row["backtest_id"] for row in series])))
+        db.execute(insert(BacktestSeries), series)
+    db.commit()
+
 def update_backtest_result(db: Session, *, db_obj: BacktestResult, obj_in: Union[BacktestResultUpdate, Dict[str, Any]]) -> BacktestResult:
     if isinstance(obj_in, dict):
         update_data = obj_in
@@ -55,8 +92,60 @@ def get_backtest_results_by_strategy(db: Session, strategy_id: int, skip: int =
         })
     return response_data
 
+def get_recent_backtest_results(db: Session, since: datetime) -> List[BacktestResult]:
+    """
+    Fetches backtest results created since the given time, newest first.
+    """
+    return db.query(BacktestResult).filter(BacktestResult.created_at >= since).order_by(BacktestResult.created_at.desc()).all()
+
 def get_backtest_results_by_optimization_id(db: Session, optimization_id: str) -> List[BacktestResult]:
     """
     Fetches all backtest results associated with a specific optimization ID.
     """
-    return db.query(BacktestResult).filter(BacktestResult.optimization_id == optimization_id).order_by(BacktestResult.created_at.asc()).all()
+    return (
+        db.query(BacktestResult)
+        .options(selectinload(BacktestResult.series))
+        .filter(BacktestResult.optimization_id == optimization_id)
+        .order_by(BacktestResult.created_at.asc())
+        .all()
+    )
+
+def get_daily_pnl(db_obj: BacktestResult) -> Optional[Dict[str, Any]]:
+    """
+    Returns the equity curve and trades of a result in the daily_pnl JSON shape: the legacy JSON column
+    when set, otherwise decoded from backtest_series (loaded on first access).
+    """
+    if db_obj.daily_pnl is not None:
+        return db_obj.daily_pnl
+    if db_obj.series is None:
+        return None
+    return series_codec.to_records(db_obj.series.payload)
+
+def get_series_columns(db_obj: BacktestResult) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Returns the equity curve and trades of a result as arrays (see series_codec.decode),
+    from backtest_series or converted from the legacy JSON column.
+    """
+    if db_obj.series is not None:
+        return series_codec.decode(db_obj.series.payload)
+    if db_obj.daily_pnl is not None:
+        return series_codec.from_records(db_obj.daily_pnl)
+    return None
+
+def get_backtest_by_fingerprint(db: Session, fingerprint: str) -> Optional[BacktestResult]:
+    """
+    Fetches the successful backtest recorded under an input fingerprint, if any.
+    """
+    return (
+        db.query(BacktestResult)
+        .join(BacktestFingerprint, BacktestFingerprint.backtest_id == BacktestResult.id)
+        .filter(BacktestFingerprint.fingerprint == fingerprint, BacktestResult.status == "SUCCESS")
+        .first()
+    )
+
+def save_backtest_fingerprint(db: Session, fingerprint: str, backtest_id: int) -> None:
+    """
+    Points an input fingerprint at a successful backtest, replacing any older result for the same inputs.
+    """
+    db.merge(BacktestFingerprint(fingerprint=fingerprint, backtest_id=backtest_id))
+    db.commit()
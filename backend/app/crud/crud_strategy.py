@@ -2,6 +2,7 @@
 from sqlalchemy.orm import Session, joinedload
 from app.models.strategy import Strategy
 from app.schemas.strategy import StrategyCreate, StrategyUpdate
+from app.services.strategy_base import strategy_cache
 import uuid
 from pathlib import Path
 
@@ -18,12 +19,33 @@ class Strategy(BaseStrategy):
     def initialize(self):
         self.symbol = "SHFE.rb2501"  # 交易的合约
 
+    @property
+    def lookback(self):
+        # handle_data 需要 long_window + 1 根K线才能比较前一根的均线位置
+        return self.long_window + 1
+
+    def generate_signals(self, data: pd.DataFrame):
+        '''
+        向量化版本：一次性计算整段数据的信号，回测器会优先使用它。
+        返回与 data 对齐的信号序列：1 买入，-1 卖出，0 无操作。
+        '''
+        # 通过回测上下文的指标库计算均线：参数优化时同一窗口的均线只计算一次
+        short_mavg = self.context.indicators.sma(self.short_window)
+        long_mavg = self.context.indicators.sma(self.long_window)
+        prev_short = short_mavg.shift(1)
+        prev_long = long_mavg.shift(1)
+
+        signals = pd.Series(0, index=data.index, dtype='int8')
+        signals[(short_mavg > long_mavg) & (prev_short < prev_long)] = 1
+        signals[(short_mavg < long_mavg) & (prev_short > prev_long)] = -1
+        return signals
+
     def handle_data(self, data: pd.DataFrame):
         '''
         Args:
             data: 一个包含最新K线数据的 pandas DataFrame。
-                  在我们的回测器中，它包含所有历��数据。
-                  在实盘中，它可能只包含最近的N条数据。
+                  回测和实盘中都只包含最近 lookback 根K线。
+                  datetime 列为 UTC epoch 纳秒（int64）。
         '''
         # --- 信号生成 ---
         signals = []
@@ -35,9 +57,9 @@ class Strategy(BaseStrategy):
         # 创建信号：当短期均线上穿长期均线时为1，下穿时为-1
         # .iloc[-1] 获取最新值
         if short_mavg.iloc[-1] > long_mavg.iloc[-1] and short_mavg.iloc[-2] < long_mavg.iloc[-2]:
-            return [{'date': data['trade_date'].iloc[-1], 'signal': 'buy'}]
+            return [{'datetime': data['datetime'].iloc[-1], 'signal': 'buy'}]
         elif short_mavg.iloc[-1] < long_mavg.iloc[-1] and short_mavg.iloc[-2] > long_mavg.iloc[-2]:
-            return [{'date': data['trade_date'].iloc[-1], 'signal': 'sell'}]
+            return [{'datetime': data['datetime'].iloc[-1], 'signal': 'sell'}]
         
         return []
 """
@@ -53,6 +75,14 @@ STRATEGY_TEMPLATES = {
 STRATEGIES_DIR = Path("/strategies_code")
 STRATEGIES_DIR.mkdir(exist_ok=True) # Ensure the directory exists
 
+def _invalidate_compiled(script_path: str):
+    """Drop the old source from this process's compile cache before the script is rewritten or removed."""
+    try:
+        with open(script_path, "r", encoding="utf-8") as f:
+            strategy_cache.invalidate(f.read())
+    except (FileNotFoundError, TypeError):
+        pass
+
 def get_strategy(db: Session, strategy_id: int):
     return db.query(Strategy).options(joinedload(Strategy.backtest_results)).filter(Strategy.id == strategy_id).first()
 
@@ -115,6 +145,7 @@ def update_strategy(db: Session, strategy_id: int, strategy_in: StrategyUpdate):
         try:
             # Ensure script_path exists and is valid before writing
             if db_strategy.script_path:
+                _invalidate_compiled(db_strategy.script_path)
                 with open(db_strategy.script_path, "w", encoding="utf-8") as f:
                     f.write(script_content)
         except (FileNotFoundError, TypeError):
@@ -136,6 +167,7 @@ def delete_strategy(db: Session, strategy_id: int):
         return None
     
     try:
+        _invalidate_compiled(db_strategy.script_path)
         Path(db_strategy.script_path).unlink(missing_ok=True)
     except TypeError:
         pass
@@ -1,5 +1,7 @@
 # backend/app/main.py
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -12,6 +14,8 @@ from app.db.base import init_db
 from app.db.session import SessionLocal
 import app.crud.crud_strategy as crud
 from app.schemas.strategy import StrategyCreate
+from app.services import progress
+from app.services.websocket_manager import manager
 
 # 在应用启动时创建数据库表
 init_db()
@@ -26,41 +30,7 @@ async def lifespan(app: FastAPI):
     # 1. 定义演示策略的详细信息
     demo_strategy_name = "MA Crossover Strategy"
     demo_strategy_description = "A simple moving average crossover strategy compatible with the backtester."
-    demo_strategy_script = """import pandas as pd
-from app.services.strategy_base import BaseStrategy
-
-class Strategy(BaseStrategy):
-    def set_parameters(self):
-        # 在这里声明所有可优化的参数及其默认值
-        self.short_window = 20
-        self.long_window = 50
-
-    def initialize(self):
-        self.symbol = "SHFE.rb2501"  # 交易的合约
-
-    def handle_data(self, data: pd.DataFrame):
-        '''
-        Args:
-            data: 一个包含最新K线数据的 pandas DataFrame。
-                  在我们的回测器中，它包含所有历史数据。
-                  在实盘中，它可能只包含最近的N条数据。
-        '''
-        # --- 信号生成 ---
-        signals = []
-        
-        # 计算移动平均线
-        short_mavg = data['close'].rolling(window=self.short_window).mean()
-        long_mavg = data['close'].rolling(window=self.long_window).mean()
-
-        # 创建信号：当短期均线上穿长期均线时为1，下穿时为-1
-        # .iloc[-1] 获取最新值
-        if short_mavg.iloc[-1] > long_mavg.iloc[-1] and short_mavg.iloc[-2] < long_mavg.iloc[-2]:
-            return [{'date': data['trade_date'].iloc[-1], 'signal': 'buy'}]
-        elif short_mavg.iloc[-1] < long_mavg.iloc[-1] and short_mavg.iloc[-2] > long_mavg.iloc[-2]:
-            return [{'date': data['trade_date'].iloc[-1], 'signal': 'sell'}]
-        
-        return []
-"""
+    demo_strategy_script = crud.MA_CROSSOVER_TEMPLATE
     # 2. 检查并创建策略
     db_strategy = crud.get_strategy_by_name(db, name=demo_strategy_name)
     
@@ -89,12 +59,18 @@ class Strategy(BaseStrategy):
             print("Strategy exists in DB but has no script path. This is an inconsistent state.")
 
     db.close()
+
+    # 3. 把 worker 发布的回测进度转发给 websocket 客户端
+    forwarder = None
+    if progress.channel is not None:
+        forwarder = asyncio.create_task(progress.forward(progress.channel, manager.broadcast))
     print("--- Startup logic finished ---")
 
     yield
 
-    # --- 这是应用关闭时执行的逻辑 (如果需要的话) ---
-    # print("--- Running shutdown logic ---")
+    # --- 这是应用关闭时执行的逻辑 ---
+    if forwarder is not None:
+        forwarder.cancel()
 
 
 # 将 lifespan 管理器注册到 FastAPI 应用
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Enum, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Enum, Float, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -28,7 +28,27 @@ class BacktestResult(Base):
     status = Column(String, nullable=False, default='PENDING')
     
     # Store performance summary and daily PNL data
+    # (daily_pnl is the legacy JSON format; new results keep their series in backtest_series)
     summary = Column(JSON, nullable=True)
     daily_pnl = Column(JSON, nullable=True)
 
     strategy = relationship("Strategy", back_populates="backtest_results")
+    # 只在读取报告时才加载（lazy="select"），列表、历史等查询不会取出序列数据
+    series = relationship("BacktestSeries", uselist=False, lazy="select", passive_deletes=True)
+
+
+class BacktestFingerprint(Base):
+    # 回测全部输入的内容哈希 -> 已成功完成的回测结果，相同输入的回测直接复用该结果
+    __tablename__ = "backtest_fingerprints"
+
+    fingerprint = Column(String(64), primary_key=True)
+    backtest_id = Column(Integer, ForeignKey("backtest_results.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class BacktestSeries(Base):
+    # 回测的逐 bar 权益曲线和成交列表，按 series_codec 格式压缩存储
+    __tablename__ = "backtest_series"
+
+    backtest_id = Column(Integer, ForeignKey("backtest_results.id", ondelete="CASCADE"), primary_key=True)
+    payload = Column(LargeBinary, nullable=False)
@@ -35,9 +35,34 @@ class BacktestRequest(BaseModel):
     end_dt: datetime
     commission_rate: float = 0.0003
     slippage: float = 0.0
+    bypass_cache: bool = False  # 单次回测：忽略结果缓存，强制重新运行
+
+class OptimizationMode(str, Enum):
+    sweep = "sweep"  # 一个任务内加载一次数据，各组参数在本地进程池中并行求值
+    tasks = "tasks"  # 每组参数分发一个独立的回测任务
+    walk_forward = "walk_forward"  # 步进优化：滚动的样本内优化 + 样本外评估，各折在本地进程池中并行
+
+class OptimizationMethod(str, Enum):
+    grid = "grid"        # 穷举全部参数组合
+    random = "random"    # 随机采样 budget 组参数
+    tpe = "tpe"          # TPE 序贯搜索，按已有结果选择下一批参数
+    halving = "halving"  # 逐次减半：在逐步增长的日期窗口上淘汰较差的参数
+
+class WalkForwardParams(BaseModel):
+    in_sample_days: int = Field(180, ge=1)  # 每折样本内（优化）的自然日数
+    out_of_sample_days: int = Field(30, ge=1)  # 每折样本外（评估）的自然日数，也是各折的滚动步长
 
 class OptimizationRequest(BacktestRequest):
     optim_params: List[OptimizationParameter]
+    mode: OptimizationMode = OptimizationMode.sweep
+    method: OptimizationMethod = OptimizationMethod.grid
+    budget: Optional[int] = Field(None, ge=1)  # 评估次数预算，非网格方法使用；为空时取默认值
+    seed: Optional[int] = None  # 随机种子，便于复现
+    walk_forward: WalkForwardParams = Field(default_factory=WalkForwardParams)  # 仅 walk_forward 模式使用
+
+class DownsampleMethod(str, Enum):
+    lttb = "lttb"      # Largest-Triangle-Three-Buckets，保持曲线的视觉形状
+    minmax = "minmax"  # 每个桶保留最低点和最高点，保证极值（回撤）不丢失
 
 # Shared properties
 class BacktestResultBase(BaseModel):
@@ -97,4 +122,6 @@ class BacktestResultInfo(BaseModel):
 
 class BacktestRunResponse(BaseModel):
     task_id: Optional[str] = None
-    backtest_id: int
\ No newline at end of file
+    backtest_id: int
+    status: Optional[str] = None
+    cached: bool = False  # 命中结果缓存时直接返回已完成的回测，不再分发任务
\ No newline at end of file
@@ -0,0 +1,177 @@
+# backend/app/services/analytics.py
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _as_matrix(equity: np.ndarray) -> np.ndarray:
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.ndim == 1:
+        return equity[np.newaxis, :]
+    if equity.ndim != 2:
+        raise ValueError("equity must be a 1-D curve or a 2-D matrix of curves (runs x bars).")
+    return equity
+
+
+def _unwrap(metrics: Dict[str, np.ndarray], single: bool) -> Dict[str, Any]:
+    if not single:
+        return metrics
+    return {key: value[0].item() for key, value in metrics.items()}
+
+
+def _returns(equity: np.ndarray) -> np.ndarray:
+    """逐 bar 收益率，第一根 bar 记为 0（与 pct_change().fillna(0) 一致）。"""
+    returns = np.zeros_like(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:, 1:] = equity[:, 1:] / equity[:, :-1] - 1
+    return returns
+
+
+def _masked_std(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """按行计算 mask 内元素的样本标准差 (ddof=1)，元素不足两个时为 NaN。"""
+    count = mask.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(mask, values, 0.0).sum(axis=1) / count
+        deviation = np.where(mask, values - mean[:, np.newaxis], 0.0)
+        variance = (deviation ** 2).sum(axis=1) / (count - 1)
+    return np.where(count > 1, np.sqrt(variance), np.nan)
+
+
+def _safe_ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    valid = (denominator != 0) & ~np.isnan(denominator)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(valid, numerator / np.where(valid, denominator, 1.0), 0.0)
+
+
+def equity_metrics(equity: np.ndarray, days: float, initial_equity: Optional[np.ndarray] = None,
+                   final_equity: Optional[np.ndarray] = None,
+                   periods_per_year: int = TRADING_DAYS_PER_YEAR) -> Dict[str, Any]:
+    """
+    计算权益曲线的收益与风险指标。
+
+    equity 可以是一条曲线 (bars,) 或多条曲线组成的矩阵 (runs, bars)，矩阵时所有指标
+    按行批量计算并返回数组，便于一次性给参数优化的全部结果打分。
+    days 为曲线首尾相隔的自然日数，用于年化收益。
+    initial_equity / final_equity 默认取曲线首尾值，回测中传入初始资金和期末平仓后的权益。
+    """
+    single = np.asarray(equity).ndim == 1
+    equity = _as_matrix(equity)
+    runs, bars = equity.shape
+
+    initial = equity[:, 0] if initial_equity is None else np.broadcast_to(np.asarray(initial_equity, dtype=np.float64), (runs,))
+    final = equity[:, -1] if final_equity is None else np.broadcast_to(np.asarray(final_equity, dtype=np.float64), (runs,))
+
+    # 1. 收益率
+    total_return = final / initial - 1
+    if days > 0:
+        with np.errstate(invalid='ignore'):
+            annual_return = (1 + total_return) ** (365.0 / days) - 1
+    else:
+        annual_return = np.zeros(runs)
+
+    # 2. 波动率、夏普与索提诺（下行波动只统计负收益）
+    returns = _returns(equity)
+    finite = np.isfinite(returns)
+    annualizer = periods_per_year ** 0.5
+    annual_volatility = _masked_std(returns, finite) * annualizer
+    downside_std = _masked_std(returns, finite & (returns < 0)) * annualizer
+    sharpe_ratio = _safe_ratio(annual_return, annual_volatility)
+    sortino_ratio = _safe_ratio(annual_return, downside_std)
+
+    # 3. 最大回撤、回撤持续时间（bar 数）与卡玛比率
+    peak = np.maximum.accumulate(equity, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = (equity - peak) / peak
+    max_drawdown = np.nanmin(drawdown, axis=1) if bars else np.zeros(runs)
+    bar_index = np.broadcast_to(np.arange(bars), equity.shape)
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, bar_index, 0), axis=1)
+    max_drawdown_duration = (bar_index - last_peak).max(axis=1)
+    calmar_ratio = _safe_ratio(annual_return, np.abs(max_drawdown))
+
+    return _unwrap({
+        "total_return": total_return,
+        "annualized_return": annual_return,
+        "annualized_volatility": annual_volatility,
+        "sharpe_ratio": sharpe_ratio,
+        "sortino_ratio": sortino_ratio,
+        "calmar_ratio": calmar_ratio,
+        "max_drawdown": max_drawdown,
+        "max_drawdown_duration": max_drawdown_duration,
+    }, single)
+
+
+def rolling_sharpe(equity: np.ndarray, window: int,
+                   periods_per_year: int = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    """
+    滚动夏普比率（按 bar 收益的滚动均值 / 滚动标准差年化），前 window - 1 根为 NaN。
+    支持一维曲线或 (runs, bars) 矩阵，返回同形状的数组。
+    """
+    single = np.asarray(equity).ndim == 1
+    returns = _returns(_as_matrix(equity))
+    returns = np.where(np.isfinite(returns), returns, 0.0)
+    runs, bars = returns.shape
+    result = np.full((runs, bars), np.nan)
+    if window < 2 or bars < window:
+        return result[0] if single else result
+
+    # 用前缀和一次算出所有窗口的均值和方差
+    zeros = np.zeros((runs, 1))
+    csum = np.concatenate([zeros, np.cumsum(returns, axis=1)], axis=1)
+    csum_sq = np.concatenate([zeros, np.cumsum(returns ** 2, axis=1)], axis=1)
+    window_sum = csum[:, window:] - csum[:, :-window]
+    window_sum_sq = csum_sq[:, window:] - csum_sq[:, :-window]
+    mean = window_sum / window
+    variance = np.maximum(window_sum_sq - window_sum * mean, 0.0) / (window - 1)
+    std = np.sqrt(variance)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[:, window - 1:] = np.where(std > 0, mean / std * periods_per_year ** 0.5, 0.0)
+    return result[0] if single else result
+
+
+def exposure_time(position: np.ndarray) -> Any:
+    """持仓时间占比：持仓不为 0 的 bar 数 / 总 bar 数。"""
+    single = np.asarray(position).ndim == 1
+    position = _as_matrix(position)
+    if position.shape[1] == 0:
+        exposure = np.zeros(position.shape[0])
+    else:
+        exposure = (position != 0).mean(axis=1)
+    return exposure[0].item() if single else exposure
+
+
+def trade_metrics(trade_price: np.ndarray) -> Dict[str, Any]:
+    """
+    按买卖成对统计交易：trade_price 依次为 买, 卖, 买, 卖 ...（末尾未平仓的买单不计入）。
+    """
+    trade_price = np.asarray(trade_price, dtype=np.float64)
+    num_trades = len(trade_price) // 2
+    if num_trades == 0:
+        return {"total_trades": 0, "winning_trades": 0, "losing_trades": 0, "win_rate": 0, "profit_factor": 0}
+
+    buy_prices = trade_price[0:2 * num_trades:2]
+    sell_prices = trade_price[1:2 * num_trades:2]
+    trade_returns = (sell_prices - buy_prices) / buy_prices
+    wins = trade_returns[trade_returns > 0]
+    losses = trade_returns[trade_returns <= 0]
+
+    total_loss = abs(float(losses.sum()))
+    return {
+        "total_trades": num_trades,
+        "winning_trades": len(wins),
+        "losing_trades": len(losses),
+        "win_rate": len(wins) / num_trades,
+        "profit_factor": float(wins.sum()) / total_loss if total_loss > 0 else float('inf'),
+    }
+
+
+def summarize(equity: np.ndarray, days: float, initial_equity: float, final_equity: float,
+              trade_price: np.ndarray, position: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """生成单次回测的 summary 字典（键名与历史回测结果保持兼容）。"""
+    metrics = equity_metrics(equity, days, initial_equity=initial_equity, final_equity=final_equity)
+    summary = {"initial_equity": initial_equity, "final_equity": final_equity}
+    summary.update(metrics)
+    summary.update(trade_metrics(trade_price))
+    summary["exposure_time"] = exposure_time(position) if position is not None else 0.0
+    return summary
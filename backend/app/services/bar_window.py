@@ -0,0 +1,84 @@
+# backend/app/services/bar_window.py
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class BarWindow:
+    """
+    固定长度的K线滚动窗口，供逐 bar 运行的策略使用（回测与实盘共用）。
+
+    每一列预分配 2 * capacity 的 NumPy 缓冲区，每根新 bar 同时写入 i 和 i + capacity
+    两个位置，因此最近 capacity 根 bar 总是缓冲区中的一段连续切片，取窗口时无需拷贝
+    或重新拼接。无论回测多长，单根 bar 的开销和内存占用都保持不变。
+    """
+
+    def __init__(self, capacity: int, dtypes: Mapping[str, Any]):
+        if capacity <= 0:
+            raise ValueError("BarWindow capacity must be positive.")
+        self.capacity = int(capacity)
+        self.columns: List[str] = list(dtypes)
+        self._buffers: Dict[str, np.ndarray] = {
+            name: np.empty(2 * self.capacity, dtype=dtype) for name, dtype in dtypes.items()
+        }
+        self._head = 0  # 下一次写入的位置，取值范围 [0, capacity)
+        self._count = 0
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, capacity: int) -> "BarWindow":
+        """按 frame 的列和类型创建窗口，并用 frame 末尾的数据预填充。"""
+        window = cls(capacity, {name: frame[name].dtype for name in frame.columns})
+        window.extend(frame)
+        return window
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.capacity
+
+    def push(self, values: Sequence[Any]):
+        """追加一根 bar，values 的顺序与 columns 一致。"""
+        head = self._head
+        for name, value in zip(self.columns, values):
+            buffer = self._buffers[name]
+            buffer[head] = value
+            buffer[head + self.capacity] = value
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def extend(self, frame: pd.DataFrame):
+        """批量追加 frame 中的 bar，只保留最后 capacity 根。"""
+        tail = frame.iloc[-self.capacity:]
+        arrays = [tail[name].to_numpy() for name in self.columns]
+        for i in range(len(tail)):
+            self.push([array[i] for array in arrays])
+
+    def replace_last(self, values: Sequence[Any]):
+        """覆盖最新一根 bar（实盘中未走完的 bar 会不断更新）。"""
+        if self._count == 0:
+            raise IndexError("replace_last on an empty BarWindow.")
+        last = (self._head - 1) % self.capacity
+        for name, value in zip(self.columns, values):
+            buffer = self._buffers[name]
+            buffer[last] = value
+            buffer[last + self.capacity] = value
+
+    def last(self, column: str) -> Any:
+        if self._count == 0:
+            raise IndexError("last on an empty BarWindow.")
+        return self._buffers[column][(self._head - 1) % self.capacity]
+
+    def view(self, column: str) -> np.ndarray:
+        """返回某一列最近 len(self) 根 bar 的只读视图（不拷贝）。"""
+        stop = self._head + self.capacity
+        view = self._buffers[column][stop - self._count:stop]
+        view.flags.writeable = False
+        return view
+
+    def frame(self) -> pd.DataFrame:
+        """以 DataFrame 形式返回当前窗口，按时间从旧到新排列。"""
+        return pd.DataFrame({name: self.view(name) for name in self.columns}, copy=False)
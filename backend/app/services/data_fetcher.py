@@ -1,70 +1,152 @@
 # backend/app/services/data_fetcher.py
 import sys
 import json
+import time
 import pandas as pd
-from tqsdk import TqApi, TqAuth
-from datetime import datetime
 import argparse
+from typing import Dict, List, Tuple
 
 # 再次简化，完全移除asyncio，使用tqsdk的纯同步阻塞模式
 from app.core.config import TQ_USER, TQ_PASSWORD
+from app.services import kline_codec, trading_calendar
+from app.services.kline_store import slice_by_dates
+
+DURATION_SECONDS = {
+    "1d": 24 * 60 * 60, "1h": 60 * 60, "15m": 15 * 60,
+    "5m": 5 * 60, "1m": 1 * 60,
+}
+
+# 批量请求: (symbol, duration, start, end)
+FetchRequest = Tuple[str, str, str, str]
+
+# 批量获取时等待全部K线序列就绪的超时（秒）
+BATCH_TIMEOUT = 120
+
+
+def create_api():
+    """创建同步模式的 TqApi。tqsdk 只在这里导入，方便不依赖 tqsdk 的调用方复用本模块。"""
+    from tqsdk import TqApi, TqAuth
+    # 在普通线程中创建TqApi，它会自动进入同步阻塞模式
+    # disable_print=True 会禁止打印免责声明，确保stdout输出纯净的数据
+    return TqApi(auth=TqAuth(TQ_USER, TQ_PASSWORD), disable_print=True)
+
+
+def _data_length(symbol: str, duration: str, start: str) -> int:
+    # get_kline_serial 返回截至当前的最近 data_length 根，按交易日历精确计算覆盖 start 所需的根数
+    return max(trading_calendar.bar_count(symbol, DURATION_SECONDS[duration], start), 1)
+
+
+def _slice_serial(klines, start: str, end: str) -> pd.DataFrame:
+    # 序列开头不足 data_length 的部分为 NaN；datetime 已按时间升序，日期过滤只需一次二分查找
+    klines_df = pd.DataFrame(klines)
+    klines_df = klines_df[klines_df['datetime'].notna()].copy()
+    klines_df['datetime'] = klines_df['datetime'].astype('int64')
+    return slice_by_dates(klines_df, start, end).reset_index(drop=True)
+
+
+def fetch_klines(api, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+    """
+    用已登录的 api 获取 [start, end]（北京时间日期，YYYYMMDD）内的K线。
+    返回的 datetime 列为 UTC epoch 纳秒。
+    """
+    # get_kline_serial 在同步模式下会阻塞，直到数据下载完成
+    klines = api.get_kline_serial(
+        symbol,
+        duration_seconds=DURATION_SECONDS[duration],
+        data_length=_data_length(symbol, duration, start)
+    )
+    return _slice_serial(klines, start, end)
+
+
+def fetch_batch(api, requests: List[FetchRequest], timeout: float = BATCH_TIMEOUT) -> List[pd.DataFrame]:
+    """
+    在同一个 TqApi 会话中一次订阅所有请求的K线序列，再用一个 wait_update 循环等它们全部就绪。
+    同一 (symbol, duration) 的多个区间共用一条序列，长度取最早的起始日期所需的根数。
+    返回与 requests 一一对应的K线。
+    """
+    lengths: Dict[Tuple[str, str], int] = {}
+    for symbol, duration, start, _ in requests:
+        key = (symbol, duration)
+        lengths[key] = max(lengths.get(key, 0), _data_length(symbol, duration, start))
+
+    serials = {}
+
+    async def subscribe():
+        # 在 api 的事件循环中订阅时 get_kline_serial 不会逐个阻塞等待，所有订阅在同一轮请求中发出
+        for (symbol, duration), length in lengths.items():
+            serials[(symbol, duration)] = api.get_kline_serial(
+                symbol, duration_seconds=DURATION_SECONDS[duration], data_length=length,
+            )
+
+    api.create_task(subscribe())
+    deadline = time.time() + timeout
+    while len(serials) < len(lengths) or not all(api.is_serial_ready(serial) for serial in serials.values()):
+        if not api.wait_update(deadline=deadline):
+            pending = [f"{symbol} {duration}" for (symbol, duration), serial in serials.items()
+                       if not api.is_serial_ready(serial)]
+            raise TimeoutError(f"Timed out waiting for kline serials: {', '.join(pending) or 'subscription'}")
+
+    return [_slice_serial(serials[(symbol, duration)], start, end) for symbol, duration, start, end in requests]
+
+
+def _load_batch_requests(path: str) -> List[FetchRequest]:
+    """批量请求文件: [{"symbol", "duration", "start", "end"}, ...]，"-" 表示从 stdin 读取。"""
+    if path == "-":
+        items = json.load(sys.stdin)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+    return [(item["symbol"], item["duration"], item["start"], item["end"]) for item in items]
+
+
+def _to_json_records(klines: pd.DataFrame) -> pd.DataFrame:
+    # 转换datetime对象以便JSON序列化
+    klines = klines.copy()
+    if not klines.empty:
+        klines['datetime'] = pd.to_datetime(klines['datetime'], unit='ns').dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+    return klines
+
 
 def main():
     parser = argparse.ArgumentParser(description="TQSDK Data Fetcher")
-    parser.add_argument("--symbol", required=True)
-    parser.add_argument("--duration", required=True)
-    parser.add_argument("--start", required=True)
-    parser.add_argument("--end", required=True)
+    parser.add_argument("--symbol")
+    parser.add_argument("--duration")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--batch", help="批量请求的 JSON 文件（- 为 stdin），在一个会话中获取全部K线")
+    parser.add_argument("--format", choices=kline_codec.WIRE_FORMATS, default="json")
+    parser.add_argument("--output", help="binary 格式时写入的文件路径（由调用方创建和删除）")
     args = parser.parse_args()
+    if not args.batch and not all([args.symbol, args.duration, args.start, args.end]):
+        parser.error("--symbol, --duration, --start and --end are required without --batch")
+    if args.format == "binary" and not args.output:
+        parser.error("--output is required for --format binary")
 
     api = None
     try:
-        duration_map = {
-            "1d": 24 * 60 * 60, "1h": 60 * 60, "15m": 15 * 60,
-            "5m": 5 * 60, "1m": 1 * 60,
-        }
-        duration_seconds = duration_map[args.duration]
-        start_dt = datetime.strptime(args.start, '%Y%m%d')
-        end_dt = datetime.strptime(args.end, '%Y%m%d')
-
-        # 在普通线程中创建TqApi，它会自动进入同步阻塞模式
-        # disable_print=True 会禁止打印免责声明，确保stdout输出纯净的JSON
-        api = TqApi(auth=TqAuth(TQ_USER, TQ_PASSWORD), disable_print=True)
-
-        # 计算所需数据长度
-        days = (end_dt - start_dt).days
-        if days <= 0: days = 1
-        if duration_seconds >= 24 * 60 * 60:
-            data_length = int(days * 1.5) + 200
-        else:
-            trading_hours_per_day = 8
-            bars_per_hour = 3600 / duration_seconds
-            data_length = int(days * trading_hours_per_day * bars_per_hour * 1.5) + 500
-
-        # get_kline_serial 在同步模式下会阻塞，直到数据下载完成
-        klines = api.get_kline_serial(
-            args.symbol,
-            duration_seconds=duration_seconds,
-            data_length=data_length
-        )
-
-        # 过滤日期范围
-        klines_df = pd.DataFrame(klines)
-        klines_df['datetime_dt'] = pd.to_datetime(klines_df['datetime'], unit='ns')
-        klines_filtered = klines_df[
-            (klines_df['datetime_dt'].dt.tz_localize('UTC').dt.tz_convert('Asia/Shanghai').dt.date >= start_dt.date()) &
-            (klines_df['datetime_dt'].dt.tz_localize('UTC').dt.tz_convert('Asia/Shanghai').dt.date <= end_dt.date())
-        ]
+        api = create_api()
+
+        if args.batch:
+            frames = fetch_batch(api, _load_batch_requests(args.batch))
+            if args.format == "binary":
+                with open(args.output, 'wb') as f:
+                    f.write(kline_codec.encode_batch(frames))
+            else:
+                print(kline_codec.encode_json_batch([_to_json_records(frame) for frame in frames]).decode('utf-8'))
+            return
+
+        klines_filtered = fetch_klines(api, args.symbol, args.duration, args.start, args.end)
+
+        if args.format == "binary":
+            # 列式二进制写入文件，父进程内存映射读取，省去 JSON 的逐行序列化与解析
+            kline_codec.write_file(klines_filtered, args.output)
+            return
 
         if klines_filtered.empty:
             print(json.dumps([]))
             return
 
-        # 转换datetime对象以便JSON序列化
-        klines_filtered['datetime'] = klines_filtered['datetime_dt'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
-        klines_filtered = klines_filtered.drop(columns=['datetime_dt'])
-
-        print(klines_filtered.to_json(orient='records'))
+        print(_to_json_records(klines_filtered).to_json(orient='records'))
 
     except Exception as e:
         print(f"Data fetcher failed: {e}", file=sys.stderr)
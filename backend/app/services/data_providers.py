@@ -0,0 +1,151 @@
+# backend/app/services/data_providers.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Callable, List
+
+import pandas as pd
+
+from app.schemas.backtest import KlineDuration
+from app.services import kline_codec
+from app.services.data_fetcher import FetchRequest
+from app.services.synthetic_klines import generate_klines
+
+# 函数形式的数据源: (symbol, duration, start_date, end_date) -> 原始K线 DataFrame
+KlineFetcher = Callable[[str, KlineDuration, str, str], pd.DataFrame]
+
+
+class KlineProvider(ABC):
+    """
+    DataService 背后的K线数据源。fetch 返回 [start, end]（北京时间自然日，YYYYMMDD）内的原始K线，
+    列为 datetime（UTC epoch 纳秒）、open、high、low、close、volume。
+    能在一次会话中获取多组数据的数据源应覆盖 fetch_batch。
+    """
+
+    @abstractmethod
+    def fetch(self, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+        pass
+
+    def fetch_batch(self, requests: List[FetchRequest]) -> List[pd.DataFrame]:
+        return [self.fetch(*request) for request in requests]
+
+
+class FunctionProvider(KlineProvider):
+    """把 KlineFetcher 函数包装为数据源，逐个获取。"""
+
+    def __init__(self, fetcher: KlineFetcher):
+        self.fetcher = fetcher
+
+    def fetch(self, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+        return self.fetcher(symbol, KlineDuration(duration), start, end)
+
+
+class TqSubprocessProvider(KlineProvider):
+    """通过 data_fetcher 子进程从天勤获取K线，以隔离 tqsdk。批量请求在一个子进程（一次登录）中完成。"""
+
+    def __init__(self, wire_format: str = "binary"):
+        self.wire_format = wire_format
+
+    def fetch(self, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+        """子进程失败时抛出 CalledProcessError，避免把失败误记为“该区间没有数据”。"""
+        # 构建要执行的命令
+        command = [
+            sys.executable,  # 使用当前环境的python解释器
+            "-m", "app.services.data_fetcher", # 作为模块运行
+            "--symbol", symbol,
+            "--duration", duration,
+            "--start", start,
+            "--end", end,
+            "--format", self.wire_format,
+        ]
+
+        if self.wire_format == "binary":
+            # 列式二进制写入临时文件，再内存映射读取，无需逐行解析
+            fd, output_path = tempfile.mkstemp(prefix="klines_", suffix=".bin")
+            os.close(fd)
+            try:
+                self._run_fetcher(command + ["--output", output_path])
+                return kline_codec.read_file(output_path)
+            finally:
+                os.unlink(output_path)
+
+        result = self._run_fetcher(command)
+
+        # 从stdout加载JSON数据
+        json_output = result.stdout
+        if not json_output:
+            return pd.DataFrame()
+
+        klines_df = kline_codec.decode_json(json_output)
+        if klines_df.empty:
+            return klines_df
+
+        # tqsdk download_data 返回的 datetime 是字符串（UTC），统一转换为 epoch 纳秒
+        klines_df['datetime'] = pd.to_datetime(klines_df['datetime']).astype('int64')
+        return klines_df
+
+    def fetch_batch(self, requests: List[FetchRequest]) -> List[pd.DataFrame]:
+        fd, requests_path = tempfile.mkstemp(prefix="kline_batch_", suffix=".json")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump([{"symbol": s, "duration": d, "start": a, "end": b} for s, d, a, b in requests], f)
+        command = [
+            sys.executable, "-m", "app.services.data_fetcher",
+            "--batch", requests_path,
+            "--format", self.wire_format,
+        ]
+        try:
+            if self.wire_format == "binary":
+                fd, output_path = tempfile.mkstemp(prefix="klines_", suffix=".bin")
+                os.close(fd)
+                try:
+                    self._run_fetcher(command + ["--output", output_path])
+                    with open(output_path, 'rb') as f:
+                        return kline_codec.decode_batch(f.read())
+                finally:
+                    os.unlink(output_path)
+
+            frames = kline_codec.decode_json_batch(self._run_fetcher(command).stdout)
+            for frame in frames:
+                if not frame.empty:
+                    frame['datetime'] = pd.to_datetime(frame['datetime']).astype('int64')
+            return frames
+        finally:
+            os.unlink(requests_path)
+
+    @staticmethod
+    def _run_fetcher(command) -> subprocess.CompletedProcess:
+        print(f"DataService: Running subprocess with command: {' '.join(command)}")
+
+        # 执行子进程
+        # capture_output=True 会捕获stdout和stderr
+        # text=True 会将输出解码为文本
+        # check=True 如果返回非零状态码，会抛出CalledProcessError
+        return subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            check=True,
+            encoding='utf-8'
+        )
+
+
+class SyntheticProvider(KlineProvider):
+    """确定性的合成K线（见 synthetic_klines），离线环境下的基准测试和单元测试使用。"""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def fetch(self, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+        return generate_klines(symbol, duration, start, end, seed=self.seed)
+
+
+def create_provider(name: str, wire_format: str = "binary", seed: int = 0) -> KlineProvider:
+    """按 DATA_PROVIDER 配置创建数据源: tq（默认）或 synthetic。"""
+    if name == "tq":
+        return TqSubprocessProvider(wire_format)
+    if name == "synthetic":
+        return SyntheticProvider(seed)
+    raise ValueError(f"Unknown data provider: {name}")
@@ -1,69 +1,58 @@
 # backend/app/services/data_service.py
 import pandas as pd
-import json
 import subprocess
-import sys
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import (
+    KLINE_STORE_DIR, FETCHER_SOCKET, FETCHER_WIRE_FORMAT, KLINE_CACHE_MAX_BYTES, KLINE_CACHE_LIVE_TTL,
+    SHARED_KLINES_ENABLED, SHARED_KLINES_STATE_DIR, SHARED_KLINES_MAX_BYTES, SHARED_KLINES_IDLE_SECONDS,
+    RESAMPLE_FROM_1M, DATA_PROVIDER, SYNTHETIC_SEED,
+)
 from app.schemas.backtest import KlineDuration
+from app.services.data_fetcher import DURATION_SECONDS
+from app.services.data_providers import FunctionProvider, KlineFetcher, KlineProvider, create_provider
+from app.services.fetcher_daemon import FetcherClient
+from app.services.kline_cache import KlineCache, frame_nbytes
+from app.services.kline_store import KlineStore, KLINE_COLUMNS, normalize_klines, slice_by_dates
+from app.services.resampler import RESAMPLED_DURATIONS, resample_klines, source_start_date
+from app.services.shared_klines import SharedKlineManager
+from app.services.trading_calendar import session_bar_times
+
+# 批量请求中的一组: (symbol, duration, start_date, end_date)
+KlineRequest = Tuple[str, KlineDuration, str, str]
+
+# 每根K线的字节数（KLINE_COLUMNS 均为 8 字节），用于预热前估算下载量
+BYTES_PER_BAR = len(KLINE_COLUMNS) * 8
+
 
 class DataService:
+    def __init__(self, store: Optional[KlineStore] = None, fetcher: Optional[KlineFetcher] = None,
+                 daemon: Optional[FetcherClient] = None, wire_format: str = "binary",
+                 cache: Optional[KlineCache] = None, shared: Optional[SharedKlineManager] = None,
+                 resample_from_1m: bool = False, provider: Optional[KlineProvider] = None):
+        self.store = store
+        self.resample_from_1m = resample_from_1m
+        self.cache = cache
+        # 跨进程共享的历史K线（可选）：同一节点的 worker 共用一份只读内存
+        self.shared = shared
+        # 数据源：默认通过 data_fetcher 子进程访问天勤；传入 fetcher 函数时逐个调用它
+        if provider is None:
+            provider = FunctionProvider(fetcher) if fetcher is not None else create_provider("tq", wire_format)
+        self.provider = provider
+        # 常驻获取服务（可选）：不可用时回退到 provider
+        self.daemon = daemon
+
     def get_kline_data(self, symbol: str, duration: KlineDuration, start_date: str, end_date: str) -> pd.DataFrame:
         """
-        通过调用一个独立的子进程来获取K线数据，以隔离tqsdk。
+        获取K线数据。配置了本地存储时优先读取本地，只向数据源请求缺失的日期段。
         """
         try:
-            # 构建要执行的命令
-            command = [
-                sys.executable,  # 使用当前环境的python解释器
-                "-m", "app.services.data_fetcher", # 作为模块运行
-                "--symbol", symbol,
-                "--duration", duration.value,
-                "--start", start_date,
-                "--end", end_date,
-            ]
-
-            print(f"DataService: Running subprocess with command: {' '.join(command)}")
-
-            # 执行子进程
-            # capture_output=True 会捕获stdout和stderr
-            # text=True 会将输出解码为文本
-            # check=True 如果返回非零状态码，会抛出CalledProcessError
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                check=True,
-                encoding='utf-8'
-            )
-
-            # 从stdout加载JSON数据
-            json_output = result.stdout
-            if not json_output:
+            raw = self._load_cached_klines(symbol, duration, start_date, end_date)
+            if raw.empty:
                 print("Warning: Data fetcher returned empty output.")
                 return pd.DataFrame()
-
-            data = json.loads(json_output)
-            if not data:
-                return pd.DataFrame()
-
-            klines_df = pd.DataFrame(data)
-            
-            # --- 数据格式化处理 (与之前相同) ---
-            # tqsdk download_data 返回的 datetime 是字符串，需要转换
-            klines_df['datetime_dt'] = pd.to_datetime(klines_df['datetime'])
-
-            klines_final = klines_df.copy()
-            klines_final.rename(columns={
-                'open': 'open',
-                'high': 'high',
-                'low': 'low',
-                'close': 'close',
-                'volume': 'vol'
-            }, inplace=True)
-            klines_final['trade_date'] = klines_final['datetime_dt'].dt.strftime('%Y%m%d %H:%M:%S')
-            
-            return klines_final[['trade_date', 'open', 'high', 'low', 'close', 'vol']].reset_index(drop=True)
-
+            return self._format_klines(raw)
         except subprocess.CalledProcessError as e:
             # 如果子进程失败，打印它的stderr
             print(f"!!! FATAL ERROR in DataService subprocess !!!")
@@ -76,5 +65,178 @@ class DataService:
             traceback.print_exc()
             return pd.DataFrame()
 
-data_service = DataService()
+    def _load_cached_klines(self, symbol: str, duration: KlineDuration, start_date: str, end_date: str) -> pd.DataFrame:
+        # 包含当天的数据还在增长，不放进共享内存，在进程内缓存中也只短暂保存
+        today = (datetime.utcnow() + timedelta(hours=8)).strftime('%Y%m%d')
+        is_live = end_date >= today
+        raw = self.cache.get(symbol, duration.value, start_date, end_date) if self.cache is not None else None
+        if raw is not None:
+            return raw
+
+        if self.shared is not None and not is_live:
+            # 进程内缓存保存的是共享内存的切片，不额外占用内存
+            raw = self.shared.get(
+                symbol, duration.value, start_date, end_date,
+                lambda load_start, load_end: self._load_klines(symbol, duration, load_start, load_end),
+            )
+        else:
+            raw = self._load_klines(symbol, duration, start_date, end_date)
+        if self.cache is not None and not raw.empty:
+            ttl = KLINE_CACHE_LIVE_TTL if is_live else None
+            self.cache.put(symbol, duration.value, start_date, end_date, raw, ttl=ttl)
+        return raw
+
+    def get_kline_batch(self, requests: List[KlineRequest]) -> List[pd.DataFrame]:
+        """
+        批量获取多组K线：各组在本地存储中缺失的区间合并为一次批量请求（同一个 TqApi 会话），
+        写入本地存储后再逐组读取。未配置本地存储时退化为逐组获取。
+        """
+        try:
+            self._fill_store(requests)
+        except Exception:
+            import traceback
+            print(f"!!! ERROR in DataService.get_kline_batch, falling back to per-request fetch !!!")
+            traceback.print_exc()
+        return [self.get_kline_data(*request) for request in requests]
+
+    def prefetch(self, symbol: str, duration: KlineDuration, start_date: str, end_date: str) -> Dict[str, Any]:
+        return self.prefetch_batch([(symbol, duration, start_date, end_date)])[0]
+
+    def estimate_prefetch(self, symbol: str, duration: KlineDuration, start_date: str, end_date: str) -> int:
+        """按交易日历估算补齐本地存储需要下载的字节数（只计缺失的区间，由 1m 合成时按 1m 计）。"""
+        source_duration, source_start = self._source(duration, start_date)
+        if self.store is not None:
+            ranges = self.store.missing_ranges(symbol, source_duration.value, source_start, end_date)
+        else:
+            ranges = [(source_start, end_date)]
+        seconds = DURATION_SECONDS[source_duration.value]
+        bars = sum(len(session_bar_times(symbol, seconds, range_start, range_end)) for range_start, range_end in ranges)
+        return bars * BYTES_PER_BAR
+
+    def prefetch_batch(self, requests: List[KlineRequest]) -> List[Dict[str, Any]]:
+        """
+        把各组K线补齐到本地存储（不经过进程内缓存），返回每组实际向数据源请求的区间
+        和这些区间下载到的行数、字节数（已在本地的部分不计）。
+        """
+        missing = self._fill_store(requests)
+        results = []
+        for ranges in missing:
+            fetched = [self._load_klines(symbol, duration, range_start, range_end)
+                       for symbol, duration, range_start, range_end in ranges] if self.store is not None else []
+            results.append({
+                "fetched_ranges": [[range_start, range_end] for _, _, range_start, range_end in ranges],
+                "rows": sum(len(frame) for frame in fetched),
+                "bytes": sum(frame_nbytes(frame) for frame in fetched),
+            })
+        return results
+
+    def _source(self, duration: KlineDuration, start_date: str) -> Tuple[KlineDuration, str]:
+        """实际向数据源请求的周期和起始日期（由 1m 合成时为 1m）。"""
+        if self.resample_from_1m and duration.value in RESAMPLED_DURATIONS:
+            return KlineDuration.one_minute, source_start_date(duration.value, start_date)
+        return duration, start_date
+
+    def _fill_store(self, requests: List[KlineRequest]) -> List[List[KlineRequest]]:
+        """用一次批量请求补齐所有请求在本地存储中缺失的区间，返回每个请求缺失的区间。"""
+        missing = []
+        for symbol, duration, start_date, end_date in requests:
+            source_duration, source_start = self._source(duration, start_date)
+            if self.store is not None:
+                ranges = self.store.missing_ranges(symbol, source_duration.value, source_start, end_date)
+            else:
+                ranges = [(source_start, end_date)]
+            missing.append([(symbol, source_duration, range_start, range_end) for range_start, range_end in ranges])
+
+        if self.store is not None:
+            keys = list(dict.fromkeys(key for ranges in missing for key in ranges))
+            if keys:
+                print(f"DataService: Fetching {len(keys)} missing ranges in one batch")
+                for (symbol, duration, range_start, range_end), fetched in zip(keys, self._fetch_batch(keys)):
+                    self.store.write(symbol, duration.value, fetched, range_start, range_end)
+        return missing
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats() if self.cache is not None else {}
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+    def _load_klines(self, symbol: str, duration: KlineDuration, start_date: str, end_date: str) -> pd.DataFrame:
+        if self.resample_from_1m and duration.value in RESAMPLED_DURATIONS:
+            minute = self._load_cached_klines(
+                symbol, KlineDuration.one_minute, source_start_date(duration.value, start_date), end_date,
+            )
+            resampled = resample_klines(minute, duration.value)
+            return slice_by_dates(resampled, start_date, end_date).reset_index(drop=True)
+
+        if self.store is None:
+            return normalize_klines(self._fetch(symbol, duration, start_date, end_date))
+
+        for missing_start, missing_end in self.store.missing_ranges(symbol, duration.value, start_date, end_date):
+            print(f"DataService: Fetching missing range {missing_start}-{missing_end} for {symbol} {duration.value}")
+            fetched = self._fetch(symbol, duration, missing_start, missing_end)
+            self.store.write(symbol, duration.value, fetched, missing_start, missing_end)
+        return self.store.read(symbol, duration.value, start_date, end_date)
+
+    def _fetch(self, symbol: str, duration: KlineDuration, start_date: str, end_date: str) -> pd.DataFrame:
+        fetched = None
+        if self.daemon is not None:
+            try:
+                fetched = self.daemon.fetch(symbol, duration.value, start_date, end_date)
+            except OSError as e:
+                print(f"DataService: Fetcher daemon unavailable ({e}), falling back to subprocess.")
+        if fetched is None:
+            fetched = self.provider.fetch(symbol, duration.value, start_date, end_date)
+        if fetched is None or fetched.empty:
+            return pd.DataFrame(columns=KLINE_COLUMNS)
+        return fetched
+
+    def _fetch_batch(self, keys: List[KlineRequest]) -> List[pd.DataFrame]:
+        requests = [(symbol, duration.value, start_date, end_date) for symbol, duration, start_date, end_date in keys]
+        frames = None
+        if self.daemon is not None:
+            try:
+                frames = self.daemon.fetch_batch(requests)
+            except OSError as e:
+                print(f"DataService: Fetcher daemon unavailable ({e}), falling back to subprocess.")
+        if frames is None:
+            frames = self.provider.fetch_batch(requests)
+        return [frame if frame is not None and not frame.empty else pd.DataFrame(columns=KLINE_COLUMNS)
+                for frame in frames]
+
+    @staticmethod
+    def _format_klines(raw: pd.DataFrame) -> pd.DataFrame:
+        # 各列直接引用原数组（copy=False），共享内存中的K线不会被复制；
+        # 时间保持 int64 epoch 纳秒，不再逐行格式化为字符串
+        return pd.DataFrame({
+            'datetime': raw['datetime'].to_numpy(),
+            'open': raw['open'].to_numpy(),
+            'high': raw['high'].to_numpy(),
+            'low': raw['low'].to_numpy(),
+            'close': raw['close'].to_numpy(),
+            'vol': raw['volume'].to_numpy(),
+        }, copy=False)
+
+
+def _create_store(root: str) -> Optional[KlineStore]:
+    if not root:
+        return None
+    store = KlineStore(root)
+    try:
+        store.check_writable()
+    except OSError as e:
+        # 不可写时关闭本地存储直接向数据源请求，而不是让每次写入失败后返回空数据
+        print(f"!!! WARNING: kline store disabled, {e} Set KLINE_STORE_DIR to a writable directory. !!!")
+        return None
+    return store
+
 
+data_service = DataService(
+    store=_create_store(KLINE_STORE_DIR),
+    daemon=FetcherClient(FETCHER_SOCKET, wire_format=FETCHER_WIRE_FORMAT) if FETCHER_SOCKET else None,
+    provider=create_provider(DATA_PROVIDER, FETCHER_WIRE_FORMAT, SYNTHETIC_SEED),
+    cache=KlineCache(KLINE_CACHE_MAX_BYTES) if KLINE_CACHE_MAX_BYTES > 0 else None,
+    shared=(SharedKlineManager(SHARED_KLINES_STATE_DIR, SHARED_KLINES_MAX_BYTES, SHARED_KLINES_IDLE_SECONDS)
+            if SHARED_KLINES_ENABLED else None),
+    resample_from_1m=RESAMPLE_FROM_1M,
+)
@@ -0,0 +1,204 @@
+# backend/app/services/downsample.py
+"""
+权益曲线的降采样：前端图表只有约 2000 个像素宽，回测报告按需要的分辨率返回保持形状的子集。
+
+- minmax: 把曲线均分为 resolution/2 个桶，保留每桶的最低点和最高点，完全向量化。
+- lttb: Largest-Triangle-Three-Buckets。逐桶选取与"上一桶选中点、下一桶均值"构成最大三角形的点。
+  上一桶选中哪个点会影响本桶的选择，这里对上一桶的每个候选点一次算出本桶的最优点（桶数 × 宽 × 宽 的面积数组），
+  Python 循环只剩按查找表依次取下标；点数远多于分辨率时先用 minmax 预选（MinMaxLTTB），把桶宽限制在常数。
+
+返回值都是保留点的下标（升序，含首尾两点），由调用方按下标取出时间、权益。
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import DOWNSAMPLE_CACHE_SIZE, ROLLING_SHARPE_WINDOW
+from app.services import analytics, series_codec
+
+# 点数超过 resolution 的该倍数时，LTTB 之前先做 minmax 预选
+MINMAX_PRESELECT_RATIO = 4
+
+
+def _bucket_matrix(starts: np.ndarray, ends: np.ndarray):
+    """各桶 [start, end) 的下标矩阵（按最宽的桶补齐）与有效位掩码。"""
+    width = int((ends - starts).max())
+    index = starts[:, None] + np.arange(width)
+    valid = index < ends[:, None]
+    return np.minimum(index, ends[:, None] - 1), valid
+
+
+def minmax(values: np.ndarray, resolution: int) -> np.ndarray:
+    """每桶保留最低点和最高点，最多返回 resolution 个点（另加首尾两点）。"""
+    n = len(values)
+    if resolution >= n or n <= 2:
+        return np.arange(n)
+    buckets = max(1, resolution // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    index, valid = _bucket_matrix(edges[:-1], edges[1:])
+    candidates = values[index]
+    rows = np.arange(buckets)
+    lowest = index[rows, np.where(valid, candidates, np.inf).argmin(axis=1)]
+    highest = index[rows, np.where(valid, candidates, -np.inf).argmax(axis=1)]
+    return np.unique(np.concatenate([[0, n - 1], lowest, highest]))
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, resolution: int) -> np.ndarray:
+    n = len(y)
+    # 首尾两点各自成桶，中间的点均分为 resolution - 2 个桶（每桶至少一个点）
+    edges = np.linspace(1, n - 1, resolution - 1).astype(np.int64)
+    index, valid = _bucket_matrix(edges[:-1], edges[1:])
+    bx, by = x[index], y[index]
+    sizes = valid.sum(axis=1)
+    mean_x = np.where(valid, bx, 0.0).sum(axis=1) / sizes
+    mean_y = np.where(valid, by, 0.0).sum(axis=1) / sizes
+    # 三角形的第三个顶点：下一桶的均值，最后一桶用最后一个点
+    cx = np.append(mean_x[1:], x[-1])[:, None, None]
+    cy = np.append(mean_y[1:], y[-1])[:, None, None]
+    # 第一个顶点的候选：上一桶的各个点，第一桶之前只有首点
+    ax = np.vstack([np.full(index.shape[1], x[0]), bx[:-1]])[:, :, None]
+    ay = np.vstack([np.full(index.shape[1], y[0]), by[:-1]])[:, :, None]
+
+    # area[i, p, j]: 上一桶选第 p 个候选时，本桶第 j 个候选构成的三角形（两倍）面积
+    area = np.abs((ax - cx) * (by[:, None, :] - ay) - (ax - bx[:, None, :]) * (cy - ay))
+    best = np.where(valid[:, None, :], area, -1.0).argmax(axis=2)
+
+    selected = [0]
+    choice = 0
+    for row, table in zip(index.tolist(), best.tolist()):
+        choice = table[choice]
+        selected.append(row[choice])
+    selected.append(n - 1)
+    return np.asarray(selected, dtype=np.int64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, resolution: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets，返回 resolution 个点（resolution 不小于 3）。"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if resolution >= n or n <= 2:
+        return np.arange(n)
+    resolution = max(3, resolution)
+    if n > resolution * MINMAX_PRESELECT_RATIO:
+        preselected = minmax(y, resolution * MINMAX_PRESELECT_RATIO)
+        return preselected[_lttb(x[preselected], y[preselected], resolution)]
+    return _lttb(x, y, resolution)
+
+
+METHODS: Dict[str, Callable[[np.ndarray, int], np.ndarray]] = {
+    "lttb": lambda values, resolution: lttb(np.arange(len(values)), values, resolution),
+    "minmax": minmax,
+}
+
+
+def downsample(values: np.ndarray, resolution: int, method: str = "lttb") -> np.ndarray:
+    """按 bar 序号（与前端的类目轴一致）降采样，返回保留点的下标。"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'.")
+    return METHODS[method](np.asarray(values, dtype=np.float64), int(resolution))
+
+
+class DownsampleCache:
+    """
+    API 进程内降采样结果的 LRU 缓存，键为 (backtest_id, 分辨率, 方法, 时间窗口)。
+    只缓存已完成回测（序列不再变化）的降采样结果，每条最多约 resolution + 成交数个点，总大小有界；
+    图表反复缩放、刷新时不必重新解码和降采样。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+view_cache = DownsampleCache(DOWNSAMPLE_CACHE_SIZE)
+
+
+def _timestamp_ns(value: datetime) -> int:
+    # 不带时区的时间与报告中的时间字符串一样按 UTC 解释
+    return int(pd.Timestamp(value).value)
+
+
+def equity_view(columns: Dict[str, np.ndarray], resolution: Optional[int] = None, method: str = "lttb",
+                start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    截取 [start_dt, end_dt] 内的权益曲线并降采样到 resolution 个点（为空时不降采样），返回 daily_pnl 结构。
+    成交所在的 bar 总是保留，前端的买卖标记才能落在曲线上；窗口内的成交全部返回。
+    rolling_sharpe 与 pnl 逐点对齐，窗口开头不足 ROLLING_SHARPE_WINDOW 根时向前多取K线，不足处为 None。
+    """
+    timestamps = columns["datetime"]
+    lo = 0 if start_dt is None else int(np.searchsorted(timestamps, _timestamp_ns(start_dt), side='left'))
+    hi = len(timestamps) if end_dt is None else int(np.searchsorted(timestamps, _timestamp_ns(end_dt), side='right'))
+    hi = max(lo, hi)
+    points = None
+    if resolution is not None:
+        trades = columns["trade_index"]
+        points = np.union1d(lo + downsample(columns["equity"][lo:hi], resolution, method),
+                            trades[(trades >= lo) & (trades < hi)])
+    view = series_codec.records(columns, points, lo, hi)
+    view["rolling_sharpe"] = _rolling_sharpe_at(columns["equity"], lo, hi, points)
+    view["downsample"] = {"method": method, "resolution": resolution, "total_points": hi - lo}
+    return view
+
+
+def _rolling_sharpe_at(equity: np.ndarray, lo: int, hi: int, points: Optional[np.ndarray]) -> Dict[str, Any]:
+    """[lo, hi) 内各保留点的滚动夏普比率，只对窗口及其前 ROLLING_SHARPE_WINDOW - 1 根计算。"""
+    start = max(0, lo - ROLLING_SHARPE_WINDOW + 1)
+    values = analytics.rolling_sharpe(equity[start:hi], ROLLING_SHARPE_WINDOW)
+    values = values[lo - start:] if points is None else values[points - start]
+    return {"window": ROLLING_SHARPE_WINDOW,
+            "values": [None if np.isnan(value) else value for value in values.tolist()]}
+
+
+def cached_equity_view(backtest_id: int, finished: bool, load_columns: Callable[[], Optional[Dict[str, np.ndarray]]],
+                       resolution: Optional[int] = None, method: str = "lttb",
+                       start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """
+    带缓存的 equity_view；load_columns 只在未命中时调用。回测尚未完成（finished 为 False）或不降采样
+    （resolution 为空，视图大小与窗口内的 bar 数成正比）时不缓存。
+    """
+    key = (backtest_id, resolution, method, start_dt, end_dt)
+    cacheable = finished and resolution is not None
+    view = view_cache.get(key) if cacheable else None
+    if view is None:
+        columns = load_columns()
+        if columns is None:
+            return None
+        view = equity_view(columns, resolution, method, start_dt, end_dt)
+        if cacheable:
+            view_cache.put(key, view)
+    return view
@@ -0,0 +1,129 @@
+# backend/app/services/execution.py
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.services.strategy_base import SIGNAL_BUY, SIGNAL_SELL, SIGNAL_FLAT
+
+
+@dataclass
+class ExecutionResult:
+    """撮合内核的输出，全部为 NumPy 数组；只在持久化时才转换为字典列表。"""
+    cash: np.ndarray            # 每根 bar 收盘后的现金
+    position: np.ndarray        # 每根 bar 收盘后的持仓
+    equity: np.ndarray          # 每根 bar 收盘后的权益
+    trade_index: np.ndarray     # 成交所在的 bar 下标 (int64)
+    trade_side: np.ndarray      # SIGNAL_BUY / SIGNAL_SELL (int8)
+    trade_price: np.ndarray     # 含滑点的成交价
+    trade_shares: np.ndarray    # 成交数量
+    final_equity: float         # 期末按最后收盘价平仓后的权益
+
+
+def _effective_signals(signals: np.ndarray):
+    """
+    去掉连续重复的非零信号。撮合状态只会在成交时改变，
+    所以同向信号连续出现时只有第一个可能成交，其余都会被忽略。
+    """
+    candidates = np.flatnonzero(signals != SIGNAL_FLAT)
+    sides = signals[candidates]
+    if len(sides) == 0:
+        return candidates, sides
+    keep = np.empty(len(sides), dtype=bool)
+    keep[0] = True
+    keep[1:] = sides[1:] != sides[:-1]
+    return candidates[keep], sides[keep]
+
+
+def execute_signals(close: np.ndarray, signals: np.ndarray, initial_cash: float,
+                    commission_rate: float, slippage: float) -> ExecutionResult:
+    """
+    根据与收盘价对齐的 int8 信号数组撮合成交：全仓买入、全部卖出，
+    成交价、手续费、滑点的计算顺序与原逐行回测完全一致。
+
+    Python 循环只遍历真正可能成交的信号，逐 bar 的现金、持仓和权益由数组运算一次得到。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    signals = np.asarray(signals, dtype=np.int8)
+    if len(close) != len(signals):
+        raise ValueError("close and signals must have the same length.")
+
+    cash = initial_cash
+    position = 0
+    last_signal = None
+    trade_index, trade_side, trade_price, trade_shares = [], [], [], []
+    cash_after, position_after = [], []
+
+    candidates, sides = _effective_signals(signals)
+    for i, side in zip(candidates.tolist(), sides.tolist()):
+        current_price = close[i]
+        if side == SIGNAL_BUY and position == 0 and last_signal != SIGNAL_BUY:
+            buy_price = current_price + slippage
+            shares_to_buy = cash / buy_price
+            commission = shares_to_buy * buy_price * commission_rate
+
+            position = shares_to_buy
+            cash -= commission
+            trade_price.append(buy_price)
+            trade_shares.append(shares_to_buy)
+        elif side == SIGNAL_SELL and position > 0 and last_signal != SIGNAL_SELL:
+            sell_price = current_price - slippage
+            shares_sold = position
+            sale_value = shares_sold * sell_price
+            commission = sale_value * commission_rate
+
+            cash = sale_value - commission
+            position = 0
+            trade_price.append(sell_price)
+            trade_shares.append(shares_sold)
+        else:
+            continue
+        last_signal = side
+        trade_index.append(i)
+        trade_side.append(side)
+        cash_after.append(cash)
+        position_after.append(position)
+
+    trade_index = np.asarray(trade_index, dtype=np.int64)
+
+    # 现金和持仓在两次成交之间保持不变：找到每根 bar 之前最近的一次成交即可
+    cash_states = np.asarray([initial_cash] + cash_after, dtype=np.float64)
+    position_states = np.asarray([0.0] + position_after, dtype=np.float64)
+    state = np.searchsorted(trade_index, np.arange(len(close)), side='right')
+    cash_arr = cash_states[state]
+    position_arr = position_states[state]
+    equity = cash_arr + position_arr * close
+
+    final_equity = equity[-1] if len(equity) else initial_cash
+    if position > 0:
+        final_equity = position * close[-1]
+
+    return ExecutionResult(
+        cash=cash_arr,
+        position=position_arr,
+        equity=equity,
+        trade_index=trade_index,
+        trade_side=np.asarray(trade_side, dtype=np.int8),
+        trade_price=np.asarray(trade_price, dtype=np.float64),
+        trade_shares=np.asarray(trade_shares, dtype=np.float64),
+        final_equity=float(final_equity),
+    )
+
+
+def equity_records(dates: Sequence[Any], result: ExecutionResult) -> List[Dict[str, Any]]:
+    """转换为持久化用的权益曲线 [{'date', 'pnl'}]。"""
+    return [{'date': date, 'pnl': pnl} for date, pnl in zip(list(dates), result.equity.tolist())]
+
+
+def trade_records(dates: Sequence[Any], result: ExecutionResult) -> List[Dict[str, Any]]:
+    """转换为持久化用的成交列表 [{'date', 'type', 'price', 'shares'}]。"""
+    dates = np.asarray(dates)
+    return [
+        {'date': date, 'type': 'buy' if side == SIGNAL_BUY else 'sell', 'price': price, 'shares': shares}
+        for date, side, price, shares in zip(
+            dates[result.trade_index].tolist(),
+            result.trade_side.tolist(),
+            result.trade_price.tolist(),
+            result.trade_shares.tolist(),
+        )
+    ]
@@ -0,0 +1,363 @@
+# backend/app/services/fetcher_daemon.py
+"""
+常驻的K线获取服务。
+
+data_fetcher 每次调用都要启动解释器、导入 tqsdk 并重新登录 TqApi，耗时数秒。
+本服务在一个进程中保持一个已登录的 TqApi 会话，DataService 和 Celery worker
+通过 Unix socket 发送请求，单次获取的额外开销降到毫秒级。
+
+协议：每条消息为 4 字节大端长度 + JSON 头，头中的 payload_size 指明紧随其后的数据字节数。
+    请求: {"op": "fetch", "symbol": ..., "duration": ..., "start": ..., "end": ..., "format": "binary"|"json"}
+          {"op": "fetch_batch", "requests": [[symbol, duration, start, end], ...], "format": ...}
+          {"op": "ping"}
+    响应: {"ok": true, "payload_size": N} + 数据（默认为 kline_codec 的列式二进制，批量请求为 encode_batch）
+          {"ok": false, "error": "..."}
+
+用法: python -m app.services.fetcher_daemon --socket /run/fetcher/fetcher.sock [--backend stub|synthetic]
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services import data_fetcher, kline_codec
+from app.services.data_fetcher import FetchRequest
+from app.services.data_providers import SyntheticProvider
+
+_HEADER = struct.Struct('>I')
+
+
+class FetcherError(RuntimeError):
+    """服务端获取数据失败。"""
+
+
+# --- 消息收发 ---
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b''):
+    header = dict(header, payload_size=len(payload))
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock: socket.socket) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    prefix = _recv_exactly(sock, _HEADER.size)
+    if prefix is None:
+        return None
+    header = json.loads(_recv_exactly(sock, _HEADER.unpack(prefix)[0]))
+    payload = _recv_exactly(sock, header.get('payload_size', 0)) if header.get('payload_size') else b''
+    return header, payload
+
+
+# --- 数据后端 ---
+
+class TqBackend:
+    """持有一个常驻的 TqApi 会话。必须在创建它的线程中使用。"""
+
+    def __init__(self):
+        self.api = None
+
+    def _ensure_api(self):
+        if self.api is None:
+            self.api = data_fetcher.create_api()
+        return self.api
+
+    def fetch(self, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+        return self.fetch_batch([(symbol, duration, start, end)])[0]
+
+    def fetch_batch(self, requests: List[FetchRequest]) -> List[pd.DataFrame]:
+        try:
+            return data_fetcher.fetch_batch(self._ensure_api(), requests)
+        except Exception:
+            # 会话可能已经失效，下次请求时重新登录
+            self.close()
+            raise
+
+    def idle(self):
+        # 空闲时驱动一次事件循环，保持与服务器的连接
+        if self.api is not None:
+            self.api.wait_update(deadline=time.time() + 0.1)
+
+    def close(self):
+        if self.api is not None:
+            try:
+                self.api.close()
+            finally:
+                self.api = None
+
+
+class StubBackend:
+    """离线测试用的确定性数据：工作日 09:00-15:00（北京时间）按周期生成K线。"""
+
+    def fetch(self, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+        step = data_fetcher.DURATION_SECONDS[duration]
+        days = pd.bdate_range(datetime.strptime(start, '%Y%m%d'), datetime.strptime(end, '%Y%m%d'))
+        if step >= 24 * 3600:
+            offsets = np.array([0])
+        else:
+            offsets = np.arange(9 * 3600, 15 * 3600, step)
+        seconds = (days.asi8 // 10**9)[:, np.newaxis] + offsets[np.newaxis, :] - 8 * 3600
+        timestamps = seconds.ravel() * 10**9
+        close = 3500.0 + 50.0 * np.sin(timestamps / 1e9 / 86400.0)
+        return pd.DataFrame({
+            'datetime': timestamps, 'open': close, 'high': close + 1, 'low': close - 1,
+            'close': close, 'volume': 1.0,
+        })
+
+    def fetch_batch(self, requests: List[FetchRequest]) -> List[pd.DataFrame]:
+        return [self.fetch(*request) for request in requests]
+
+    def idle(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SyntheticBackend(SyntheticProvider):
+    """确定性的合成K线（带跳跃的几何布朗运动，按交易时段生成），见 synthetic_klines。"""
+
+    def idle(self):
+        pass
+
+    def close(self):
+        pass
+
+
+BACKENDS: Dict[str, Callable[[], Any]] = {
+    "tq": TqBackend,
+    "stub": StubBackend,
+    "synthetic": SyntheticBackend,
+}
+
+
+# --- 服务端 ---
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            message = recv_message(self.request)
+            if message is None:
+                return
+            header, _ = message
+            try:
+                payload = self.server.fetcher_daemon.dispatch(header)
+                send_message(self.request, {"ok": True}, payload)
+            except Exception as e:
+                send_message(self.request, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FetcherDaemon:
+    """
+    每个连接由独立线程接收，请求统一放入队列，由唯一的后端线程成批处理：
+    队列中积压的所有请求（包括 fetch_batch）去重后交给后端一次 fetch_batch，
+    同一批中相同的 (symbol, duration, start, end) 只获取一次。
+    """
+
+    def __init__(self, socket_path: str, backend_factory: Callable[[], Any], idle_interval: float = 5.0):
+        self.socket_path = socket_path
+        self.backend_factory = backend_factory
+        self.idle_interval = idle_interval
+        self._requests: "queue.Queue[Tuple[List[FetchRequest], Future]]" = queue.Queue()
+        self._stopped = threading.Event()
+        self._server: Optional[_UnixServer] = None
+        self._threads: List[threading.Thread] = []
+
+    def dispatch(self, header: Dict[str, Any]) -> bytes:
+        op = header.get('op')
+        if op == 'ping':
+            return b''
+        wire_format = header.get('format', 'binary')
+        if op == 'fetch':
+            key = (header['symbol'], header['duration'], header['start'], header['end'])
+            frame = self._submit([key])[0]
+            if wire_format == 'json':
+                return kline_codec.encode_json(frame)
+            return kline_codec.encode(frame)
+        if op == 'fetch_batch':
+            frames = self._submit([tuple(request) for request in header['requests']])
+            if wire_format == 'json':
+                return kline_codec.encode_json_batch(frames)
+            return kline_codec.encode_batch(frames)
+        raise ValueError(f"Unknown op: {op}")
+
+    def _submit(self, keys: List[FetchRequest]) -> List[pd.DataFrame]:
+        future: Future = Future()
+        self._requests.put((keys, future))
+        return future.result()
+
+    @staticmethod
+    def _fetch_all(backend, keys: List[FetchRequest]) -> Dict[FetchRequest, Any]:
+        """一次批量获取；整批失败时逐个重试，只让出错的请求失败。"""
+        try:
+            return dict(zip(keys, backend.fetch_batch(keys)))
+        except Exception:
+            if len(keys) == 1:
+                raise
+        results: Dict[FetchRequest, Any] = {}
+        for key in keys:
+            try:
+                results[key] = backend.fetch_batch([key])[0]
+            except Exception as e:
+                results[key] = e
+        return results
+
+    def _drain(self, first) -> List[Tuple[List[FetchRequest], Future]]:
+        batch = [first]
+        while True:
+            try:
+                batch.append(self._requests.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _process_requests(self):
+        backend = self.backend_factory()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    first = self._requests.get(timeout=self.idle_interval)
+                except queue.Empty:
+                    try:
+                        backend.idle()
+                    except Exception as e:
+                        print(f"Fetcher daemon: idle keepalive failed ({e}), session will be recreated.")
+                        backend.close()
+                    continue
+
+                batch = self._drain(first)
+                unique_keys = list(dict.fromkeys(key for keys, _ in batch for key in keys))
+                try:
+                    results = self._fetch_all(backend, unique_keys)
+                except Exception as e:
+                    results = {key: e for key in unique_keys}
+
+                for keys, future in batch:
+                    errors = [results[key] for key in keys if isinstance(results[key], Exception)]
+                    if errors:
+                        future.set_exception(errors[0])
+                    else:
+                        future.set_result([results[key] for key in keys])
+        finally:
+            backend.close()
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        self._server = _UnixServer(self.socket_path, _RequestHandler)
+        self._server.fetcher_daemon = self
+        self._threads = [
+            threading.Thread(target=self._process_requests, daemon=True),
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=self.idle_interval + 1)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def serve_forever(self):
+        self.start()
+        print(f"Fetcher daemon listening on {self.socket_path}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+# --- 客户端 ---
+
+class FetcherClient:
+    def __init__(self, socket_path: str, timeout: float = 300.0, wire_format: str = "binary"):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.wire_format = wire_format
+
+    def _request(self, header: Dict[str, Any]) -> bytes:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            # 先以阻塞方式连接：Unix socket 在设置超时后，backlog 满时 connect 会直接返回 EAGAIN
+            sock.connect(self.socket_path)
+            sock.settimeout(self.timeout)
+            send_message(sock, header)
+            message = recv_message(sock)
+        if message is None:
+            raise FetcherError("Fetcher daemon closed the connection.")
+        response, payload = message
+        if not response.get('ok'):
+            raise FetcherError(response.get('error', 'unknown error'))
+        return payload
+
+    def ping(self) -> bool:
+        try:
+            self._request({"op": "ping"})
+            return True
+        except OSError:
+            return False
+
+    def fetch(self, symbol: str, duration: str, start: str, end: str) -> pd.DataFrame:
+        payload = self._request({
+            "op": "fetch", "symbol": symbol, "duration": duration, "start": start, "end": end,
+            "format": self.wire_format,
+        })
+        if self.wire_format == "json":
+            return kline_codec.decode_json(payload)
+        return kline_codec.decode(payload)
+
+    def fetch_batch(self, requests: List[FetchRequest]) -> List[pd.DataFrame]:
+        """一次往返获取多组K线，服务端在同一个会话中一起订阅。"""
+        payload = self._request({
+            "op": "fetch_batch", "requests": [list(request) for request in requests], "format": self.wire_format,
+        })
+        if self.wire_format == "json":
+            return kline_codec.decode_json_batch(payload)
+        return kline_codec.decode_batch(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived TQSDK data fetcher")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="tq")
+    args = parser.parse_args()
+    FetcherDaemon(args.socket, BACKENDS[args.backend]).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
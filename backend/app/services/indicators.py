@@ -0,0 +1,158 @@
+# backend/app/services/indicators.py
+"""
+策略通过回测上下文调用的指标库：context.indicators.sma(20)、context.indicators.rsi(14) 等。
+
+指标作用于当前传给策略的K线（generate_signals 的整段数据，或 handle_data 的滚动窗口），
+返回与K线逐行对齐的 pd.Series。参数扫描期间（memoize() 作用域内）整段数据上的结果按
+(数据标识, 指标, 参数) 缓存：短均线 N 个、长均线 M 个的网格在单进程中只需计算 N+M 条均线，而不是 2·N·M 条。
+作用域结束时缓存随之清空。
+
+缓存不跨进程共享：fork 出的扫描子进程各自继承一份空缓存，P 个进程时最多计算 P·(N+M) 条。
+sweep.run_sweep 按参数取值排序后连续分批，同一条短均线的组合多在同一子进程中，实际接近 N + P·M 条。
+"""
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 当前扫描的指标缓存，None 表示不在扫描中（单次回测、实盘），不做缓存
+_memo: Optional[Dict[Hashable, np.ndarray]] = None
+_stats = {"hits": 0, "misses": 0}
+
+
+@contextmanager
+def memoize() -> Iterator[None]:
+    """在 with 块内（一次参数扫描）缓存指标结果，退出时清空；嵌套时沿用最外层的缓存。"""
+    global _memo
+    outer = _memo
+    if outer is None:
+        _memo = {}
+        _stats.update(hits=0, misses=0)
+    try:
+        yield
+    finally:
+        if outer is None:
+            _memo = None
+
+
+def cache_info() -> Dict[str, int]:
+    """当前作用域（或上一个作用域）的命中、计算次数和缓存条数。"""
+    return {**_stats, "entries": len(_memo) if _memo is not None else 0}
+
+
+def _true_range(frame: pd.DataFrame) -> pd.Series:
+    prev_close = frame['close'].shift(1)
+    return pd.concat([
+        frame['high'] - frame['low'],
+        (frame['high'] - prev_close).abs(),
+        (frame['low'] - prev_close).abs(),
+    ], axis=1).max(axis=1)
+
+
+def _wilder(series: pd.Series, window: int) -> pd.Series:
+    """Wilder 平滑：以前 window 个有效值的均值为起点，之后按 alpha = 1/window 递推；起点之前为 NaN。"""
+    values = series.to_numpy(dtype=np.float64, copy=True)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) < window:
+        return pd.Series(np.nan, index=series.index)
+    seed = valid[0] + window - 1
+    values[seed] = values[valid[0]:seed + 1].mean()
+    values[:seed] = np.nan
+    return pd.Series(values, index=series.index).ewm(alpha=1.0 / window, adjust=False).mean()
+
+
+def sma(frame: pd.DataFrame, window: int, column: str = 'close') -> pd.Series:
+    return frame[column].rolling(window=window).mean()
+
+
+def ema(frame: pd.DataFrame, span: int, column: str = 'close') -> pd.Series:
+    return frame[column].ewm(span=span, adjust=False).mean()
+
+
+def atr(frame: pd.DataFrame, window: int = 14) -> pd.Series:
+    return _wilder(_true_range(frame), window)
+
+
+def rsi(frame: pd.DataFrame, window: int = 14, column: str = 'close') -> pd.Series:
+    change = frame[column].diff()
+    gain = _wilder(change.clip(lower=0.0), window)
+    loss = _wilder(-change.clip(upper=0.0), window)
+    # 区间内没有下跌时 RSI 为 100
+    return (100.0 - 100.0 / (1.0 + gain / loss)).where(loss != 0, 100.0).where(gain.notna())
+
+
+def bollinger(frame: pd.DataFrame, window: int = 20, num_std: float = 2.0,
+              column: str = 'close') -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """(中轨, 上轨, 下轨)；标准差按总体标准差（ddof=0）计算。"""
+    rolling = frame[column].rolling(window=window)
+    middle, std = rolling.mean(), rolling.std(ddof=0)
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+def rolling_max(frame: pd.DataFrame, window: int, column: str = 'close') -> pd.Series:
+    return frame[column].rolling(window=window).max()
+
+
+def rolling_min(frame: pd.DataFrame, window: int, column: str = 'close') -> pd.Series:
+    return frame[column].rolling(window=window).min()
+
+
+class Indicators:
+    """
+    绑定到一段K线的指标入口（即 context.indicators）。key 标识整段数据（如合约、周期、首尾时间和长度），
+    只有带 key 的绑定才会在扫描期间使用缓存；handle_data 的滚动窗口每根 bar 都不同，绑定时不带 key。
+    """
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None, key: Optional[Hashable] = None):
+        self.bind(frame, key)
+
+    def bind(self, frame: Optional[pd.DataFrame], key: Optional[Hashable] = None) -> 'Indicators':
+        self.frame = frame
+        self.key = key
+        return self
+
+    def _series(self, name: str, compute, *params) -> Tuple[pd.Series, ...]:
+        if self.frame is None:
+            raise RuntimeError("Indicators are not bound to any kline data.")
+        cache_key = (self.key, name, params)
+        use_memo = _memo is not None and self.key is not None
+        if use_memo and cache_key in _memo:
+            _stats["hits"] += 1
+            values = _memo[cache_key]
+        else:
+            result = compute(self.frame, *params)
+            result = result if isinstance(result, tuple) else (result,)
+            values = tuple(series.to_numpy(dtype=np.float64) for series in result)
+            if use_memo:
+                _stats["misses"] += 1
+                for array in values:
+                    # 缓存的数组在各组参数间共享，设为只读以免被意外修改
+                    array.flags.writeable = False
+                _memo[cache_key] = values
+        if use_memo:
+            # 策略拿到可写的副本（例如 fillna(inplace=True)），行为与不缓存时一致
+            values = tuple(array.copy() for array in values)
+        return tuple(pd.Series(array, index=self.frame.index) for array in values)
+
+    def sma(self, window: int, column: str = 'close') -> pd.Series:
+        return self._series('sma', sma, int(window), column)[0]
+
+    def ema(self, span: int, column: str = 'close') -> pd.Series:
+        return self._series('ema', ema, int(span), column)[0]
+
+    def atr(self, window: int = 14) -> pd.Series:
+        return self._series('atr', atr, int(window))[0]
+
+    def rsi(self, window: int = 14, column: str = 'close') -> pd.Series:
+        return self._series('rsi', rsi, int(window), column)[0]
+
+    def bollinger(self, window: int = 20, num_std: float = 2.0,
+                  column: str = 'close') -> Tuple[pd.Series, pd.Series, pd.Series]:
+        return self._series('bollinger', bollinger, int(window), float(num_std), column)
+
+    def rolling_max(self, window: int, column: str = 'close') -> pd.Series:
+        return self._series('rolling_max', rolling_max, int(window), column)[0]
+
+    def rolling_min(self, window: int, column: str = 'close') -> pd.Series:
+        return self._series('rolling_min', rolling_min, int(window), column)[0]
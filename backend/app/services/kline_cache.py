@@ -0,0 +1,95 @@
+# backend/app/services/kline_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from app.services.kline_store import slice_by_dates
+
+CacheKey = Tuple[str, str, str, str]  # (symbol, duration, start_date, end_date)
+
+
+def frame_nbytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class KlineCache:
+    """
+    进程内的K线 LRU 缓存，按占用字节数淘汰。
+
+    请求的日期区间落在某个已缓存的更宽区间内时，直接按日期切片返回，同样计为命中。
+    hits / misses / evictions 计数用于评估每个 worker 的缓存大小。
+    包含当天的区间数据仍在变化，可以用 ttl 让它们按时间过期。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[pd.DataFrame, int, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, symbol: str, duration: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        key = (symbol, duration, start_date, end_date)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            for cached_key, (frame, _, _) in self._entries.items():
+                cached_symbol, cached_duration, cached_start, cached_end = cached_key
+                if (cached_symbol, cached_duration) == (symbol, duration) \
+                        and cached_start <= start_date and end_date <= cached_end:
+                    self._entries.move_to_end(cached_key)
+                    self.hits += 1
+                    return slice_by_dates(frame, start_date, end_date).reset_index(drop=True)
+
+            self.misses += 1
+            return None
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            self._bytes -= self._entries.pop(key)[1]
+
+    def put(self, symbol: str, duration: str, start_date: str, end_date: str, frame: pd.DataFrame,
+            ttl: Optional[float] = None):
+        size = frame_nbytes(frame)
+        if size > self.max_bytes:
+            return
+        key = (symbol, duration, start_date, end_date)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            while self._entries and self._bytes + size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (frame, size, time.monotonic() + ttl if ttl is not None else None)
+            self._bytes += size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
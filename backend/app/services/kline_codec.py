@@ -0,0 +1,128 @@
+# backend/app/services/kline_codec.py
+import json
+import struct
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+# 二进制列式格式（data_fetcher 与 DataService / 获取服务之间的传输格式）：
+#   MAGIC | uint32 头长度 | JSON 头 | 对齐填充 | 各列原始字节（每列按 8 字节对齐）
+# JSON 头: {"rows": n, "columns": [{"name", "dtype", "offset"}]}，offset 相对数据区起点。
+# 读取端直接 np.frombuffer 得到每一列，不需要逐行解析。
+MAGIC = b'QTKLINE1'
+_LENGTH = struct.Struct('<I')
+
+# 批量格式：BATCH_MAGIC | uint32 帧数 | 每帧 uint64 字节数 | 依次拼接的单帧 payload（空 DataFrame 的长度为 0）
+BATCH_MAGIC = b'QTKBATCH'
+_FRAME_SIZE = struct.Struct('<Q')
+_ALIGN = 8
+
+WIRE_FORMATS = ("binary", "json")
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGN
+
+
+def encode(frame: pd.DataFrame) -> bytes:
+    """
+    把K线编码为列式二进制。只保留数值列（tqsdk 返回的 symbol 等字符串列会被丢弃），
+    datetime 应为 int64 epoch 纳秒。
+    """
+    columns = []
+    buffers = []
+    offset = 0
+    for name in frame.columns:
+        values = frame[name].to_numpy()
+        if values.dtype.kind not in 'iufb':
+            continue
+        values = np.ascontiguousarray(values)
+        data = values.tobytes()
+        columns.append({"name": str(name), "dtype": values.dtype.str, "offset": offset})
+        buffers.append(data + b'\0' * _padding(len(data)))
+        offset += len(data) + _padding(len(data))
+
+    header = json.dumps({"rows": len(frame), "columns": columns}).encode('utf-8')
+    prefix = MAGIC + _LENGTH.pack(len(header)) + header
+    return prefix + b'\0' * _padding(len(prefix)) + b''.join(buffers)
+
+
+def decode_columns(buffer) -> Dict[str, np.ndarray]:
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a binary kline payload.")
+    header_start = len(MAGIC) + _LENGTH.size
+    header_size = _LENGTH.unpack(bytes(buffer[len(MAGIC):header_start]))[0]
+    header = json.loads(bytes(buffer[header_start:header_start + header_size]))
+    data_start = header_start + header_size
+    data_start += _padding(data_start)
+    return {
+        column["name"]: np.frombuffer(buffer, dtype=np.dtype(column["dtype"]), count=header["rows"],
+                                      offset=data_start + column["offset"])
+        for column in header["columns"]
+    }
+
+
+def decode(payload: bytes) -> pd.DataFrame:
+    if not payload:
+        return pd.DataFrame()
+    return pd.DataFrame(decode_columns(payload))
+
+
+def encode_batch(frames: List[pd.DataFrame]) -> bytes:
+    payloads = [encode(frame) if not frame.empty else b'' for frame in frames]
+    sizes = b''.join(_FRAME_SIZE.pack(len(payload)) for payload in payloads)
+    return BATCH_MAGIC + _LENGTH.pack(len(payloads)) + sizes + b''.join(payloads)
+
+
+def decode_batch(payload: bytes) -> List[pd.DataFrame]:
+    if payload[:len(BATCH_MAGIC)] != BATCH_MAGIC:
+        raise ValueError("Not a binary kline batch payload.")
+    count = _LENGTH.unpack_from(payload, len(BATCH_MAGIC))[0]
+    offset = len(BATCH_MAGIC) + _LENGTH.size
+    sizes = [_FRAME_SIZE.unpack_from(payload, offset + i * _FRAME_SIZE.size)[0] for i in range(count)]
+    offset += count * _FRAME_SIZE.size
+    frames = []
+    for size in sizes:
+        frames.append(decode(payload[offset:offset + size]))
+        offset += size
+    return frames
+
+
+def is_binary(payload: bytes) -> bool:
+    return payload[:len(MAGIC)] == MAGIC
+
+
+def write_file(frame: pd.DataFrame, path: Union[str, Path]):
+    with open(path, 'wb') as f:
+        f.write(encode(frame))
+
+
+def read_file(path: Union[str, Path]) -> pd.DataFrame:
+    """内存映射读取文件，各列一次性拷贝进 DataFrame，之后即可删除文件。"""
+    if Path(path).stat().st_size == 0:
+        return pd.DataFrame()
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    try:
+        return pd.DataFrame({name: np.array(values) for name, values in decode_columns(mapped).items()})
+    finally:
+        del mapped
+
+
+def encode_json(frame: pd.DataFrame) -> bytes:
+    """JSON 兜底格式，与旧版 data_fetcher 的输出兼容。"""
+    return frame.to_json(orient='records').encode('utf-8')
+
+
+def decode_json(payload: Union[bytes, str]) -> pd.DataFrame:
+    data = json.loads(payload) if payload else []
+    return pd.DataFrame(data)
+
+
+def encode_json_batch(frames: List[pd.DataFrame]) -> bytes:
+    return ('[' + ','.join(frame.to_json(orient='records') for frame in frames) + ']').encode('utf-8')
+
+
+def decode_json_batch(payload: Union[bytes, str]) -> List[pd.DataFrame]:
+    return [pd.DataFrame(records) for records in json.loads(payload)]
@@ -0,0 +1,182 @@
+# backend/app/services/kline_store.py
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.trading_calendar import (
+    SHANGHAI_OFFSET_NS, format_date, parse_date, shanghai_date_bounds_ns,
+)
+
+# 原始K线统一使用的列：datetime 为 UTC epoch 纳秒 (int64)
+KLINE_COLUMNS = ['datetime', 'open', 'high', 'low', 'close', 'volume']
+KLINE_DTYPES = {
+    'datetime': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+
+DateRange = Tuple[str, str]
+
+# 内部统一使用 int64 时间戳，只在 API / 持久化边界格式化为字符串（UTC，与历史数据一致）
+TRADE_DATE_FORMAT = '%Y%m%d %H:%M:%S'
+
+
+def format_timestamps(timestamps) -> np.ndarray:
+    """
+    UTC epoch 纳秒 -> TRADE_DATE_FORMAT（'YYYYMMDD HH:MM:SS'）字符串数组。
+    由 NumPy 生成 ISO 格式后按字符位置重排，比 pandas strftime 快一个数量级（加载回测报告时每根 bar 都要格式化）。
+    """
+    iso = np.datetime_as_string(np.asarray(timestamps, dtype=np.int64).astype('datetime64[ns]'), unit='s')
+    chars = iso.astype('<U19').view(np.uint32).reshape(len(iso), 19)  # 'YYYY-MM-DDTHH:MM:SS'
+    formatted = np.empty((len(iso), 17), dtype=np.uint32)
+    formatted[:, 0:4] = chars[:, 0:4]
+    formatted[:, 4:6] = chars[:, 5:7]
+    formatted[:, 6:8] = chars[:, 8:10]
+    formatted[:, 8] = ord(' ')
+    formatted[:, 9:17] = chars[:, 11:19]
+    return formatted.view('<U17').ravel()
+
+
+def parse_timestamps(values) -> np.ndarray:
+    """日期字符串 -> UTC epoch 纳秒；优先按 TRADE_DATE_FORMAT 解析，其它格式交给 pandas 推断。"""
+    try:
+        parsed = pd.to_datetime(values, format=TRADE_DATE_FORMAT)
+    except ValueError:
+        parsed = pd.to_datetime(values)
+    return pd.DatetimeIndex(parsed).as_unit('ns').asi8
+
+
+def slice_by_dates(frame: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+    """按北京时间日期截取已按 datetime 排序的K线，只需两次二分查找。"""
+    lo, hi = shanghai_date_bounds_ns(start_date, end_date)
+    timestamps = frame['datetime'].to_numpy()
+    left, right = np.searchsorted(timestamps, [lo, hi], side='left')
+    return frame.iloc[left:right]
+
+
+def normalize_klines(frame: pd.DataFrame) -> pd.DataFrame:
+    """整理为标准列、类型，按时间排序并去重。"""
+    frame = frame[KLINE_COLUMNS].astype(KLINE_DTYPES)
+    frame = frame.drop_duplicates(subset='datetime', keep='last').sort_values('datetime')
+    return frame.reset_index(drop=True)
+
+
+def _merge_ranges(ranges: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    merged: List[Tuple[date, date]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class KlineStore:
+    """
+    本地K线列式存储：<root>/<symbol>/<duration>/<YYYY-MM>.parquet，按北京时间月份分区。
+
+    每个 (symbol, duration) 目录下的 _coverage.json 记录已完整下载过的日期区间，
+    DataService 据此只向数据源请求缺失的日期段。当天及以后的数据可能尚未收盘，
+    写入后不会标记为已覆盖，下次请求时会重新补齐。
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def check_writable(self):
+        """创建存储目录并确认可写，否则抛出 OSError（启动时调用，避免之后每次写入都失败）。"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not os.access(self.root, os.W_OK | os.X_OK):
+            raise PermissionError(f"Kline store directory {self.root} is not writable.")
+
+    def _dir(self, symbol: str, duration: str) -> Path:
+        return self.root / symbol / duration
+
+    @contextmanager
+    def _lock(self, symbol: str, duration: str):
+        directory = self._dir(symbol, duration)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield directory
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _atomic_write(path: Path, write):
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _load_coverage(self, symbol: str, duration: str) -> List[Tuple[date, date]]:
+        path = self._dir(symbol, duration) / '_coverage.json'
+        if not path.exists():
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [(parse_date(start), parse_date(end)) for start, end in json.load(f)]
+
+    def coverage(self, symbol: str, duration: str) -> List[DateRange]:
+        return [(format_date(start), format_date(end)) for start, end in self._load_coverage(symbol, duration)]
+
+    def missing_ranges(self, symbol: str, duration: str, start_date: str, end_date: str) -> List[DateRange]:
+        """返回 [start_date, end_date] 中尚未下载过的日期区间。"""
+        start, end = parse_date(start_date), parse_date(end_date)
+        missing = []
+        cursor = start
+        for covered_start, covered_end in self._load_coverage(symbol, duration):
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start - timedelta(days=1)))
+            cursor = covered_end + timedelta(days=1)
+            if cursor > end:
+                break
+        if cursor <= end:
+            missing.append((cursor, end))
+        return [(format_date(a), format_date(b)) for a, b in missing]
+
+    def _partitions(self, symbol: str, duration: str, start_date: str, end_date: str) -> List[Path]:
+        directory = self._dir(symbol, duration)
+        months = pd.period_range(parse_date(start_date), parse_date(end_date), freq='M')
+        return [directory / f"{month.strftime('%Y-%m')}.parquet" for month in months]
+
+    def read(self, symbol: str, duration: str, start_date: str, end_date: str) -> pd.DataFrame:
+        frames = [pd.read_parquet(path) for path in self._partitions(symbol, duration, start_date, end_date) if path.exists()]
+        if not frames:
+            return pd.DataFrame(columns=KLINE_COLUMNS).astype(KLINE_DTYPES)
+        frame = pd.concat(frames, ignore_index=True)
+        return slice_by_dates(frame, start_date, end_date).reset_index(drop=True)
+
+    def write(self, symbol: str, duration: str, frame: pd.DataFrame, start_date: str, end_date: str):
+        """合并写入 [start_date, end_date] 的K线，并把该区间（不含今天及以后）标记为已覆盖。"""
+        frame = normalize_klines(frame)
+        with self._lock(symbol, duration) as directory:
+            if not frame.empty:
+                shanghai_month = (frame['datetime'].to_numpy() + SHANGHAI_OFFSET_NS).astype('datetime64[ns]').astype('datetime64[M]')
+                for month in np.unique(shanghai_month):
+                    path = directory / f"{np.datetime_as_string(month, unit='M')}.parquet"
+                    part = frame[shanghai_month == month]
+                    if path.exists():
+                        part = normalize_klines(pd.concat([pd.read_parquet(path), part], ignore_index=True))
+                    self._atomic_write(path, lambda tmp, part=part: part.to_parquet(tmp, index=False))
+
+            today = (datetime.utcnow() + timedelta(hours=8)).date()
+            complete_end = min(parse_date(end_date), today - timedelta(days=1))
+            start = parse_date(start_date)
+            if start <= complete_end:
+                ranges = _merge_ranges(self._load_coverage(symbol, duration) + [(start, complete_end)])
+                payload = json.dumps([[format_date(a), format_date(b)] for a, b in ranges])
+                self._atomic_write(directory / '_coverage.json', lambda tmp: tmp.write_text(payload, encoding='utf-8'))
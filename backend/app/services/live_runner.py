@@ -13,6 +13,9 @@ from tqsdk import TqApi, TqAuth, TqSim
 from tqsdk.objs import Quote
 
 from app.core.config import TQ_USER, TQ_PASSWORD
+from app.services.bar_window import BarWindow
+from app.services.indicators import Indicators
+from app.services.strategy_base import uses_trade_date, with_trade_date
 from app.services.websocket_manager import manager
 
 LIVE_RUNNERS = {}
@@ -24,6 +27,8 @@ class LiveContext:
         self.strategy = strategy_instance
         self.symbol = self.strategy.symbol
         self._main_loop = main_loop
+        # 与回测相同的指标入口，每根新 bar 绑定到当前滚动窗口
+        self.indicators = Indicators()
 
     def get_quote(self):
         return self._api.get_quote(self.symbol)
@@ -97,6 +102,16 @@ class LiveRunner:
             self._main_loop.call_soon_threadsafe(self.context._schedule_broadcast, log_data)
             self._is_running = False
 
+    def _format_klines(self, klines: pd.DataFrame) -> pd.DataFrame:
+        df_klines = pd.DataFrame(klines)
+        df_klines.rename(columns={'vol': 'volume'}, inplace=True)
+        df_klines = df_klines[df_klines['datetime'].notna()].copy()
+        df_klines['datetime'] = df_klines['datetime'].astype('int64')
+        # 只有仍读取 trade_date 的旧策略才需要字符串时间列
+        if uses_trade_date(self.strategy_code):
+            df_klines = with_trade_date(df_klines)
+        return df_klines
+
     def _run_loop(self):
         self.api = TqApi(TqSim(), auth=TqAuth(TQ_USER, TQ_PASSWORD))
         self._load_strategy()
@@ -105,9 +120,10 @@ class LiveRunner:
             return
             
         symbol = self.strategy_instance.symbol
-        long_window = getattr(self.strategy_instance, 'long_window', 60)
+        lookback = self.strategy_instance.lookback
         
-        klines = self.api.get_kline_serial(symbol, duration_seconds=60, data_length=long_window + 5)
+        klines = self.api.get_kline_serial(symbol, duration_seconds=60, data_length=lookback + 5)
+        window = None
         account = self.api.get_account()
         position = self.context.get_position()
         quote = self.context.get_quote()
@@ -142,12 +158,21 @@ class LiveRunner:
                     self.context.log(f"Tick received. Last price: {quote.last_price}")
 
                 if self.api.is_changing(klines.iloc[-1], "datetime"):
-                    df_klines = pd.DataFrame(klines)
-                    df_klines.rename(columns={'vol': 'volume'}, inplace=True)
-                    df_klines['trade_date'] = df_klines['datetime'].apply(lambda x: datetime.fromtimestamp(x / 1e9).strftime('%Y%m%d %H:%M:%S'))
+                    if window is None:
+                        window = BarWindow.from_frame(self._format_klines(klines), lookback)
+                    else:
+                        # 与回测共用同一种滚动窗口：更新刚走完的 bar，并追加新 bar
+                        tail = self._format_klines(klines.iloc[-2:])
+                        for row in tail[window.columns].itertuples(index=False):
+                            if row.datetime == window.last('datetime'):
+                                window.replace_last(row)
+                            elif row.datetime > window.last('datetime'):
+                                window.push(row)
                     
                     self.context.log(f"New 1-min K-line received. Running handle_data...")
-                    signals = self.strategy_instance.handle_data(df_klines)
+                    frame = window.frame()
+                    self.context.indicators.bind(frame)
+                    signals = self.strategy_instance.handle_data(frame)
                     if signals:
                         for signal in signals:
                              current_position = self.context.get_position()
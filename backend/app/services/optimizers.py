@@ -0,0 +1,237 @@
+# backend/app/services/optimizers.py
+"""
+参数优化的搜索策略：网格、随机采样、TPE（Tree-structured Parzen Estimator）序贯搜索、
+以及在逐步增长的日期窗口上做逐次减半（successive halving）。
+
+参数空间与网格搜索相同，由 [{'name', 'start', 'end', 'step'}] 离散为每个参数的取值列表；
+各搜索策略只在这些取值上选点，并以评估次数为预算。求值通过批量求值函数完成，
+每一批在扫描模式的进程池中并行执行。目标是最大化夏普比率，失败或无效的结果视为最差。
+"""
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.services.sweep import ParamSpace, grid_params
+
+# 批量求值: (参数组列表, 使用的K线比例 0~1] -> 与参数组一一对应的结果字典
+BatchEvaluator = Callable[[List[Dict[str, Any]], float], List[Dict[str, Any]]]
+
+# 参数空间中的点：每个参数取值的下标
+Point = Tuple[int, ...]
+
+# 参数组合数不超过该值时直接对全部组合做随机排列，否则用拒绝采样
+_ENUMERATE_LIMIT = 1_000_000
+
+
+def score(result: Dict[str, Any]) -> float:
+    """优化目标：成功回测的夏普比率；失败或夏普比率无效时为 -inf。"""
+    if result.get("status") != "SUCCESS":
+        return -math.inf
+    value = result.get("summary", {}).get("sharpe_ratio")
+    if value is None or not math.isfinite(value):
+        return -math.inf
+    return float(value)
+
+
+def sample_points(rng: np.random.Generator, sizes: Sequence[int], count: int,
+                  exclude: Optional[Set[Point]] = None) -> List[Point]:
+    """不放回地随机抽取 count 个不在 exclude 中的点；可选的点不足时返回全部剩余点。"""
+    seen = set(exclude or ())
+    total = math.prod(sizes)
+    count = max(0, min(count, total - len(seen)))
+    points: List[Point] = []
+    if total <= _ENUMERATE_LIMIT:
+        for flat in rng.permutation(total):
+            if len(points) >= count:
+                break
+            point = tuple(int(i) for i in np.unravel_index(flat, sizes))
+            if point not in seen:
+                seen.add(point)
+                points.append(point)
+        return points
+    while len(points) < count:
+        point = tuple(int(rng.integers(size)) for size in sizes)
+        if point not in seen:
+            seen.add(point)
+            points.append(point)
+    return points
+
+
+class Optimizer(ABC):
+    """搜索策略的基类。planned_results() 是 run() 返回的结果数，用于预先创建结果行。"""
+
+    def __init__(self, space: ParamSpace):
+        self.space = space
+        self.sizes = [len(values) for _, values in space]
+
+    def params(self, point: Point) -> Dict[str, Any]:
+        return {name: values[i] for (name, values), i in zip(self.space, point)}
+
+    @abstractmethod
+    def planned_results(self) -> int:
+        pass
+
+    @abstractmethod
+    def run(self, evaluate: BatchEvaluator) -> List[Dict[str, Any]]:
+        pass
+
+
+class GridSearch(Optimizer):
+    """穷举全部参数组合（原有的网格搜索）。"""
+
+    def __init__(self, space: ParamSpace):
+        super().__init__(space)
+        self.param_sets = grid_params(space)
+
+    def planned_results(self) -> int:
+        return len(self.param_sets)
+
+    def run(self, evaluate: BatchEvaluator) -> List[Dict[str, Any]]:
+        return evaluate(self.param_sets, 1.0)
+
+
+class RandomSearch(Optimizer):
+    """在网格上不放回地随机抽取 budget 组参数，一批并行求值。"""
+
+    def __init__(self, space: ParamSpace, budget: int, seed: Optional[int] = None):
+        super().__init__(space)
+        self.budget = min(budget, math.prod(self.sizes))
+        self.rng = np.random.default_rng(seed)
+
+    def planned_results(self) -> int:
+        return self.budget
+
+    def run(self, evaluate: BatchEvaluator) -> List[Dict[str, Any]]:
+        points = sample_points(self.rng, self.sizes, self.budget)
+        return evaluate([self.params(point) for point in points], 1.0)
+
+
+def _parzen(indices: np.ndarray, size: int) -> np.ndarray:
+    """取值下标上的离散 Parzen 密度：均匀先验（相当于一个观测）加上每个观测处的高斯核。"""
+    density = np.full(size, 1.0 / size)
+    if len(indices):
+        bandwidth = max(1.0, size / 8)
+        grid = np.arange(size)
+        kernels = np.exp(-0.5 * ((grid[None, :] - indices[:, None]) / bandwidth) ** 2)
+        density = density + (kernels / kernels.sum(axis=1, keepdims=True)).sum(axis=0)
+    return density / density.sum()
+
+
+class TPESearch(Optimizer):
+    """
+    TPE 序贯搜索：先随机求值若干组，之后每一轮按夏普比率把已有观测分为较好的前 gamma 和其余部分，
+    在各参数上分别估计两者的 Parzen 密度 l(x)、g(x)，从 l 中抽取候选点并选出 l/g 最大且未求值过的点。
+    每轮提出 batch_size 组参数，以便在进程池中并行求值。随机求值的组数不超过预算的 startup_fraction，
+    CPU 数接近或超过预算时也留有序贯搜索的轮次。
+    """
+    gamma = 0.25
+    candidates_per_point = 24
+    startup_fraction = 0.3
+
+    def __init__(self, space: ParamSpace, budget: int, seed: Optional[int] = None, batch_size: int = 1):
+        super().__init__(space)
+        self.budget = min(budget, math.prod(self.sizes))
+        self.batch_size = max(1, batch_size)
+        self.startup = min(max(10, self.batch_size), max(1, int(self.budget * self.startup_fraction)))
+        self.rng = np.random.default_rng(seed)
+
+    def planned_results(self) -> int:
+        return self.budget
+
+    def _propose(self, points: List[Point], scores: List[float], count: int) -> List[Point]:
+        observed = np.array(points)
+        order = np.argsort(-np.array(scores), kind="stable")
+        n_good = max(1, math.ceil(self.gamma * len(points)))
+        good, bad = observed[order[:n_good]], observed[order[n_good:]]
+
+        n_candidates = self.candidates_per_point * count
+        candidates = np.empty((n_candidates, len(self.sizes)), dtype=np.int64)
+        log_ratio = np.zeros(n_candidates)
+        for dim, size in enumerate(self.sizes):
+            good_density = _parzen(good[:, dim], size)
+            bad_density = _parzen(bad[:, dim], size)
+            candidates[:, dim] = self.rng.choice(size, size=n_candidates, p=good_density)
+            log_ratio += np.log(good_density[candidates[:, dim]]) - np.log(bad_density[candidates[:, dim]])
+
+        visited = set(points)
+        proposals: List[Point] = []
+        for index in np.argsort(-log_ratio, kind="stable"):
+            point = tuple(int(i) for i in candidates[index])
+            if point not in visited:
+                visited.add(point)
+                proposals.append(point)
+                if len(proposals) == count:
+                    return proposals
+        # 候选点都已求值过（空间较小或已收敛）时用随机点补足
+        return proposals + sample_points(self.rng, self.sizes, count - len(proposals), visited)
+
+    def run(self, evaluate: BatchEvaluator) -> List[Dict[str, Any]]:
+        points: List[Point] = []
+        scores: List[float] = []
+        results: List[Dict[str, Any]] = []
+        while len(results) < self.budget:
+            if len(points) < self.startup:
+                batch = sample_points(self.rng, self.sizes, min(self.batch_size, self.startup - len(points)), set(points))
+            else:
+                batch = self._propose(points, scores, min(self.batch_size, self.budget - len(points)))
+            batch_results = evaluate([self.params(point) for point in batch], 1.0)
+            points.extend(batch)
+            scores.extend(score(result) for result in batch_results)
+            results.extend(batch_results)
+        return results
+
+
+class SuccessiveHalving(Optimizer):
+    """
+    逐次减半：随机抽取 n 组参数，先在日期区间开头 1/eta^(rungs-1) 的K线上求值，保留最好的 1/eta，
+    再在 eta 倍长的窗口上求值，直到最后一轮在完整区间上求值。各轮的求值次数之和不超过 budget
+    （预算少于 rungs 时减少轮数）；只有最后一轮（完整区间）的结果会被返回和记录。
+    """
+
+    def __init__(self, space: ParamSpace, budget: int, seed: Optional[int] = None, eta: int = 3, rungs: int = 3):
+        super().__init__(space)
+        self.eta = eta
+        # 每轮至少求值一次，预算不足时减少轮数
+        self.rungs = max(1, min(rungs, budget))
+        self.rng = np.random.default_rng(seed)
+        # 在预算内能负担的最多初始参数组数
+        initial = min(budget, math.prod(self.sizes))
+        while initial > 1 and sum(self._rung_sizes(initial)) > budget:
+            initial -= 1
+        self.initial = initial
+
+    def _rung_sizes(self, initial: int) -> List[int]:
+        return [max(1, initial // self.eta ** rung) for rung in range(self.rungs)]
+
+    def fractions(self) -> List[float]:
+        return [float(self.eta) ** -(self.rungs - 1 - rung) for rung in range(self.rungs)]
+
+    def planned_results(self) -> int:
+        return self._rung_sizes(self.initial)[-1]
+
+    def run(self, evaluate: BatchEvaluator) -> List[Dict[str, Any]]:
+        sizes = self._rung_sizes(self.initial)
+        points = sample_points(self.rng, self.sizes, self.initial)
+        for rung, fraction in enumerate(self.fractions()):
+            results = evaluate([self.params(point) for point in points], fraction)
+            if rung == self.rungs - 1:
+                return results
+            order = np.argsort(-np.array([score(result) for result in results]), kind="stable")
+            points = [points[i] for i in order[:sizes[rung + 1]]]
+        return []
+
+
+def create_optimizer(method: str, space: ParamSpace, budget: int, seed: Optional[int] = None,
+                     batch_size: int = 1) -> Optimizer:
+    """按 OptimizationMethod 的取值创建搜索策略；网格搜索忽略 budget。"""
+    if method == "grid":
+        return GridSearch(space)
+    if method == "random":
+        return RandomSearch(space, budget, seed)
+    if method == "tpe":
+        return TPESearch(space, budget, seed, batch_size)
+    if method == "halving":
+        return SuccessiveHalving(space, budget, seed)
+    raise ValueError(f"Unknown optimization method: {method}")
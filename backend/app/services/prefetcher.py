@@ -0,0 +1,124 @@
+# backend/app/services/prefetcher.py
+import re
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.schemas.backtest import KlineDuration
+
+_SYMBOL_PATTERN = re.compile(r"""self\.symbol\s*=\s*['"]([^'"]+)['"]""")
+
+# 实盘 LiveRunner 使用 1 分钟K线
+LIVE_DURATION = KlineDuration.one_minute.value
+
+
+@dataclass
+class PrefetchTarget:
+    symbol: str
+    duration: str
+    start_date: str
+    end_date: str
+    from_strategy: bool = False
+    backtests: int = 0
+
+
+def strategy_symbol(script: str) -> Optional[str]:
+    """从策略脚本中找出 initialize 里设置的 self.symbol。"""
+    match = _SYMBOL_PATTERN.search(script or "")
+    return match.group(1) if match else None
+
+
+def plan_targets(strategy_scripts: Iterable[str], backtests: Iterable[Tuple[str, str, datetime]],
+                 today: date, history_days: int) -> List[PrefetchTarget]:
+    """
+    根据活跃策略的合约和近期回测用到的 (symbol, duration, start_dt) 决定要预热的K线。
+
+    每个 (symbol, duration) 补齐到昨天：近期回测取其中最早的开始日期，只出现在策略里的合约
+    按 history_days 预热 1m。活跃策略用到的合约排在前面，其余按回测次数排序，预算不足时优先保留。
+    """
+    end = today - timedelta(days=1)
+    default_start = today - timedelta(days=history_days)
+    targets: Dict[Tuple[str, str], PrefetchTarget] = {}
+
+    for symbol, duration, start_dt in backtests:
+        key = (symbol, duration)
+        start = min(start_dt.date(), end)
+        target = targets.get(key)
+        if target is None:
+            target = targets[key] = PrefetchTarget(symbol, duration, start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+        target.start_date = min(target.start_date, start.strftime('%Y%m%d'))
+        target.backtests += 1
+
+    live_symbols = {symbol for symbol in map(strategy_symbol, strategy_scripts) if symbol}
+    for symbol in live_symbols:
+        key = (symbol, LIVE_DURATION)
+        if key not in targets:
+            targets[key] = PrefetchTarget(symbol, LIVE_DURATION, default_start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+    for target in targets.values():
+        target.from_strategy = target.symbol in live_symbols
+
+    return sorted(targets.values(), key=lambda t: (not t.from_strategy, -t.backtests, t.symbol, t.duration))
+
+
+def warm(service, targets: List[PrefetchTarget], max_symbols: int, max_bytes: int,
+         batch_size: int = 10) -> Dict[str, Any]:
+    """
+    把目标K线补齐到本地存储。每 batch_size 个目标合并为一次批量获取（同一个 TqApi 会话）。
+    合约数超出预算的目标不预热；获取前按交易日历估算每个目标的下载量，会超出字节预算的目标跳过
+    （之后更小的目标仍可预热）。
+    返回预热报告：每个目标实际下载的区间、行数、字节数（只计新下载的部分）和所在批次的耗时。
+    """
+    report: Dict[str, Any] = {
+        "started_at": datetime.utcnow().isoformat(),
+        "warmed": [], "skipped": [], "failed": [],
+        "symbols": 0, "bytes": 0,
+    }
+    selected: List[PrefetchTarget] = []
+    planned_symbols = set()
+    planned_bytes = 0
+    for target in targets:
+        if target.symbol not in planned_symbols and len(planned_symbols) >= max_symbols:
+            report["skipped"].append({**asdict(target), "reason": "symbol budget"})
+            continue
+        estimate = service.estimate_prefetch(target.symbol, KlineDuration(target.duration),
+                                             target.start_date, target.end_date)
+        if planned_bytes + estimate > max_bytes:
+            report["skipped"].append({**asdict(target), "reason": "byte budget", "estimated_bytes": estimate})
+            continue
+        planned_symbols.add(target.symbol)
+        planned_bytes += estimate
+        selected.append(target)
+
+    symbols = set()
+    for offset in range(0, len(selected), batch_size):
+        chunk = selected[offset:offset + batch_size]
+        started = time.perf_counter()
+        for target, result in zip(chunk, _prefetch_chunk(service, chunk)):
+            entry = asdict(target)
+            if isinstance(result, Exception):
+                report["failed"].append({**entry, "error": str(result)})
+                continue
+            symbols.add(target.symbol)
+            report["bytes"] += result["bytes"]
+            report["warmed"].append({**entry, **result, "seconds": round(time.perf_counter() - started, 3)})
+
+    report["symbols"] = len(symbols)
+    return report
+
+
+def _prefetch_chunk(service, chunk: List[PrefetchTarget]) -> List[Any]:
+    """整批预热；整批失败时逐个重试，只记录出错的目标。"""
+    requests = [(t.symbol, KlineDuration(t.duration), t.start_date, t.end_date) for t in chunk]
+    try:
+        return service.prefetch_batch(requests)
+    except Exception as e:
+        if len(requests) == 1:
+            return [e]
+    results: List[Any] = []
+    for request in requests:
+        try:
+            results.append(service.prefetch_batch([request])[0])
+        except Exception as e:
+            results.append(e)
+    return results
@@ -0,0 +1,171 @@
+# backend/app/services/progress.py
+"""
+运行中回测的进度推送：Celery worker 中的 SimpleBacktester 通过 ProgressReporter 发布节流后的进度事件
+（已处理 bar 数、当前权益、预计剩余时间），经跨进程通道送到 API 进程，由 forward() 交给 websocket 的
+ConnectionManager 广播。前端据此显示进度并在完成时加载一次报告，不再反复轮询 GET /backtests/{id}。
+
+通道：
+- RedisChannel: Redis pub/sub（与 Celery broker 同一个 Redis），worker 与 API 进程之间使用。
+- MemoryChannel: 进程内实现，测试和单进程运行时使用。
+
+消息格式与其它 websocket 消息一致: {"type": "backtest_progress", "data": {...}}。
+/ws/ 不区分用户，消息会发给所有连接，因此不包含回测汇总；完整结果由前端通过需要登录的报告接口读取。
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import pytz
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import PROGRESS_BACKEND, PROGRESS_CHANNEL, PROGRESS_INTERVAL, PROGRESS_REDIS_URL
+
+MESSAGE_TYPE = "backtest_progress"
+BEIJING_TZ = pytz.timezone('Asia/Shanghai')
+
+# Redis 不可用时暂停发布的秒数，避免每个事件都等待连接超时
+_REDIS_RETRY_SECONDS = 30.0
+
+
+class MemoryChannel:
+    """进程内通道：publish 可以在任意线程调用，listen() 在事件循环中逐条取出；published 保留全部消息。"""
+
+    def __init__(self):
+        self.published: List[Dict[str, Any]] = []
+        self._queues: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    def publish(self, message: Dict[str, Any]):
+        self.published.append(message)
+        for loop, queue in list(self._queues):
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    async def listen(self) -> AsyncIterator[Dict[str, Any]]:
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        self._queues.append(entry)
+        try:
+            while True:
+                yield await entry[1].get()
+        finally:
+            self._queues.remove(entry)
+
+
+class RedisChannel:
+    """Redis pub/sub 通道。发布失败只打印并暂停一段时间，进度推送不影响回测本身。"""
+
+    def __init__(self, url: str, name: str):
+        self.url = url
+        self.name = name
+        self._client = None
+        self._client_pid = None
+        self._retry_at = 0.0
+
+    def _sync_client(self):
+        # prefork 的 worker 子进程不能共用父进程的连接
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = redis.Redis.from_url(self.url, socket_connect_timeout=1.0, socket_timeout=1.0)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def publish(self, message: Dict[str, Any]):
+        # 暂停期间只跳过运行中的进度，结束事件仍尝试发布
+        if time.monotonic() < self._retry_at and message["data"]["status"] == "RUNNING":
+            return
+        try:
+            self._sync_client().publish(self.name, json.dumps(message))
+        except redis.RedisError as e:
+            print(f"Progress channel unavailable, pausing progress events: {e}")
+            self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    async def listen(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            client = aioredis.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.name)
+                async for item in pubsub.listen():
+                    if item["type"] == "message":
+                        yield json.loads(item["data"])
+            except (OSError, aioredis.RedisError) as e:
+                print(f"Progress channel disconnected, retrying in 5 seconds: {e}")
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+def create_channel(backend: str = PROGRESS_BACKEND):
+    if backend == "redis":
+        return RedisChannel(PROGRESS_REDIS_URL, PROGRESS_CHANNEL)
+    if backend == "memory":
+        return MemoryChannel()
+    return None
+
+
+# worker 与 API 进程各自持有的通道，PROGRESS_BACKEND 为 none 时为 None（不推送进度）
+channel = create_channel()
+
+
+async def forward(source, broadcast: Callable[[Dict[str, Any]], Any]):
+    """把通道中的进度消息交给 websocket 广播（API 进程启动时作为后台任务运行）。"""
+    async for message in source.listen():
+        await broadcast(message)
+
+
+class ProgressReporter:
+    """
+    单次回测的进度上报。update() 可以每根 bar 调用，最多每 interval 秒真正发布一次；
+    阶段切换（stage）和结束（finish）总是发布。partial_equity 是回调，只在发布时才计算。
+    """
+
+    def __init__(self, backtest_id: int, channel, interval: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.backtest_id = backtest_id
+        self.channel = channel
+        self.interval = PROGRESS_INTERVAL if interval is None else interval
+        self.clock = clock
+        self.stage_name: Optional[str] = None
+        self.total_bars = 0
+        self._stage_started = clock()
+        self._last_published = None
+
+    def _publish(self, status: str, **data):
+        self._last_published = self.clock()
+        self.channel.publish({"type": MESSAGE_TYPE, "data": {
+            "backtest_id": self.backtest_id,
+            "status": status,
+            "stage": self.stage_name,
+            "timestamp": datetime.now(BEIJING_TZ).isoformat(),
+            **data,
+        }})
+
+    def stage(self, name: str, total_bars: int = 0):
+        """进入新阶段（loading / signals / execution），total_bars 为该阶段要处理的 bar 数。"""
+        self.stage_name = name
+        self.total_bars = total_bars
+        self._stage_started = self.clock()
+        self._publish("RUNNING", bars_processed=0, total_bars=total_bars)
+
+    def update(self, bars_processed: int, partial_equity: Optional[Callable[[], float]] = None):
+        now = self.clock()
+        if self._last_published is not None and now - self._last_published < self.interval:
+            return
+        elapsed = now - self._stage_started
+        remaining = self.total_bars - bars_processed
+        eta = elapsed / bars_processed * remaining if bars_processed > 0 else None
+        self._publish(
+            "RUNNING",
+            bars_processed=bars_processed,
+            total_bars=self.total_bars,
+            progress=bars_processed / self.total_bars if self.total_bars else None,
+            equity=partial_equity() if partial_equity is not None else None,
+            eta_seconds=eta,
+        )
+
+    def finish(self, status: str, error: Optional[str] = None):
+        """回测结束（SUCCESS / FAILURE），失败时附带错误信息；前端收到后加载一次完整报告。"""
+        self.stage_name = "done"
+        self._publish(status, error=error)
@@ -0,0 +1,72 @@
+# backend/app/services/resampler.py
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.services.kline_store import KLINE_COLUMNS, KLINE_DTYPES
+from app.services.trading_calendar import (
+    NS_PER_DAY, NS_PER_MINUTE, SHANGHAI_OFFSET_NS, format_date, parse_date, roll_to_trading_day,
+)
+
+# 可由 1m 合成的周期（分钟数）。日内周期按北京时间整点/整刻钟切分，与天勤原生K线和
+# trading_calendar 的K线时间一致。各交易时段的起止都在 15 分钟整点上，5m/15m 不会跨越休市；
+# 1h 则会：例如商品期货 10:00 的K线包含 10:00-10:15 和 10:30-11:00 两段（中间是 10:15-10:30 的休市）。
+INTRADAY_MINUTES = {"5m": 5, "15m": 15, "1h": 60}
+RESAMPLED_DURATIONS = tuple(INTRADAY_MINUTES) + ("1d",)
+
+# 夜盘（21:00 起）归属下一交易日：北京时间加 6 小时后取日期，即以 18:00 为交易日分界
+_TRADING_DAY_SHIFT_NS = 6 * 3600 * 10**9
+
+# 日线需要上一交易日的夜盘，周一的夜盘在上周五晚上
+DAILY_LOOKBACK_DAYS = 3
+
+
+def trading_days_ns(timestamps: np.ndarray) -> np.ndarray:
+    """
+    返回每根K线所属交易日（北京时间 00:00）的 UTC epoch 纳秒。
+    周五夜盘顺延到下周一，节假日顺延到节后第一个交易日。
+    """
+    local_days = (timestamps + SHANGHAI_OFFSET_NS + _TRADING_DAY_SHIFT_NS) // NS_PER_DAY
+    trading_days = roll_to_trading_day(local_days.astype('datetime64[D]'))
+    return trading_days.astype(np.int64) * NS_PER_DAY - SHANGHAI_OFFSET_NS
+
+
+def bucket_keys(timestamps: np.ndarray, duration: str) -> np.ndarray:
+    """每根 1m K线所属的目标周期K线起始时间（UTC epoch 纳秒）。"""
+    if duration == "1d":
+        return trading_days_ns(timestamps)
+    width = INTRADAY_MINUTES[duration] * NS_PER_MINUTE
+    return timestamps - (timestamps + SHANGHAI_OFFSET_NS) % width
+
+
+def resample_klines(minute: pd.DataFrame, duration: str) -> pd.DataFrame:
+    """
+    把按时间排序的 1m K线合成为 duration 周期。
+    每个周期只做一次 reduceat，不逐根循环；周期起始时间作为新K线的 datetime。
+    """
+    if duration == "1m":
+        return minute
+    if minute.empty:
+        return pd.DataFrame(columns=KLINE_COLUMNS).astype(KLINE_DTYPES)
+
+    timestamps = minute['datetime'].to_numpy(dtype=np.int64)
+    keys = bucket_keys(timestamps, duration)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+
+    return pd.DataFrame({
+        'datetime': keys[starts],
+        'open': minute['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(minute['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(minute['low'].to_numpy(), starts),
+        'close': minute['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(minute['volume'].to_numpy(), starts),
+    })
+
+
+def source_start_date(duration: str, start_date: str) -> str:
+    """合成 duration 周期时需要读取的 1m 数据起始日期。"""
+    if duration != "1d":
+        return start_date
+    return format_date(parse_date(start_date) - timedelta(days=DAILY_LOOKBACK_DAYS))
@@ -0,0 +1,52 @@
+# backend/app/services/result_cache.py
+"""
+按内容寻址的回测结果缓存：把一次回测的全部输入规范化为 JSON 后取 SHA-256 作为指纹。
+
+指纹包含策略源码的哈希，所以修改策略后不会命中旧结果；也包含数据源配置和撮合引擎版本，
+数据来源或回测语义变化时旧结果自然失效。区间包含今天的回测数据仍在变化，不做缓存。
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.core.config import DATA_PROVIDER, RESAMPLE_FROM_1M, SYNTHETIC_SEED
+from app.schemas.backtest import KlineDuration
+from app.services.strategy_base import StrategyCache
+
+# 撮合、统计口径等改变回测结果的修改需要递增该版本，使旧指纹全部失效
+ENGINE_VERSION = 1
+
+
+def _data_source() -> Dict[str, Any]:
+    source: Dict[str, Any] = {"provider": DATA_PROVIDER, "resample_from_1m": RESAMPLE_FROM_1M}
+    if DATA_PROVIDER == "synthetic":
+        source["seed"] = SYNTHETIC_SEED
+    return source
+
+
+def fingerprint(strategy_id: int, strategy_code: str, symbol: str, duration: KlineDuration,
+                start_dt: datetime, end_dt: datetime, commission_rate: float, slippage: float,
+                params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    回测输入的指纹。日期与回测任务一样只取到天；没有覆盖参数与空参数等价。
+    结束日期不早于今天（北京时间）时返回 None，表示该回测不可缓存。
+    """
+    today = (datetime.utcnow() + timedelta(hours=8)).strftime('%Y%m%d')
+    end_date = end_dt.strftime('%Y%m%d')
+    if end_date >= today:
+        return None
+    canonical = json.dumps({
+        "engine": ENGINE_VERSION,
+        "data": _data_source(),
+        "strategy_id": strategy_id,
+        "script": StrategyCache.key(strategy_code),
+        "symbol": symbol,
+        "duration": KlineDuration(duration).value,
+        "start_date": start_dt.strftime('%Y%m%d'),
+        "end_date": end_date,
+        "commission_rate": float(commission_rate),
+        "slippage": float(slippage),
+        "params": params or {},
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
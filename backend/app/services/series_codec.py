@@ -0,0 +1,126 @@
+# backend/app/services/series_codec.py
+"""
+回测结果逐 bar 序列（权益曲线、成交列表）的压缩存储格式，写入 backtest_series 表，替代 daily_pnl JSON 列。
+
+    MAGIC | uint32 bar 数 | uint32 成交数 | zlib(各列依次拼接)
+
+列固定为 _COLUMNS 中的顺序。整数列存相邻差分，浮点列存与上一个值按位异或的结果（权益在空仓时不变，
+异或后为 0），再按字节位置重排（各值的第 0 个字节放在一起，依此类推），使 zlib 能压缩高位几乎不变的字节。
+以上变换都是无损的，解码得到的数组与写入时逐位相同。
+"""
+import struct
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.execution import ExecutionResult
+from app.services.kline_store import format_timestamps, parse_timestamps
+from app.services.strategy_base import SIGNAL_BUY, SIGNAL_SELL
+
+MAGIC = b'QTSERIE1'
+_COUNTS = struct.Struct('<II')
+
+# (列名, dtype, 行数对应的表)
+_COLUMNS = [
+    ("datetime", np.dtype(np.int64), "pnl"),        # 各 bar 的 UTC epoch 纳秒
+    ("equity", np.dtype(np.float64), "pnl"),
+    ("trade_index", np.dtype(np.int64), "trades"),  # 成交所在的 bar 下标
+    ("trade_side", np.dtype(np.int8), "trades"),
+    ("trade_price", np.dtype(np.float64), "trades"),
+    ("trade_shares", np.dtype(np.float64), "trades"),
+]
+
+
+def _encode_column(values: np.ndarray, dtype: np.dtype) -> bytes:
+    values = np.ascontiguousarray(values, dtype=dtype)
+    if dtype.kind == 'f':
+        bits = values.view(np.uint64)
+        values = bits ^ np.concatenate([np.zeros(1, dtype=np.uint64), bits[:-1]])
+    else:
+        values = np.diff(values, prepend=dtype.type(0)).astype(dtype)
+    return values.view(np.uint8).reshape(-1, dtype.itemsize).T.tobytes()
+
+
+def _decode_column(buffer: bytes, rows: int, dtype: np.dtype) -> np.ndarray:
+    shuffled = np.frombuffer(buffer, dtype=np.uint8).reshape(dtype.itemsize, rows)
+    values = np.ascontiguousarray(shuffled.T)
+    if dtype.kind == 'f':
+        return np.bitwise_xor.accumulate(values.view(np.uint64).ravel()).view(np.float64)
+    return np.cumsum(values.view(dtype).ravel(), dtype=dtype)
+
+
+def encode(timestamps: np.ndarray, execution: ExecutionResult) -> bytes:
+    """把一次回测的逐 bar 权益与成交编码为压缩后的列式二进制；timestamps 与 execution.equity 逐行对齐。"""
+    columns = {
+        "datetime": np.asarray(timestamps, dtype=np.int64),
+        "equity": execution.equity,
+        "trade_index": execution.trade_index,
+        "trade_side": execution.trade_side,
+        "trade_price": execution.trade_price,
+        "trade_shares": execution.trade_shares,
+    }
+    if len(columns["datetime"]) != len(columns["equity"]):
+        raise ValueError("timestamps and equity must have the same length.")
+    body = b''.join(_encode_column(columns[name], dtype) for name, dtype, _ in _COLUMNS)
+    return MAGIC + _COUNTS.pack(len(execution.equity), len(execution.trade_index)) + zlib.compress(body)
+
+
+def decode(payload: bytes) -> Dict[str, np.ndarray]:
+    """解码为 {列名: 数组}。"""
+    if payload[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a binary backtest series payload.")
+    counts = dict(zip(("pnl", "trades"), _COUNTS.unpack_from(payload, len(MAGIC))))
+    body = zlib.decompress(payload[len(MAGIC) + _COUNTS.size:])
+    columns, offset = {}, 0
+    for name, dtype, table in _COLUMNS:
+        size = counts[table] * dtype.itemsize
+        columns[name] = _decode_column(body[offset:offset + size], counts[table], dtype)
+        offset += size
+    return columns
+
+
+def records(columns: Dict[str, np.ndarray], points: Optional[np.ndarray] = None,
+            lo: int = 0, hi: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    把 decode 得到的列转换为 daily_pnl 结构。points 为保留的 bar 下标（降采样的结果，默认 [lo, hi) 内全部），
+    成交保留 [lo, hi) 内的全部；只格式化实际输出的时间。
+    """
+    hi = len(columns["datetime"]) if hi is None else hi
+    if points is None:
+        points = np.arange(lo, hi)
+    in_window = (columns["trade_index"] >= lo) & (columns["trade_index"] < hi)
+    dates = format_timestamps(columns["datetime"][points])
+    trade_dates = format_timestamps(columns["datetime"][columns["trade_index"][in_window]])
+    return {
+        "pnl": [{'date': date, 'pnl': pnl} for date, pnl in zip(dates.tolist(), columns["equity"][points].tolist())],
+        "trades": [
+            {'date': date, 'type': 'buy' if side == SIGNAL_BUY else 'sell', 'price': price, 'shares': shares}
+            for date, side, price, shares in zip(
+                trade_dates.tolist(),
+                columns["trade_side"][in_window].tolist(),
+                columns["trade_price"][in_window].tolist(),
+                columns["trade_shares"][in_window].tolist(),
+            )
+        ],
+    }
+
+
+def to_records(payload: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    """解码为与 daily_pnl JSON 列相同的结构 {'pnl': [{'date', 'pnl'}], 'trades': [{'date', 'type', 'price', 'shares'}]}。"""
+    return records(decode(payload))
+
+
+def from_records(daily_pnl: Dict[str, List[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+    """旧格式 daily_pnl JSON 转换为与 decode 相同的列，成交按时间对应到所在的 bar。"""
+    pnl, trades = daily_pnl.get("pnl") or [], daily_pnl.get("trades") or []
+    timestamps = parse_timestamps([point["date"] for point in pnl]) if pnl else np.empty(0, dtype=np.int64)
+    trade_timestamps = parse_timestamps([trade["date"] for trade in trades]) if trades else np.empty(0, dtype=np.int64)
+    return {
+        "datetime": timestamps,
+        "equity": np.asarray([point["pnl"] for point in pnl], dtype=np.float64),
+        "trade_index": np.searchsorted(timestamps, trade_timestamps).astype(np.int64),
+        "trade_side": np.asarray([SIGNAL_BUY if trade["type"] == 'buy' else SIGNAL_SELL for trade in trades], dtype=np.int8),
+        "trade_price": np.asarray([trade["price"] for trade in trades], dtype=np.float64),
+        "trade_shares": np.asarray([trade["shares"] for trade in trades], dtype=np.float64),
+    }
@@ -0,0 +1,246 @@
+# backend/app/services/shared_klines.py
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from app.services import kline_codec
+from app.services.kline_store import slice_by_dates
+
+SeriesKey = Tuple[str, str]  # (symbol, duration)
+SegmentKey = Tuple[str, str, str, str]  # (symbol, duration, start_date, end_date)
+
+
+def segment_name(key: SegmentKey) -> str:
+    digest = hashlib.sha1("|".join(key).encode('utf-8')).hexdigest()[:20]
+    return f"qt_kl_{digest}"
+
+
+def _series_lock(key: SeriesKey) -> str:
+    return "series_" + hashlib.sha1("|".join(key).encode('utf-8')).hexdigest()[:20]
+
+
+def _untrack(shm: SharedMemory):
+    # Python 3.10 中 attach 的进程退出时 resource_tracker 也会 unlink 共享内存，
+    # 这里由索引文件自行管理生命周期，因此取消跟踪。
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _unlink_name(name: str):
+    try:
+        segment = SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _try_close(shm: SharedMemory) -> bool:
+    try:
+        shm.close()
+    except BufferError:
+        return False
+    return True
+
+
+class SharedKlineManager:
+    """
+    同一节点上多个 worker 进程共享的K线内存段，每个 (symbol, duration) 一段。
+
+    第一个请求某个合约周期的进程负责加载数据，并以 kline_codec 的列式格式写入
+    multiprocessing.shared_memory；其它进程直接 attach，得到指向同一块内存的只读 NumPy 列，
+    请求的日期区间从中切片（不复制）。请求超出已加载的区间时，按两者的并集重新加载一段并替换旧段。
+
+    state_dir 下的 index.json 记录节点上所有内存段（区间、字节数、最近使用时间、attach 的进程号），
+    读写时用 flock 加锁。每个段的 attached 是引用计数：进程 attach 时加入，release_all（worker 子进程退出）
+    时移除，已退出但没来得及移除的进程在读取索引时剔除。没有进程 attach 且超过 idle_seconds 未使用的段
+    随即 unlink；总字节数超过 max_bytes 时先淘汰没有进程 attach 的段，再按最近使用时间淘汰。
+    已 attach 的进程在下次调用时关闭被淘汰的段，仍被 DataFrame（例如进程内 KlineCache）引用的映射在引用释放后关闭。
+    节点停止时由 worker 主进程调用 clear() unlink 全部内存段。
+    """
+
+    def __init__(self, state_dir: Path, max_bytes: int, idle_seconds: float = 3600.0):
+        self.state_dir = Path(state_dir)
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._segments: Dict[str, SharedMemory] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+        # 已被淘汰、但仍被 DataFrame 引用而暂时无法 close 的内存段
+        self._retired: List[SharedMemory] = []
+        atexit.register(self.release_all)
+
+    @contextmanager
+    def _locked(self, name: str):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.state_dir / f"{name}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        path = self.state_dir / "index.json"
+        if not path.exists():
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        # 异常退出的进程没有机会 release_all，按进程号剔除
+        for meta in index.values():
+            meta["attached"] = [pid for pid in meta.get("attached", []) if _alive(pid)]
+        return index
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]):
+        path = self.state_dir / "index.json"
+        tmp_path = path.with_name(f".index.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(index), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], reserve: int = 0):
+        """unlink 无人 attach 且长时间未使用的段，再淘汰到总字节数加上 reserve 不超过 max_bytes。"""
+        now = time.time()
+        for name in [name for name, meta in index.items()
+                     if not meta["attached"] and now - meta["last_used"] > self.idle_seconds]:
+            _unlink_name(name)
+            del index[name]
+        total = reserve + sum(meta["bytes"] for meta in index.values())
+        for name in sorted(index, key=lambda name: (bool(index[name]["attached"]), index[name]["last_used"])):
+            if total <= self.max_bytes:
+                break
+            _unlink_name(name)
+            total -= index.pop(name)["bytes"]
+
+    def _close_local(self, name: str):
+        shm = self._segments.pop(name, None)
+        self._frames.pop(name, None)
+        if shm is not None and not _try_close(shm):
+            self._retired.append(shm)
+
+    def _sync_local(self, index: Dict[str, Dict[str, Any]]):
+        """关闭本进程映射中已被淘汰或替换的段。"""
+        for name in [name for name in self._segments if name not in index]:
+            self._close_local(name)
+        self._retired = [shm for shm in self._retired if not _try_close(shm)]
+
+    def _attach(self, name: str, shm: SharedMemory = None) -> pd.DataFrame:
+        if name in self._frames:
+            return self._frames[name]
+        if shm is None:
+            shm = SharedMemory(name=name)
+            _untrack(shm)
+        columns = kline_codec.decode_columns(shm.buf)
+        for values in columns.values():
+            values.flags.writeable = False
+        frame = pd.DataFrame(columns, copy=False)
+        self._segments[name] = shm
+        self._frames[name] = frame
+        return frame
+
+    def get(self, symbol: str, duration: str, start_date: str, end_date: str,
+            loader: Callable[[str, str], pd.DataFrame]) -> pd.DataFrame:
+        """返回 [start_date, end_date] 内由共享内存支撑的只读K线；没有覆盖该区间的段时调用 loader(start, end) 加载。"""
+        key = (symbol, duration)
+        # 同一合约周期的加载串行进行，其它合约只在读写索引时短暂加锁
+        with self._locked(_series_lock(key)):
+            with self._locked("index"):
+                index = self._load_index()
+                self._sync_local(index)
+                current = next((name for name, meta in index.items()
+                                if (meta["symbol"], meta["duration"]) == key), None)
+                load_start, load_end = start_date, end_date
+                if current is not None:
+                    meta = index[current]
+                    if meta["start"] <= start_date and end_date <= meta["end"]:
+                        try:
+                            frame = self._attach(current)
+                        except FileNotFoundError:
+                            # 内存段已不存在（例如 /dev/shm 被清空），重新加载
+                            del index[current]
+                        else:
+                            meta["last_used"] = time.time()
+                            if os.getpid() not in meta["attached"]:
+                                meta["attached"].append(os.getpid())
+                            self._save_index(index)
+                            return slice_by_dates(frame, start_date, end_date)
+                    else:
+                        load_start, load_end = min(start_date, meta["start"]), max(end_date, meta["end"])
+
+            loaded = loader(load_start, load_end)
+            if loaded.empty:
+                return loaded
+            payload = kline_codec.encode(loaded)
+            if len(payload) > self.max_bytes:
+                print(f"SharedKlineManager: {symbol} {duration} needs {len(payload)} bytes, "
+                      f"more than the shared budget; keeping a private copy.")
+                return slice_by_dates(loaded, start_date, end_date)
+
+            name = segment_name((symbol, duration, load_start, load_end))
+            _unlink_name(name)  # 异常退出的进程可能留下同名的旧段
+            shm = SharedMemory(name=name, create=True, size=len(payload))
+            _untrack(shm)
+            shm.buf[:len(payload)] = payload
+
+            with self._locked("index"):
+                index = self._load_index()
+                # 新段替换该合约周期的旧段，再按最近使用时间淘汰其它段直到满足字节预算
+                for old in [old for old, meta in index.items() if (meta["symbol"], meta["duration"]) == key]:
+                    _unlink_name(old)
+                    del index[old]
+                self._evict(index, reserve=len(payload))
+                index[name] = {"symbol": symbol, "duration": duration, "start": load_start, "end": load_end,
+                               "bytes": len(payload), "last_used": time.time(), "attached": [os.getpid()]}
+                self._save_index(index)
+                self._sync_local(index)
+            return slice_by_dates(self._attach(name, shm), start_date, end_date)
+
+    def release_all(self):
+        """
+        关闭本进程的映射并从各段的 attached 中移除本进程。没有进程 attach 的段在空闲超过 idle_seconds
+        或超出字节预算时 unlink，其余保留在节点上，供回收后新启动的 worker 进程复用。
+        """
+        if self._segments:
+            with self._locked("index"):
+                index = self._load_index()
+                for meta in index.values():
+                    meta["attached"] = [pid for pid in meta["attached"] if pid != os.getpid()]
+                self._evict(index)
+                self._save_index(index)
+        for name in list(self._segments):
+            self._close_local(name)
+
+    def clear(self):
+        """unlink 节点上的全部内存段。"""
+        with self._locked("index"):
+            for name in self._load_index():
+                _unlink_name(name)
+            self._save_index({})
+        self.release_all()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self._segments),
+            "bytes": sum(shm.size for shm in self._segments.values()),
+            "retired": len(self._retired),
+        }
@@ -1,6 +1,113 @@
 # backend/app/services/strategy_base.py
+import hashlib
+import importlib.util
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from collections import OrderedDict
+from types import CodeType, ModuleType
+from typing import Any, Dict, Tuple, Type
+
+import pandas as pd
+
+from app.core.config import STRATEGY_CACHE_SIZE
+from app.services.kline_store import format_timestamps
+
+# 向量化信号的取值约定
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_FLAT = 0
+
+
+def uses_trade_date(strategy_code: str) -> bool:
+    """旧策略通过 data['trade_date'] 读取字符串时间，需要兼容列。"""
+    return 'trade_date' in strategy_code
+
+
+def with_trade_date(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    兼容旧策略：在K线前面加上由 datetime 格式化而来的 trade_date 字符串列。
+    新策略直接使用 int64 的 datetime 列即可，不需要付出格式化的开销。
+    """
+    data = data.copy()
+    data.insert(0, 'trade_date', format_timestamps(data['datetime']))
+    return data
+
+
+class StrategyCache:
+    """
+    进程内已编译策略的 LRU 缓存，按源码的 SHA-256 索引，按条数淘汰。
+
+    每条缓存保存编译好的 code object 和执行后的模块；同一份源码的各次回测（包括参数优化的每组参数）
+    只实例化模块中的 Strategy 类，不再重复 exec 源码和其中的 import。
+    源码变化后哈希随之变化，所以其它进程修改策略文件后不会取到旧的类；invalidate 只用于及早释放旧条目。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[CodeType, ModuleType]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(strategy_code: str) -> str:
+        return hashlib.sha256(strategy_code.encode('utf-8')).hexdigest()
+
+    def get(self, strategy_code: str) -> ModuleType:
+        key = self.key(strategy_code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        code, module = _compile_module(strategy_code, key)
+        if self.max_entries <= 0:
+            return module
+        with self._lock:
+            self._entries[key] = (code, module)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return module
+
+    def invalidate(self, strategy_code: str):
+        with self._lock:
+            self._entries.pop(self.key(strategy_code), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+def _compile_module(strategy_code: str, key: str) -> Tuple[CodeType, ModuleType]:
+    spec = importlib.util.spec_from_loader("strategy_module", loader=None)
+    strategy_module = importlib.util.module_from_spec(spec)
+
+    # 【修复】手动注入 BaseStrategy 到策略模块的命名空间
+    strategy_module.BaseStrategy = BaseStrategy
+
+    code = compile(strategy_code, f"<strategy {key[:12]}>", "exec")
+    exec(code, strategy_module.__dict__)
+    return code, strategy_module
+
+
+strategy_cache = StrategyCache(STRATEGY_CACHE_SIZE)
+
+
+def compile_strategy(strategy_code: str) -> Type['BaseStrategy']:
+    """返回策略源码中的 Strategy 类；同一份源码在本进程内只编译执行一次，每组参数各自实例化。"""
+    return strategy_cache.get(strategy_code).Strategy
+
 
 class BaseStrategy(ABC):
     """
@@ -10,12 +117,29 @@ class BaseStrategy(ABC):
     def __init__(self, context: Any, **params):
         self.context = context
         self.parameters = {}
+        defaults = set(vars(self))
         self.set_parameters() # 调用用户定义的参数
+        # set_parameters 中以 self.xxx = 默认值 声明的属性也是可优化参数
+        declared = set(vars(self)) - defaults
         # 如果外部传入了参数（在优化时），则覆盖默认值
         for key, value in params.items():
-            if key in self.parameters:
+            if key in self.parameters or key in declared:
                 setattr(self, key, value)
 
+    @property
+    def lookback(self) -> int:
+        """
+        逐 bar 模式下 handle_data 每次能看到的K线根数（固定长度的只读滚动窗口）。
+        默认沿用 long_window + 1 以兼容旧策略，子类可覆盖该属性或直接赋值。
+        """
+        if getattr(self, '_lookback', None) is not None:
+            return self._lookback
+        return int(getattr(self, 'long_window', 50)) + 1
+
+    @lookback.setter
+    def lookback(self, value: int):
+        self._lookback = int(value)
+
     @abstractmethod
     def initialize(self):
         """
@@ -38,6 +162,14 @@ class BaseStrategy(ABC):
         """
         pass
 
+    def generate_signals(self, data):
+        """
+        （可选）向量化信号生成，一次性处理整段K线数据。
+        返回与 data 逐行对齐的信号序列：1 买入，-1 卖出，0 无操作。
+        返回 None 表示策略未实现该模式，回测器将回退为逐 bar 调用 handle_data。
+        """
+        return None
+
     def before_trading_start(self, data: Dict):
         """（可选）在交易日开始前调用。"""
         pass
@@ -0,0 +1,84 @@
+# backend/app/services/sweep.py
+"""
+单任务的参数扫描：K线只加载一次、策略只编译一次，各组参数在本地进程池中并行求值。
+
+进程池用 fork 启动，子进程直接继承父进程中已加载的K线和已编译的策略（写时复制），
+不需要逐个任务序列化传输。使用 billiard（Celery 自带的 multiprocessing 分支）的进程池，
+因为 Celery prefork 的 worker 子进程是 daemon 进程，标准库的进程池无法在其中创建子进程。
+"""
+import os
+from itertools import product
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import billiard
+import numpy as np
+
+# 单组参数的求值函数: params -> 结果字典
+Evaluator = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+# 离散化后的参数空间: [(参数名, 取值列表)]
+ParamSpace = List[Tuple[str, List[Union[int, float]]]]
+
+# 当前扫描的求值函数。在创建进程池之前设置，fork 出的子进程直接继承
+_evaluator: Optional[Evaluator] = None
+
+
+def _param_value(value) -> Union[int, float]:
+    # 保留两位小数；整数值（如均线窗口）转为 int，rolling 等接口不接受 5.0 这样的窗口
+    value = round(float(value), 2)
+    return int(value) if value.is_integer() else value
+
+
+def param_space(optimization_params: List[Dict[str, Any]]) -> ParamSpace:
+    """把 [{'name', 'start', 'end', 'step'}] 离散为每个参数的取值列表。"""
+    return [
+        (p['name'], [_param_value(val) for val in np.arange(p['start'], p['end'] + p['step'], p['step'])])
+        for p in optimization_params
+    ]
+
+
+def grid_params(space: ParamSpace) -> List[Dict[str, Union[int, float]]]:
+    """参数空间的全部参数组合（与原网格搜索的顺序相同）。"""
+    param_names = [name for name, _ in space]
+    return [dict(zip(param_names, combo)) for combo in product(*(values for _, values in space))]
+
+
+def expand_grid(optimization_params: List[Dict[str, Any]]) -> List[Dict[str, Union[int, float]]]:
+    """把 [{'name', 'start', 'end', 'step'}] 展开为全部参数组合。"""
+    return grid_params(param_space(optimization_params))
+
+
+def pool_size(processes: int = 0) -> int:
+    """进程池大小：processes 为 0 时使用全部 CPU。"""
+    return processes or os.cpu_count() or 1
+
+
+def _evaluate(params: Dict[str, Any]) -> Dict[str, Any]:
+    return _evaluator(params)
+
+
+def run_sweep(evaluator: Evaluator, param_sets: List[Dict[str, Any]], processes: int = 0) -> List[Dict[str, Any]]:
+    """
+    对每组参数调用 evaluator，按 param_sets 的顺序返回结果。
+    processes 为 0 时使用全部 CPU；只有一个进程或一组参数时直接在当前进程中执行。
+    """
+    global _evaluator
+    processes = min(pool_size(processes), len(param_sets))
+    if processes <= 1:
+        return [evaluator(params) for params in param_sets]
+
+    # 每个子进程分到若干批，既减少进程间通信的次数，又能在各组耗时不均时保持负载均衡
+    chunksize = max(1, len(param_sets) // (processes * 4))
+    # 按参数取值排序后再连续分批：第一个参数取值相同的组合（例如同一条短均线）相邻，多落在同一批、
+    # 同一子进程中，子进程各自的指标缓存（indicators.memoize）才能复用
+    order = sorted(range(len(param_sets)), key=lambda i: tuple(param_sets[i].values()))
+    _evaluator = evaluator
+    try:
+        with billiard.get_context("fork").Pool(processes) as pool:
+            sorted_results = pool.map(_evaluate, [param_sets[i] for i in order], chunksize=chunksize)
+    finally:
+        _evaluator = None
+    results: List[Dict[str, Any]] = [None] * len(param_sets)
+    for i, result in zip(order, sorted_results):
+        results[i] = result
+    return results
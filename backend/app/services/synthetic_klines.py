@@ -0,0 +1,154 @@
+# backend/app/services/synthetic_klines.py
+"""
+确定性的合成K线，用于离线基准测试和单元测试（不需要 tqsdk 账号和网络）。
+
+价格为带跳跃的几何布朗运动：先按交易日生成日收盘价（扩散 + 复合泊松跳跃），
+日内K线是首尾钉在前后两个日收盘价上的布朗桥，当天的跳跃落在其中某一根K线上。
+K线时间严格按 trading_calendar 的交易时段（含夜盘、节假日）生成。
+
+每个随机数都由 (seed, 合约, 周期, K线时间) 哈希得到，与请求的区间无关：
+同一根K线无论单独获取还是作为长区间的一部分获取，数值完全相同，
+因此分段写入本地存储后拼接的结果和一次生成的一致。各周期共用同一组日收盘价。
+"""
+import zlib
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.services.data_fetcher import DURATION_SECONDS
+from app.services.kline_store import KLINE_COLUMNS, KLINE_DTYPES, slice_by_dates
+from app.services.resampler import trading_days_ns
+from app.services.trading_calendar import (
+    NS_PER_DAY, SHANGHAI_OFFSET_NS, format_date, parse_date, product_code, session_bar_times, trading_days,
+)
+
+# 日收盘价序列的起点：只能生成此后的K线（保证与请求区间无关）
+ANCHOR_DATE = np.datetime64('1990-01-01')
+
+ANNUAL_VOLATILITY = 0.25
+TRADING_DAYS_PER_YEAR = 244
+DAILY_VOLATILITY = ANNUAL_VOLATILITY / np.sqrt(TRADING_DAYS_PER_YEAR)
+# 平均每 JUMP_RATE 分之一个交易日出现一次跳跃，跳跃幅度（对数收益）的标准差
+JUMP_RATE = 0.05
+JUMP_VOLATILITY = 0.03
+# 每根K线的平均成交量（手），按 1m 折算
+MINUTE_VOLUME = 200.0
+
+# 区分各类随机数的盐值
+_DAY_MOVE, _DAY_JUMP, _DAY_JUMP_SIZE, _JUMP_BAR, _BAR_MOVE, _HIGH, _LOW, _VOLUME = range(1, 9)
+_U64 = np.uint64
+_MASK53 = 2.0 ** -53
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 的混合函数，对 uint64 数组逐元素计算（溢出按 2^64 取模）。"""
+    x = x + _U64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> _U64(30))) * _U64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> _U64(27))) * _U64(0x94D049BB133111EB)
+    return x ^ (x >> _U64(31))
+
+
+def _uniform(key: int, stream: int, counters: np.ndarray) -> np.ndarray:
+    """(0, 1) 内的均匀分布，由 key、stream 和计数器（K线时间或交易日序号）唯一决定。"""
+    salt = _mix(np.array([(key + stream * 0x632BE59BD9B4E019) & 0xFFFFFFFFFFFFFFFF], dtype=_U64))[0]
+    bits = _mix(counters.astype(np.int64).view(_U64) ^ salt)
+    return ((bits >> _U64(11)).astype(np.float64) + 0.5) * _MASK53
+
+
+def _normal(key: int, stream: int, counters: np.ndarray) -> np.ndarray:
+    # Box-Muller：两路独立的均匀分布得到一个标准正态
+    u1 = _uniform(key, stream, counters)
+    u2 = _uniform(key, stream + 100, counters)
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+def _key(*parts) -> int:
+    return zlib.crc32('|'.join(map(str, parts)).encode('utf-8')) * 0x9E3779B1 + len(parts)
+
+
+def base_price(symbol: str) -> float:
+    """ANCHOR_DATE 时的价格，同一品种的不同合约相同。"""
+    return 1000.0 + zlib.crc32(product_code(symbol).encode('utf-8')) % 5000
+
+
+def _daily_log_prices(symbol: str, seed: int, last_day: np.datetime64):
+    """从 ANCHOR_DATE 到 last_day 各交易日的对数收盘价，以及当天的跳跃幅度。"""
+    # 第一个交易日只作为起点，不生成K线
+    days = trading_days(ANCHOR_DATE, last_day)
+    day_numbers = days.astype(np.int64)
+    key = _key(seed, symbol)
+    moves = DAILY_VOLATILITY * _normal(key, _DAY_MOVE, day_numbers) - 0.5 * DAILY_VOLATILITY ** 2
+    jumps = np.where(
+        _uniform(key, _DAY_JUMP, day_numbers) < JUMP_RATE,
+        JUMP_VOLATILITY * _normal(key, _DAY_JUMP_SIZE, day_numbers), 0.0,
+    )
+    closes = np.log(base_price(symbol)) + np.cumsum(moves + jumps)
+    return days, closes, moves, jumps
+
+
+def generate_klines(symbol: str, duration: str, start_date: str, end_date: str, seed: int = 0) -> pd.DataFrame:
+    """
+    生成 [start_date, end_date]（北京时间自然日，与 data_fetcher 的截取方式一致）内的K线，
+    列与本地存储相同：datetime（UTC epoch 纳秒）、open、high、low、close、volume。
+    """
+    if np.datetime64(parse_date(start_date)) <= ANCHOR_DATE:
+        raise ValueError(f"Synthetic klines start at {ANCHOR_DATE}, got {start_date}")
+    seconds = DURATION_SECONDS[duration]
+    # 多生成几天，使结束日晚上的夜盘所属的交易日完整（布朗桥需要整个交易日）
+    horizon = parse_date(end_date) + timedelta(days=7)
+    timestamps = session_bar_times(symbol, seconds, start_date, format_date(horizon))
+    if len(timestamps) == 0:
+        return pd.DataFrame(columns=KLINE_COLUMNS).astype(KLINE_DTYPES)
+
+    days, log_closes, day_moves, day_jumps = _daily_log_prices(symbol, seed, np.datetime64(horizon))
+    key = _key(seed, symbol, duration)
+    if seconds >= 24 * 3600:
+        index = np.searchsorted(days, ((timestamps + SHANGHAI_OFFSET_NS) // NS_PER_DAY).astype('datetime64[D]'))
+        close = log_closes[index]
+        open_ = log_closes[index - 1]
+        scale = DAILY_VOLATILITY
+        volume_scale = MINUTE_VOLUME * 240
+    else:
+        bar_days = ((trading_days_ns(timestamps) + SHANGHAI_OFFSET_NS) // NS_PER_DAY).astype('datetime64[D]')
+        index = np.searchsorted(days, bar_days)
+        # 每个交易日在本次生成中是一段连续的K线
+        starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        counts = np.diff(np.r_[starts, len(index)])
+        group = np.repeat(np.arange(len(starts)), counts)
+        position = np.arange(len(index)) - starts[group]
+        bars = counts[group]
+
+        # 布朗桥：日内累计扩散减去按进度分摊的终点值，首尾与日收盘价衔接。
+        # 按 (交易日, 日内序号) 排成矩阵逐行累加，结果不受前面有多少个交易日影响
+        steps = np.zeros((len(starts), counts.max()))
+        steps[group, position] = _normal(key, _BAR_MOVE, timestamps)
+        walk = np.cumsum(steps, axis=1)[group, position]
+        day_end = walk[starts + counts - 1]
+        progress = (position + 1) / bars
+        bridge = (walk - progress * day_end[group]) * (DAILY_VOLATILITY / np.sqrt(bars))
+
+        day_index = index[starts]
+        jump_bar = (_uniform(key, _JUMP_BAR, days[day_index].astype(np.int64)) * counts).astype(np.int64)
+        previous_close = log_closes[day_index - 1]
+        close = (previous_close[group] + progress * day_moves[index] + bridge
+                 + np.where(position >= jump_bar[group], day_jumps[index], 0.0))
+        # 收盘K线直接取日收盘价，避免浮点误差使相邻交易日衔接不上
+        close[starts + counts - 1] = log_closes[day_index]
+        open_ = np.r_[previous_close[0], close[:-1]]
+        open_[starts] = previous_close
+        scale = DAILY_VOLATILITY / np.sqrt(bars)
+        volume_scale = MINUTE_VOLUME * seconds / 60
+
+    open_, close = np.exp(open_), np.exp(close)
+    # 上下影线和成交量只需要一路均匀分布（指数分布），省去 Box-Muller 的开销
+    high = np.maximum(open_, close) * np.exp(-0.4 * scale * np.log(_uniform(key, _HIGH, timestamps)))
+    low = np.minimum(open_, close) * np.exp(0.4 * scale * np.log(_uniform(key, _LOW, timestamps)))
+    # 成交量随波动放大
+    move = np.abs(np.log(close / open_)) / scale
+    volume = np.floor(-volume_scale * (0.5 + 0.5 * move) * np.log(_uniform(key, _VOLUME, timestamps)))
+
+    klines = pd.DataFrame({
+        'datetime': timestamps, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+    })
+    return slice_by_dates(klines, start_date, end_date).reset_index(drop=True)
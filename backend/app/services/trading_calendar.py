@@ -0,0 +1,221 @@
+# backend/app/services/trading_calendar.py
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# 国内期货交易所使用北京时间（UTC+8，无夏令时），直接用固定偏移换算
+SHANGHAI_OFFSET_NS = 8 * 3600 * 10**9
+NS_PER_DAY = 24 * 3600 * 10**9
+NS_PER_MINUTE = 60 * 10**9
+
+# 交易所休市的工作日（周末本来就不交易，不在此列）。
+# 必须每年维护：交易所（通常在 12 月）公布次年休市安排后补充一整年。表格最后一年之后的日期
+# 无法判断节假日，会被当作交易日，用到这些日期时打印警告（见 CALENDAR_END）。
+HOLIDAYS = np.array([
+    # 2020
+    '2020-01-01', '2020-01-24', '2020-01-27', '2020-01-28', '2020-01-29', '2020-01-30', '2020-01-31',
+    '2020-04-06', '2020-05-01', '2020-05-04', '2020-05-05', '2020-06-25', '2020-06-26',
+    '2020-10-01', '2020-10-02', '2020-10-05', '2020-10-06', '2020-10-07', '2020-10-08',
+    # 2021
+    '2021-01-01', '2021-02-11', '2021-02-12', '2021-02-15', '2021-02-16', '2021-02-17',
+    '2021-04-05', '2021-05-03', '2021-05-04', '2021-05-05', '2021-06-14', '2021-09-20', '2021-09-21',
+    '2021-10-01', '2021-10-04', '2021-10-05', '2021-10-06', '2021-10-07',
+    # 2022
+    '2022-01-03', '2022-01-31', '2022-02-01', '2022-02-02', '2022-02-03', '2022-02-04',
+    '2022-04-04', '2022-04-05', '2022-05-02', '2022-05-03', '2022-05-04', '2022-06-03', '2022-09-12',
+    '2022-10-03', '2022-10-04', '2022-10-05', '2022-10-06', '2022-10-07',
+    # 2023
+    '2023-01-02', '2023-01-23', '2023-01-24', '2023-01-25', '2023-01-26', '2023-01-27',
+    '2023-04-05', '2023-05-01', '2023-05-02', '2023-05-03', '2023-06-22', '2023-06-23',
+    '2023-09-29', '2023-10-02', '2023-10-03', '2023-10-04', '2023-10-05', '2023-10-06',
+    # 2024
+    '2024-01-01', '2024-02-09', '2024-02-12', '2024-02-13', '2024-02-14', '2024-02-15', '2024-02-16',
+    '2024-04-04', '2024-04-05', '2024-05-01', '2024-05-02', '2024-05-03', '2024-06-10',
+    '2024-09-16', '2024-09-17', '2024-10-01', '2024-10-02', '2024-10-03', '2024-10-04', '2024-10-07',
+    # 2025
+    '2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31', '2025-02-03', '2025-02-04',
+    '2025-04-04', '2025-05-01', '2025-05-02', '2025-05-05', '2025-06-02',
+    '2025-10-01', '2025-10-02', '2025-10-03', '2025-10-06', '2025-10-07', '2025-10-08',
+    # 2026
+    '2026-01-01', '2026-01-02', '2026-02-16', '2026-02-17', '2026-02-18', '2026-02-19', '2026-02-20',
+    '2026-02-23', '2026-04-06', '2026-05-01', '2026-05-04', '2026-05-05', '2026-06-19', '2026-09-25',
+    '2026-10-01', '2026-10-02', '2026-10-05', '2026-10-06', '2026-10-07',
+], dtype='datetime64[D]')
+
+BUSDAY_CALENDAR = np.busdaycalendar(holidays=HOLIDAYS)
+
+# 节假日表覆盖到的最后一天（表中最后一年的 12 月 31 日）
+CALENDAR_END = np.datetime64(f"{HOLIDAYS.max().astype('datetime64[Y]')}-12-31", 'D')
+_warned_past_end = False
+
+
+def _check_coverage(last_day: np.datetime64):
+    """日期超出节假日表时打印一次警告（每个进程一次）。"""
+    global _warned_past_end
+    if last_day > CALENDAR_END and not _warned_past_end:
+        _warned_past_end = True
+        print(f"!!! WARNING: trading calendar HOLIDAYS only covers dates up to {CALENDAR_END}; "
+              f"holidays after that are treated as trading days. "
+              f"Add the exchange holiday schedule for {last_day.astype('datetime64[Y]')} to trading_calendar.HOLIDAYS. !!!")
+
+# 交易时段（北京时间，相对交易日 00:00 的分钟数；夜盘在前一自然日晚上，为负数）
+Session = Tuple[int, int]
+
+
+def _minutes(clock: str, previous_evening: bool = False) -> int:
+    hours, minutes = map(int, clock.split(':'))
+    value = hours * 60 + minutes
+    return value - 24 * 60 if previous_evening else value
+
+
+COMMODITY_DAY: List[Session] = [(_minutes("09:00"), _minutes("10:15")), (_minutes("10:30"), _minutes("11:30")),
+                                (_minutes("13:30"), _minutes("15:00"))]
+INDEX_DAY: List[Session] = [(_minutes("09:30"), _minutes("11:30")), (_minutes("13:00"), _minutes("15:00"))]
+BOND_DAY: List[Session] = [(_minutes("09:30"), _minutes("11:30")), (_minutes("13:00"), _minutes("15:15"))]
+
+NIGHT_2300: List[Session] = [(_minutes("21:00", True), _minutes("23:00", True))]
+NIGHT_0100: List[Session] = [(_minutes("21:00", True), _minutes("01:00"))]
+NIGHT_0230: List[Session] = [(_minutes("21:00", True), _minutes("02:30"))]
+
+_NIGHT_PRODUCTS = {
+    **{code: NIGHT_0230 for code in ["au", "ag", "sc"]},
+    **{code: NIGHT_0100 for code in ["cu", "al", "zn", "pb", "ni", "sn", "ss", "ao", "bc"]},
+    **{code: NIGHT_2300 for code in [
+        # 上期所 / 能源中心
+        "rb", "hc", "bu", "ru", "fu", "sp", "br", "lu", "nr",
+        # 大商所
+        "a", "b", "m", "y", "p", "c", "cs", "i", "j", "jm", "l", "v", "pp", "eg", "eb", "pg", "rr",
+        # 郑商所
+        "SR", "CF", "TA", "MA", "RM", "OI", "FG", "ZC", "SA", "PF", "CY", "SH", "PX",
+    ]},
+}
+_DAY_PRODUCTS = {
+    **{code: INDEX_DAY for code in ["IF", "IH", "IC", "IM"]},
+    **{code: BOND_DAY for code in ["T", "TF", "TS", "TL"]},
+}
+
+
+def product_code(symbol: str) -> str:
+    """'SHFE.rb2410' / 'KQ.m@SHFE.rb' -> 'rb'"""
+    return re.sub(r'\d+$', '', symbol.rsplit('.', 1)[-1])
+
+
+def product_sessions(symbol: str) -> Tuple[List[Session], List[Session]]:
+    """
+    返回品种的 (日盘, 夜盘) 时段。未登记的品种按最长的夜盘估计，
+    宁可多请求少量K线，也不漏掉数据。
+    """
+    code = product_code(symbol)
+    day = _DAY_PRODUCTS.get(code, COMMODITY_DAY)
+    if code in _NIGHT_PRODUCTS:
+        night = _NIGHT_PRODUCTS[code]
+    elif code in _DAY_PRODUCTS:
+        night = []
+    else:
+        night = NIGHT_0230
+    return day, night
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, '%Y%m%d').date()
+
+
+def format_date(value: date) -> str:
+    return value.strftime('%Y%m%d')
+
+
+def shanghai_date_bounds_ns(start_date: str, end_date: str) -> Tuple[int, int]:
+    """返回 [start_date 00:00, end_date 次日 00:00) 北京时间对应的 UTC epoch 纳秒区间。"""
+    start_day = np.datetime64(parse_date(start_date), 'D').astype(np.int64)
+    end_day = np.datetime64(parse_date(end_date), 'D').astype(np.int64) + 1
+    return int(start_day * NS_PER_DAY - SHANGHAI_OFFSET_NS), int(end_day * NS_PER_DAY - SHANGHAI_OFFSET_NS)
+
+
+def trading_days(start: np.datetime64, end: np.datetime64) -> np.ndarray:
+    """[start, end] 内的交易日（datetime64[D]）。"""
+    _check_coverage(np.datetime64(end, 'D'))
+    days = np.arange(start, end + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+    return days[np.is_busday(days, busdaycal=BUSDAY_CALENDAR)]
+
+
+def roll_to_trading_day(days: np.ndarray) -> np.ndarray:
+    """非交易日顺延到下一个交易日。"""
+    if len(days):
+        _check_coverage(days.max())
+    return np.busday_offset(days, 0, roll='forward', busdaycal=BUSDAY_CALENDAR)
+
+
+def has_night_session(days: np.ndarray) -> np.ndarray:
+    """
+    交易日 days 是否有（前一晚开始的）夜盘。节假日前最后一个交易日晚上不开夜盘，
+    即只有上一个交易日恰好是上一个工作日（周五之于周一也算）时才有夜盘。
+    """
+    previous_trading = np.busday_offset(days, -1, roll='backward', busdaycal=BUSDAY_CALENDAR)
+    previous_weekday = np.busday_offset(days, -1, roll='backward')
+    return previous_trading == previous_weekday
+
+
+def _bar_offsets(sessions: List[Session], duration_seconds: int) -> np.ndarray:
+    """一组时段内各K线的起始时间（相对交易日 00:00 的纳秒），K线按北京时间整点对齐。"""
+    if not sessions:
+        return np.empty(0, dtype=np.int64)
+    minutes = np.concatenate([np.arange(begin, end) for begin, end in sessions])
+    width = duration_seconds // 60
+    return np.unique(minutes - minutes % width).astype(np.int64) * NS_PER_MINUTE
+
+
+def _night_base_ns(days: np.ndarray) -> np.ndarray:
+    """
+    夜盘时段相对的基准时间（UTC epoch 纳秒）。夜盘开在上一个工作日晚上，
+    周一的夜盘是上周五 21:00 至周六凌晨，因此基准是上一个工作日的次日 00:00，而不是交易日本身。
+    """
+    previous_weekday = np.busday_offset(days, -1, roll='backward')
+    return (previous_weekday.astype(np.int64) + 1) * NS_PER_DAY - SHANGHAI_OFFSET_NS
+
+
+def session_bar_times(symbol: str, duration_seconds: int, start_date: str, end_date: str) -> np.ndarray:
+    """
+    [start_date, end_date] 各交易日（含其夜盘）按交易时段应有的K线起始时间，UTC epoch 纳秒，升序。
+    日线每个交易日一根，时间为交易日 00:00。
+    """
+    days = trading_days(np.datetime64(parse_date(start_date)), np.datetime64(parse_date(end_date)))
+    day_starts = days.astype(np.int64) * NS_PER_DAY - SHANGHAI_OFFSET_NS
+    if duration_seconds >= 24 * 3600:
+        return day_starts
+
+    day_sessions, night_sessions = product_sessions(symbol)
+    day_bars = day_starts[:, None] + _bar_offsets(day_sessions, duration_seconds)[None, :]
+    with_night = has_night_session(days)
+    night_bars = _night_base_ns(days[with_night])[:, None] + _bar_offsets(night_sessions, duration_seconds)[None, :]
+    return np.sort(np.concatenate([night_bars.ravel(), day_bars.ravel()]))
+
+
+def _session_opens_ns(symbol: str, days: np.ndarray) -> np.ndarray:
+    """各交易日第一根K线（夜盘或日盘开盘）的开始时间，UTC epoch 纳秒。"""
+    day_sessions, night_sessions = product_sessions(symbol)
+    day_open = days.astype(np.int64) * NS_PER_DAY - SHANGHAI_OFFSET_NS + day_sessions[0][0] * NS_PER_MINUTE
+    if not night_sessions:
+        return day_open
+    night_open = _night_base_ns(days) + night_sessions[0][0] * NS_PER_MINUTE
+    return np.where(has_night_session(days), night_open, day_open)
+
+
+def bar_count(symbol: str, duration_seconds: int, start_date: str, now: Optional[datetime] = None) -> int:
+    """
+    从 start_date 00:00（北京时间）到 now（UTC）已经开始的K线根数。
+    tqsdk 的 get_kline_serial 返回截至当前的最近 data_length 根，据此即可精确覆盖 start_date。
+    """
+    now = now or datetime.utcnow()
+    now_ns = int(np.datetime64(now, 'ns').astype(np.int64))
+    lo, _ = shanghai_date_bounds_ns(start_date, start_date)
+    # 往后多看几天，覆盖今晚已开盘、归属下一交易日的夜盘（及其日线）
+    horizon = format_date((now + timedelta(hours=8)).date() + timedelta(days=7))
+    times = session_bar_times(symbol, duration_seconds, start_date, horizon)
+    if duration_seconds >= 24 * 3600:
+        days = ((times + SHANGHAI_OFFSET_NS) // NS_PER_DAY).astype('datetime64[D]')
+        opens = _session_opens_ns(symbol, days)
+    else:
+        opens = times
+    return int(np.count_nonzero((times >= lo) & (opens <= now_ns)))
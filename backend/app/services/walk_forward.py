@@ -0,0 +1,99 @@
+# backend/app/services/walk_forward.py
+"""
+步进（walk-forward）优化的折划分与样本外权益拼接。
+
+区间 start..end 按北京时间日期滚动划分：第 k 折的样本内为 [start + k*oos, start + k*oos + is)，
+紧随其后的 oos 天为样本外，各折样本外首尾相接、互不重叠。折只由日期决定，
+不需要先加载K线；加载一次完整区间后按各折边界二分查找切片即可。
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Tuple
+
+import numpy as np
+
+from app.services.execution import ExecutionResult
+from app.services.trading_calendar import shanghai_date_bounds_ns
+
+DATE_FORMAT = '%Y%m%d'
+
+
+@dataclass
+class Fold:
+    """一折的日期边界（均含首尾）。"""
+    index: int
+    in_sample_start: date
+    in_sample_end: date
+    out_of_sample_start: date
+    out_of_sample_end: date
+
+    def describe(self) -> dict:
+        return {
+            "fold": self.index,
+            "in_sample_start": self.in_sample_start.strftime(DATE_FORMAT),
+            "in_sample_end": self.in_sample_end.strftime(DATE_FORMAT),
+            "out_of_sample_start": self.out_of_sample_start.strftime(DATE_FORMAT),
+            "out_of_sample_end": self.out_of_sample_end.strftime(DATE_FORMAT),
+        }
+
+
+def make_folds(start: date, end: date, in_sample_days: int, out_of_sample_days: int) -> List[Fold]:
+    """滚动划分 [start, end]；最后一折的样本外截止到 end。区间容不下一折时抛出 ValueError。"""
+    folds = []
+    in_sample_start = start
+    while True:
+        out_of_sample_start = in_sample_start + timedelta(days=in_sample_days)
+        if out_of_sample_start > end:
+            break
+        folds.append(Fold(
+            index=len(folds),
+            in_sample_start=in_sample_start,
+            in_sample_end=out_of_sample_start - timedelta(days=1),
+            out_of_sample_start=out_of_sample_start,
+            out_of_sample_end=min(out_of_sample_start + timedelta(days=out_of_sample_days - 1), end),
+        ))
+        in_sample_start += timedelta(days=out_of_sample_days)
+    if not folds:
+        raise ValueError(f"Date range {start}..{end} is shorter than the {in_sample_days}-day in-sample window.")
+    return folds
+
+
+def fold_bars(timestamps: np.ndarray, fold: Fold) -> Tuple[int, int, int]:
+    """一折在整段K线中的下标：(样本内起点, 样本外起点, 样本外终点（不含）)。"""
+    in_sample_lo, out_of_sample_lo = shanghai_date_bounds_ns(
+        fold.in_sample_start.strftime(DATE_FORMAT), fold.in_sample_end.strftime(DATE_FORMAT))
+    _, out_of_sample_hi = shanghai_date_bounds_ns(
+        fold.out_of_sample_start.strftime(DATE_FORMAT), fold.out_of_sample_end.strftime(DATE_FORMAT))
+    lo, mid, hi = np.searchsorted(timestamps, [in_sample_lo, out_of_sample_lo, out_of_sample_hi], side='left')
+    return int(lo), int(mid), int(hi)
+
+
+def stitch(executions: List[ExecutionResult], initial_cash: float) -> Tuple[np.ndarray, List[float], float]:
+    """
+    把各折的样本外权益首尾相接为一条曲线：每折以上一折期末（平仓后）的权益开始。
+    全仓撮合的结果与初始资金成正比，所以各折按同一初始资金回测后乘以累计倍数即可，不必串行重跑。
+    返回 (拼接后的权益, 各折的倍数, 期末权益)。
+    """
+    scales, pieces = [], []
+    scale = 1.0
+    for execution in executions:
+        scales.append(scale)
+        pieces.append(execution.equity * scale)
+        scale *= execution.final_equity / initial_cash
+    equity = np.concatenate(pieces) if pieces else np.empty(0)
+    return equity, scales, initial_cash * scale
+
+
+def stitched_execution(executions: List[ExecutionResult], scales: List[float], final_equity: float) -> ExecutionResult:
+    """把各折撮合结果按 stitch 的倍数缩放后拼接为一个整体，成交下标相对于拼接后的 bar 序列。"""
+    offsets = np.cumsum([0] + [len(execution.equity) for execution in executions[:-1]])
+    return ExecutionResult(
+        cash=np.concatenate([execution.cash * scale for execution, scale in zip(executions, scales)]),
+        position=np.concatenate([execution.position * scale for execution, scale in zip(executions, scales)]),
+        equity=np.concatenate([execution.equity * scale for execution, scale in zip(executions, scales)]),
+        trade_index=np.concatenate([execution.trade_index + offset for execution, offset in zip(executions, offsets)]),
+        trade_side=np.concatenate([execution.trade_side for execution in executions]),
+        trade_price=np.concatenate([execution.trade_price for execution in executions]),
+        trade_shares=np.concatenate([execution.trade_shares * scale for execution, scale in zip(executions, scales)]),
+        final_equity=final_equity,
+    )
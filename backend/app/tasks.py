@@ -1,21 +1,40 @@
 # backend/app/tasks.py
+import numpy as np
 import pandas as pd
-import importlib.util
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
+from functools import partial
 import math
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from celery.signals import worker_process_shutdown, worker_shutdown
 
 from app.celery_app import celery_app
+from app.core.config import (
+    PREFETCH_MAX_SYMBOLS, PREFETCH_MAX_BYTES, PREFETCH_RECENT_DAYS, PREFETCH_HISTORY_DAYS, SWEEP_PROCESSES,
+    OPTIMIZATION_BUDGET, RESULT_CACHE_ENABLED, SERIES_STORAGE,
+)
 from app.db.session import SessionLocal
 from app.crud import crud_backtest, crud_strategy
-from app.schemas.backtest import BacktestResultUpdate, BacktestResultCreate, KlineDuration
+from app.schemas.backtest import (
+    BacktestResultUpdate, BacktestResultCreate, KlineDuration, OptimizationMethod, OptimizationMode,
+)
 from app.services.data_service import data_service
-from app.services.strategy_base import BaseStrategy
+from app.services import (
+    analytics, indicators, optimizers, prefetcher, progress, result_cache, series_codec, sweep, walk_forward,
+)
+from app.services.bar_window import BarWindow
+from app.services.execution import ExecutionResult, execute_signals, equity_records, trade_records
+from app.services.kline_store import format_timestamps, parse_timestamps
+from app.services.strategy_base import (
+    SIGNAL_BUY, SIGNAL_SELL, SIGNAL_FLAT, compile_strategy, uses_trade_date, with_trade_date,
+)
+from app.services.trading_calendar import NS_PER_DAY
 
 class SimpleBacktester:
     def __init__(self, backtest_id: int, symbol: str, duration: KlineDuration, start_date: str, end_date: str, strategy_code: str, 
                  commission_rate: float, slippage: float,
-                 initial_cash: float = 100000.0, params_override: Optional[Dict] = None):
+                 initial_cash: float = 100000.0, params_override: Optional[Dict] = None,
+                 strategy_class: Optional[type] = None, reporter: Optional[progress.ProgressReporter] = None):
         self.backtest_id = backtest_id
         self.symbol = symbol
         self.duration = duration
@@ -28,156 +47,201 @@ class SimpleBacktester:
         self.cash = initial_cash
         self.position = 0
         self.total_equity = initial_cash
-        self.equity_curve = []
-        self.trades = []
-        self.last_signal = None
+        self.execution: Optional[ExecutionResult] = None
+        self.timestamps: Optional[np.ndarray] = None  # 各 bar 的 UTC epoch 纳秒
         self.params_override = params_override or {}
+        # 已编译的 Strategy 类（参数扫描时共用），为空时在运行时编译 strategy_code
+        self.strategy_class = strategy_class
+        # 策略通过 self.context.indicators 计算指标，运行时绑定到传给策略的K线
+        self.indicators = indicators.Indicators()
+        # 单次回测任务的进度上报，参数扫描中的回测不上报
+        self.reporter = reporter
 
-    def _execute_strategy_code(self, data: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _execute_strategy_code(self, data: pd.DataFrame) -> np.ndarray:
+        """运行策略，返回与 data 逐行对齐的 int8 信号数组。"""
         try:
-            spec = importlib.util.spec_from_loader("strategy_module", loader=None)
-            strategy_module = importlib.util.module_from_spec(spec)
-            
-            # 【修复】手动注入 BaseStrategy 到策略模块的命名空间
-            strategy_module.BaseStrategy = BaseStrategy
-            
-            exec(self.strategy_code, strategy_module.__dict__)
-            
-            strategy_class = strategy_module.Strategy
+            strategy_class = self.strategy_class or compile_strategy(self.strategy_code)
             strategy_instance = strategy_class(context=self, **self.params_override)
             strategy_instance.initialize()
 
+            # 内部只使用 int64 的 datetime 列，仍读取 trade_date 的旧策略才补上字符串列
+            if uses_trade_date(self.strategy_code):
+                data = with_trade_date(data)
+
+            # 优先使用向量化信号：一次调用得到整列信号，避免逐 bar 切片带来的 O(n²) 开销
+            self.indicators.bind(data, self._data_key(data))
+            signal_column = strategy_instance.generate_signals(data)
+            if signal_column is not None:
+                return self._align_signal_column(data, signal_column)
+
+            # 逐 bar 模式：向策略传递固定长度的滚动窗口，而不是不断增长的 data.iloc[:i+1]
             all_signals = []
-            long_window_val = getattr(strategy_instance, 'long_window', 50)
-            for i in range(long_window_val, len(data)):
-                current_data = data.iloc[:i+1]
-                signals = strategy_instance.handle_data(current_data)
+            lookback = strategy_instance.lookback
+            window = BarWindow.from_frame(data.iloc[:lookback - 1], lookback)
+            columns = [data[name].to_numpy() for name in window.columns]
+            for i in range(lookback - 1, len(data)):
+                window.push([column[i] for column in columns])
+                frame = window.frame()
+                self.indicators.bind(frame)
+                signals = strategy_instance.handle_data(frame)
                 if signals:
                     all_signals.extend(signals)
-            return all_signals
+                if self.reporter is not None:
+                    self.reporter.update(i + 1, lambda: self._partial_equity(data, all_signals, i + 1))
+            return self._align_signal_list(data, all_signals)
         except Exception as e:
             raise type(e)(f"Error executing strategy code: {e}. Ensure it has a 'Strategy' class inheriting from BaseStrategy.")
     
-    def run(self) -> Dict[str, Any]:
-        data = data_service.get_kline_data(self.symbol, self.duration, self.start_date, self.end_date)
+    def _partial_equity(self, data: pd.DataFrame, signals: List[Dict[str, Any]], bars: int) -> float:
+        """逐 bar 模式下按已产生的信号撮合前 bars 根K线，得到当前权益（只在发布进度时计算）。"""
+        head = data.iloc[:bars]
+        execution = execute_signals(head['close'].to_numpy(dtype=np.float64), self._align_signal_list(head, signals),
+                                    self.initial_cash, self.commission_rate, self.slippage)
+        return float(execution.equity[-1])
+
+    def _data_key(self, data: pd.DataFrame) -> tuple:
+        """标识整段K线：参数扫描中各组参数拿到的是同一段数据，指标缓存按它区分。"""
+        timestamps = data['datetime'].to_numpy()
+        return (self.symbol, KlineDuration(self.duration).value, len(data), int(timestamps[0]), int(timestamps[-1]))
+
+    @staticmethod
+    def _align_signal_column(data: pd.DataFrame, signal_column) -> np.ndarray:
+        """把 generate_signals 返回的信号列规整为 int8 数组（兼容 'buy'/'sell' 字符串）。"""
+        values = pd.Series(signal_column).to_numpy()
+        if len(values) != len(data):
+            raise ValueError(f"generate_signals returned {len(values)} values for {len(data)} bars.")
+        if values.dtype == object:
+            values = pd.Series(values).map({'buy': SIGNAL_BUY, 'sell': SIGNAL_SELL}).fillna(SIGNAL_FLAT).to_numpy()
+        values = np.nan_to_num(values.astype(np.float64))
+        return np.sign(values).astype(np.int8)
+
+    @staticmethod
+    def _align_signal_list(data: pd.DataFrame, signals: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        把 handle_data 产生的 [{'datetime', 'signal'}] 按时间对齐到每根 bar，同一时间以第一个信号为准。
+        旧策略返回的 {'date': 'YYYYMMDD HH:MM:SS'} 会先解析为时间戳。
+        """
+        if not signals:
+            return np.zeros(len(data), dtype=np.int8)
+        sides = np.array(
+            [SIGNAL_BUY if s['signal'] == 'buy' else SIGNAL_SELL if s['signal'] == 'sell' else SIGNAL_FLAT for s in signals],
+            dtype=np.int8,
+        )
+        timestamps = np.empty(len(signals), dtype=np.int64)
+        legacy = np.array(['datetime' not in s for s in signals])
+        timestamps[~legacy] = [s['datetime'] for s, old in zip(signals, legacy) if not old]
+        if legacy.any():
+            timestamps[legacy] = parse_timestamps([s['date'] for s, old in zip(signals, legacy) if old])
+
+        # 每个时间点取第一个信号，再用二分查找对齐到 bar
+        first_timestamps, first = np.unique(timestamps, return_index=True)
+        bar_timestamps = data['datetime'].to_numpy()
+        positions = np.searchsorted(first_timestamps, bar_timestamps)
+        positions = np.minimum(positions, len(first_timestamps) - 1)
+        matched = first_timestamps[positions] == bar_timestamps
+        return np.where(matched, sides[first][positions], SIGNAL_FLAT).astype(np.int8)
+
+    def run(self, data: Optional[pd.DataFrame] = None, trade_start: int = 0) -> Dict[str, Any]:
+        """
+        data 为空时按回测区间获取K线；参数扫描时传入已加载的同一份K线。
+        trade_start 之前的K线只用于策略预热（如步进优化样本外评估前的样本内K线），从 trade_start 起空仓开始撮合。
+        """
+        if data is None:
+            if self.reporter is not None:
+                self.reporter.stage("loading")
+            data = data_service.get_kline_data(self.symbol, self.duration, self.start_date, self.end_date)
         if data.empty:
             raise ValueError("Failed to fetch data for backtest.")
+        if trade_start >= len(data):
+            raise ValueError("No bars left to trade after the warm-up period.")
 
-        signals = self._execute_strategy_code(data.copy())
-        if signals:
-            signals_df = pd.DataFrame(signals).set_index('date')
-        else:
-            signals_df = pd.DataFrame()
-        
-        for index, row in data.iterrows():
-            current_price = row['close']
-            trade_date = row['trade_date']
-            
-            if not signals_df.empty and trade_date in signals_df.index:
-                signal_data = signals_df.loc[trade_date]
-                signal = signal_data['signal'] if isinstance(signal_data, pd.Series) else signal_data['signal'].iloc[0]
-
-                if signal == 'buy' and self.position == 0 and self.last_signal != 'buy':
-                    buy_price = current_price + self.slippage
-                    shares_to_buy = self.cash / buy_price
-                    commission = shares_to_buy * buy_price * self.commission_rate
-                    
-                    self.position = shares_to_buy
-                    self.cash -= commission
-                    self.trades.append({'date': trade_date, 'type': 'buy', 'price': buy_price, 'shares': shares_to_buy})
-                    self.last_signal = 'buy'
-
-                elif signal == 'sell' and self.position > 0 and self.last_signal != 'sell':
-                    sell_price = current_price - self.slippage
-                    shares_sold = self.position
-                    sale_value = shares_sold * sell_price
-                    commission = sale_value * self.commission_rate
-
-                    self.cash = sale_value - commission
-                    self.position = 0
-                    self.trades.append({'date': trade_date, 'type': 'sell', 'price': sell_price, 'shares': shares_sold})
-                    self.last_signal = 'sell'
-            
-            self.total_equity = self.cash + self.position * current_price
-            self.equity_curve.append({'date': trade_date, 'pnl': self.total_equity})
-
-        if self.position > 0:
-            self.cash = self.position * data['close'].iloc[-1]
-            self.position = 0
-            self.total_equity = self.cash
+        if self.reporter is not None:
+            self.reporter.stage("signals", total_bars=len(data))
+        signals = self._execute_strategy_code(data.copy())[trade_start:]
+        data = data.iloc[trade_start:]
+        if self.reporter is not None:
+            self.reporter.stage("execution", total_bars=len(data))
+        self.timestamps = data['datetime'].to_numpy(dtype=np.int64)
+        self.execution = execute_signals(
+            data['close'].to_numpy(dtype=np.float64), signals,
+            initial_cash=self.initial_cash,
+            commission_rate=self.commission_rate,
+            slippage=self.slippage,
+        )
+        self.cash = self.execution.final_equity
+        self.position = 0
+        self.total_equity = self.execution.final_equity
         return self.calculate_performance()
 
+    def to_records(self, dates: Optional[np.ndarray] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        在持久化边界把撮合结果数组转换为 JSON 友好的字典列表，时间在这里才格式化为字符串。
+        参数扫描中各组参数的K线相同，可以传入预先格式化好的 dates。
+        """
+        if self.execution is None:
+            return {"pnl": [], "trades": []}
+        if dates is None:
+            dates = format_timestamps(self.timestamps)
+        return {
+            "pnl": equity_records(dates, self.execution),
+            "trades": trade_records(dates, self.execution),
+        }
+
     def calculate_performance(self) -> Dict[str, Any]:
-        if not self.equity_curve:
+        if self.execution is None or len(self.execution.equity) == 0:
             return {"summary": {"error": "No trades were made or data was insufficient."}}
 
-        equity_df = pd.DataFrame(self.equity_curve)
-        equity_df['date'] = pd.to_datetime(equity_df['date'])
-        
-        # 1. 收益率计算
-        total_return = (self.total_equity / self.initial_cash - 1)
-        days = (equity_df['date'].iloc[-1] - equity_df['date'].iloc[0]).days
-        annual_return = ((1 + total_return) ** (365.0 / days) - 1) if days > 0 else 0
-        
-        # 2. 波动率和夏普比率
-        equity_df['returns'] = equity_df['pnl'].pct_change().fillna(0)
-        annual_volatility = equity_df['returns'].std() * (252 ** 0.5)
-        sharpe_ratio = (annual_return / annual_volatility) if annual_volatility != 0 else 0
-
-        # 3. 索提诺比率 (只考虑下行风险)
-        downside_returns = equity_df['returns'][equity_df['returns'] < 0]
-        downside_std = downside_returns.std() * (252 ** 0.5)
-        sortino_ratio = (annual_return / downside_std) if downside_std != 0 else 0
-
-        # 4. 最大回撤和卡玛比率
-        equity_df['peak'] = equity_df['pnl'].cummax()
-        equity_df['drawdown'] = (equity_df['pnl'] - equity_df['peak']) / equity_df['peak']
-        max_drawdown = equity_df['drawdown'].min()
-        calmar_ratio = annual_return / abs(max_drawdown) if max_drawdown != 0 else 0
-
-        # 5. 交易统计
-        num_trades = len(self.trades) // 2
-        winning_trades = 0
-        losing_trades = 0
-        profit_factor = 0
-        win_rate = 0
-
-        if num_trades > 0:
-            trade_returns = []
-            for i in range(0, len(self.trades) - 1, 2):
-                buy_trade = self.trades[i]
-                sell_trade = self.trades[i+1]
-                trade_return = (sell_trade['price'] - buy_trade['price']) / buy_trade['price']
-                trade_returns.append(trade_return)
-            
-            wins = [r for r in trade_returns if r > 0]
-            losses = [r for r in trade_returns if r <= 0]
-            winning_trades = len(wins)
-            losing_trades = len(losses)
-            win_rate = winning_trades / num_trades if num_trades > 0 else 0
-            
-            total_profit = sum(wins)
-            total_loss = abs(sum(losses))
-            profit_factor = total_profit / total_loss if total_loss > 0 else float('inf')
-
-        summary = {
-            "initial_equity": self.initial_cash,
-            "final_equity": self.total_equity,
-            "total_return": total_return,
-            "annualized_return": annual_return,
-            "annualized_volatility": annual_volatility,
-            "sharpe_ratio": sharpe_ratio,
-            "sortino_ratio": sortino_ratio,
-            "calmar_ratio": calmar_ratio,
-            "max_drawdown": max_drawdown,
-            "total_trades": num_trades,
-            "winning_trades": winning_trades,
-            "losing_trades": losing_trades,
-            "win_rate": win_rate,
-            "profit_factor": profit_factor,
-        }
-        
-        return {"summary": summary, "daily_pnl": self.equity_curve, "trades": self.trades}
+        summary = analytics.summarize(
+            self.execution.equity,
+            days=int(self.timestamps[-1] - self.timestamps[0]) // NS_PER_DAY,
+            initial_equity=self.initial_cash,
+            final_equity=self.total_equity,
+            trade_price=self.execution.trade_price,
+            position=self.execution.position,
+        )
+        return {"summary": summary}
+
+
+@worker_process_shutdown.connect
+def release_shared_klines(**kwargs):
+    """prefork 子进程退出时关闭它映射的共享内存K线段，并从各段的引用计数中移除。"""
+    if data_service.shared is not None:
+        data_service.shared.release_all()
+
+
+@worker_shutdown.connect
+def clear_shared_klines(**kwargs):
+    """worker 主进程停止时 unlink 本节点的全部共享内存K线段，不在 /dev/shm 中留下数据。"""
+    if data_service.shared is not None:
+        data_service.shared.clear()
+
+
+def _series_fields(timestamps: np.ndarray, execution: ExecutionResult,
+                   dates: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    结果行中权益曲线和成交的持久化字段：binary 格式为 series（压缩后写入 backtest_series 表），
+    json 格式为 daily_pnl 列。dates 是 timestamps 预先格式化好的时间，只有 json 格式用到。
+    """
+    if SERIES_STORAGE == "binary":
+        return {"series": series_codec.encode(timestamps, execution)}
+    if dates is None:
+        dates = format_timestamps(timestamps)
+    return {"daily_pnl": {"pnl": equity_records(dates, execution), "trades": trade_records(dates, execution)}}
+
+
+def _load_strategy_code(db, strategy_id: int) -> str:
+    strategy = crud_strategy.get_strategy(db, strategy_id)
+    if not strategy:
+        raise ValueError("Strategy not found")
+
+    if not strategy.script_path:
+        raise ValueError(f"Strategy '{strategy.name}' has no script path.")
+
+    try:
+        with open(strategy.script_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        raise ValueError(f"Strategy script file not found at path: {strategy.script_path}")
 
 
 @celery_app.task
@@ -188,26 +252,18 @@ def run_backtest_task(backtest_id: int, params_override: Optional[Dict] = None):
         db.close()
         return
 
+    # 参数和 RUNNING 状态在同一次提交中写入
+    running_update: Dict[str, Any] = {"status": "RUNNING"}
     if params_override:
         summary = backtest_record.summary or {}
         summary['params'] = params_override
-        crud_backtest.update_backtest_result(db, db_obj=backtest_record, obj_in={"summary": summary})
-    
-    crud_backtest.update_backtest_result(db, db_obj=backtest_record, obj_in={"status": "RUNNING"})
-    
-    try:
-        strategy = crud_strategy.get_strategy(db, backtest_record.strategy_id)
-        if not strategy:
-            raise ValueError("Strategy not found")
-        
-        if not strategy.script_path:
-            raise ValueError(f"Strategy '{strategy.name}' has no script path.")
+        running_update["summary"] = summary
+    crud_backtest.update_backtest_result(db, db_obj=backtest_record, obj_in=running_update)
+    # 进度经 progress.channel 推送到 API 进程的 websocket，前端不必轮询
+    reporter = progress.ProgressReporter(backtest_id, progress.channel) if progress.channel is not None else None
 
-        try:
-            with open(strategy.script_path, 'r', encoding='utf-8') as f:
-                strategy_code_content = f.read()
-        except FileNotFoundError:
-            raise ValueError(f"Strategy script file not found at path: {strategy.script_path}")
+    try:
+        strategy_code_content = _load_strategy_code(db, backtest_record.strategy_id)
 
         start_date_formatted = backtest_record.start_dt.strftime('%Y%m%d')
         end_date_formatted = backtest_record.end_dt.strftime('%Y%m%d')
@@ -221,25 +277,32 @@ def run_backtest_task(backtest_id: int, params_override: Optional[Dict] = None):
             strategy_code=strategy_code_content,
             commission_rate=backtest_record.commission_rate,
             slippage=backtest_record.slippage,
-            params_override=params_override
+            params_override=params_override,
+            reporter=reporter,
         )
         
         result = backtester.run()
-        
-        daily_pnl_with_trades = {
-            "pnl": result.get("daily_pnl", []),
-            "trades": result.get("trades", [])
-        }
 
         final_summary = backtest_record.summary or {}
         final_summary.update(result["summary"])
 
-        update_data = BacktestResultUpdate(
-            status="SUCCESS",
-            summary=final_summary,
-            daily_pnl=daily_pnl_with_trades
-        )
-        crud_backtest.update_backtest_result(db, db_obj=backtest_record, obj_in=update_data)
+        # 状态、汇总和（压缩后的）权益曲线在同一次提交中写入
+        crud_backtest.update_backtest_results(db, [{
+            "id": backtest_id, "status": "SUCCESS", "summary": final_summary,
+            **_series_fields(backtester.timestamps, backtester.execution),
+        }])
+
+        # 按实际运行的源码和输入记录指纹，之后相同输入的回测直接返回本结果
+        if RESULT_CACHE_ENABLED:
+            fingerprint = result_cache.fingerprint(
+                backtest_record.strategy_id, strategy_code_content, backtest_record.symbol, backtest_record.duration,
+                backtest_record.start_dt, backtest_record.end_dt, backtest_record.commission_rate,
+                backtest_record.slippage, params_override,
+            )
+            if fingerprint:
+                crud_backtest.save_backtest_fingerprint(db, fingerprint, backtest_id)
+        if reporter is not None:
+            reporter.finish("SUCCESS")
 
     except Exception as e:
         import traceback
@@ -248,6 +311,8 @@ def run_backtest_task(backtest_id: int, params_override: Optional[Dict] = None):
         error_summary["error"] = str(e)
         update_data = BacktestResultUpdate(status="FAILURE", summary=error_summary)
         crud_backtest.update_backtest_result(db, db_obj=backtest_record, obj_in=update_data)
+        if reporter is not None:
+            reporter.finish("FAILURE", error=str(e))
     finally:
         db.close()
 
@@ -256,45 +321,312 @@ def run_optimization_task(
     strategy_id: int,
     backtest_params: dict,
     optimization_params: List[Dict[str, Any]],
-    optimization_id: str
+    optimization_id: str,
+    mode: str = OptimizationMode.sweep.value,
+    method: str = OptimizationMethod.grid.value,
+    budget: Optional[int] = None,
+    seed: Optional[int] = None,
+    walk_forward_params: Optional[Dict[str, Any]] = None,
 ):
-    import numpy as np
-    from itertools import product
+    make_optimizer = partial(
+        optimizers.create_optimizer, method, sweep.param_space(optimization_params), budget or OPTIMIZATION_BUDGET, seed,
+    )
 
-    param_ranges = []
-    param_names = []
-    for p in optimization_params:
-        param_names.append(p['name'])
-        param_ranges.append(np.arange(p['start'], p['end'] + p['step'], p['step']))
+    print(f"Starting optimization {optimization_id} for strategy {strategy_id} ({mode}, {method}).")
 
-    param_combinations = list(product(*param_ranges))
-    
-    print(f"Starting optimization {optimization_id} for strategy {strategy_id} with {len(param_combinations)} combinations.")
+    # 【修正】: 将 backtest_params 中的字符串转回对象
+    params_for_db = {
+        "symbol": backtest_params['symbol'],
+        "duration": KlineDuration(backtest_params['duration']),
+        "start_dt": datetime.fromisoformat(backtest_params['start_dt_iso']),
+        "end_dt": datetime.fromisoformat(backtest_params['end_dt_iso']),
+        "commission_rate": backtest_params['commission_rate'],
+        "slippage": backtest_params['slippage'],
+    }
+
+    if mode == OptimizationMode.walk_forward.value:
+        _run_walk_forward(strategy_id, params_for_db, make_optimizer, walk_forward_params, optimization_id)
+        print(f"Optimization {optimization_id} finished.")
+        return
+
+    optimizer = make_optimizer(batch_size=sweep.pool_size(SWEEP_PROCESSES))
+    if mode == OptimizationMode.sweep.value:
+        print(f"Optimization {optimization_id}: {optimizer.planned_results()} evaluations.")
+        _run_sweep(strategy_id, params_for_db, optimizer, optimization_id)
+        print(f"Optimization {optimization_id} finished.")
+        return
+
+    # 独立任务模式下各组参数互不可见，只能分发预先确定的网格
+    if not isinstance(optimizer, optimizers.GridSearch):
+        raise ValueError(f"Optimization method '{method}' cannot run in mode '{OptimizationMode.tasks.value}'.")
+    param_sets = optimizer.param_sets
+
+    db = SessionLocal()
+    try:
+        # 所有结果行用一条 INSERT ... RETURNING 创建，再逐个分发回测任务
+        backtest_ids = crud_backtest.create_backtest_results(db, objs_in=[
+            BacktestResultCreate(strategy_id=strategy_id, optimization_id=optimization_id, **params_for_db)
+            for _ in param_sets
+        ])
+    finally:
+        db.close()
+
+    for backtest_id, param_set in zip(backtest_ids, param_sets):
+        run_backtest_task.delay(backtest_id, params_override=param_set)
     
+    print(f"Optimization {optimization_id} finished dispatching all tasks.")
+
+
+def _sweep_evaluator(backtester_params: Dict[str, Any], strategy_class: type, data: pd.DataFrame,
+                     dates: np.ndarray, with_records: bool = True) -> sweep.Evaluator:
+    """
+    单组参数的求值函数：复用已加载的K线、已编译的策略类和已格式化的时间，只运行信号与撮合。
+    不写入结果行的中间求值（步进优化的样本内搜索）用 with_records=False 跳过权益曲线的编码。
+    """
+    def evaluate(params: Dict[str, Any]) -> Dict[str, Any]:
+        backtester = SimpleBacktester(strategy_class=strategy_class, params_override=params, **backtester_params)
+        try:
+            result = backtester.run(data)
+            evaluation = {"status": "SUCCESS", "summary": {"params": params, **result["summary"]}}
+            if with_records:
+                evaluation.update(_series_fields(backtester.timestamps, backtester.execution, dates))
+            return evaluation
+        except Exception as e:
+            return {"status": "FAILURE", "summary": {"params": params, "error": str(e)}}
+    return evaluate
+
+
+def _load_sweep_inputs(db, strategy_id: int, params_for_db: Dict[str, Any]):
+    """一次加载扫描所需的全部输入: (回测参数, 已编译的策略类, 完整区间的K线, 格式化好的时间)。"""
+    strategy_code = _load_strategy_code(db, strategy_id)
+    start_date = params_for_db["start_dt"].strftime('%Y%m%d')
+    end_date = params_for_db["end_dt"].strftime('%Y%m%d')
+    data = data_service.get_kline_data(params_for_db["symbol"], params_for_db["duration"], start_date, end_date)
+    if data.empty:
+        raise ValueError("Failed to fetch data for backtest.")
+
+    backtester_params = {
+        "backtest_id": 0,
+        "symbol": params_for_db["symbol"],
+        "duration": params_for_db["duration"],
+        "start_date": start_date,
+        "end_date": end_date,
+        "strategy_code": strategy_code,
+        "commission_rate": params_for_db["commission_rate"],
+        "slippage": params_for_db["slippage"],
+    }
+    return backtester_params, compile_strategy(strategy_code), data, format_timestamps(data['datetime'])
+
+
+def _batch_evaluator(backtester_params: Dict[str, Any], strategy_class: type, data: pd.DataFrame, dates: np.ndarray,
+                     processes: int, with_records: bool = True) -> optimizers.BatchEvaluator:
+    """搜索策略使用的批量求值函数：每批参数在本地进程池中求值。"""
+    def evaluate(param_sets: List[Dict[str, Any]], fraction: float) -> List[Dict[str, Any]]:
+        # fraction < 1 时只用区间开头的一部分K线（逐次减半的较短窗口），其结果只用于筛选，不编码权益曲线
+        bars = len(data) if fraction >= 1 else max(1, math.ceil(len(data) * fraction))
+        evaluator = _sweep_evaluator(backtester_params, strategy_class, data.iloc[:bars], dates[:bars],
+                                     with_records and fraction >= 1)
+        return sweep.run_sweep(evaluator, param_sets, processes)
+    return evaluate
+
+
+def _run_sweep(strategy_id: int, params_for_db: Dict[str, Any], optimizer: optimizers.Optimizer, optimization_id: str):
+    """
+    扫描模式：在本任务中完成全部评估。结果行按计划的评估次数一次性创建（RUNNING，前端据此显示进度），
+    K线和策略只加载一次，搜索策略提出的每批参数在本地进程池中求值，最后一次性写回结果。
+    """
     db = SessionLocal()
     try:
-        # 【修正】: 将 backtest_params 中的字符串转回对象
-        params_for_db = {
-            "symbol": backtest_params['symbol'],
-            "duration": KlineDuration(backtest_params['duration']),
-            "start_dt": datetime.fromisoformat(backtest_params['start_dt_iso']),
-            "end_dt": datetime.fromisoformat(backtest_params['end_dt_iso']),
-            "commission_rate": backtest_params['commission_rate'],
-            "slippage": backtest_params['slippage'],
-        }
-        
-        for combo in param_combinations:
-            param_set = {name: round(val, 2) for name, val in zip(param_names, combo)}
-            print(f"Dispatching backtest for parameters: {param_set}")
-            
-            backtest_create = BacktestResultCreate(
-                strategy_id=strategy_id,
-                optimization_id=optimization_id,
-                **params_for_db
+        backtest_ids = crud_backtest.create_backtest_results(db, objs_in=[
+            BacktestResultCreate(strategy_id=strategy_id, optimization_id=optimization_id, status="RUNNING", **params_for_db)
+            for _ in range(optimizer.planned_results())
+        ])
+        try:
+            backtester_params, strategy_class, data, dates = _load_sweep_inputs(db, strategy_id, params_for_db)
+            # 各组参数在同一段K线上计算的指标只算一次，扫描结束后释放
+            with indicators.memoize():
+                results = optimizer.run(_batch_evaluator(backtester_params, strategy_class, data, dates, SWEEP_PROCESSES))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            # 网格的参数组合是预先确定的，失败时仍记录在各行上
+            if isinstance(optimizer, optimizers.GridSearch):
+                summaries = [{"params": params} for params in optimizer.param_sets]
+            else:
+                summaries = [{} for _ in backtest_ids]
+            results = [{"status": "FAILURE", "summary": {**summary, "error": str(e)}} for summary in summaries]
+
+        crud_backtest.update_backtest_results(db, [
+            {"id": backtest_id, **result} for backtest_id, result in zip(backtest_ids, results)
+        ])
+    finally:
+        db.close()
+
+
+def _walk_forward_fold_evaluator(backtester_params: Dict[str, Any], strategy_class: type, data: pd.DataFrame,
+                                 dates: np.ndarray, folds: List[walk_forward.Fold],
+                                 make_optimizer: Callable[[], optimizers.Optimizer], processes: int) -> sweep.Evaluator:
+    """
+    步进优化单折的求值函数（{'fold': 下标} -> 结果）：在该折样本内的K线切片上搜索参数，
+    再用最优参数回测样本内加样本外的切片，只在样本外撮合（样本内K线用于指标预热）。
+    """
+    timestamps = data['datetime'].to_numpy(dtype=np.int64)
+
+    def evaluate_fold(item: Dict[str, Any]) -> Dict[str, Any]:
+        fold = folds[item["fold"]]
+        lo, mid, hi = walk_forward.fold_bars(timestamps, fold)
+        try:
+            if mid == lo or hi == mid:
+                raise ValueError("Fold has no bars in-sample or out-of-sample.")
+            search = _batch_evaluator(backtester_params, strategy_class, data.iloc[lo:mid], dates[lo:mid],
+                                      processes, with_records=False)
+            best = max(make_optimizer().run(search), key=optimizers.score)
+            if optimizers.score(best) == -math.inf:
+                raise ValueError(f"No in-sample parameter set produced a valid Sharpe ratio: "
+                                 f"{best['summary'].get('error', 'sharpe_ratio is undefined')}")
+
+            params = best["summary"]["params"]
+            backtester = SimpleBacktester(strategy_class=strategy_class, params_override=params, **backtester_params)
+            result = backtester.run(data.iloc[lo:hi], trade_start=mid - lo)
+            return {
+                "status": "SUCCESS", "fold": fold.describe(), "bars": (mid, hi), "params": params,
+                "in_sample_sharpe": best["summary"]["sharpe_ratio"], "summary": result["summary"],
+                "execution": backtester.execution,
+            }
+        except Exception as e:
+            return {"status": "FAILURE", "fold": fold.describe(), "error": str(e)}
+    return evaluate_fold
+
+
+def _walk_forward_results(fold_results: List[Dict[str, Any]], data: pd.DataFrame, dates: np.ndarray,
+                          walk_forward_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """把各折结果转换为结果行：每折一行（样本外区间），最后一行是拼接后的样本外权益和汇总。"""
+    rows, overview, succeeded = [], [], []
+    timestamps = data['datetime'].to_numpy(dtype=np.int64)
+    for fold_result in fold_results:
+        if fold_result["status"] != "SUCCESS":
+            rows.append({"status": "FAILURE", "summary": {**fold_result["fold"], "error": fold_result["error"]}})
+            overview.append({**fold_result["fold"], "error": fold_result["error"]})
+            continue
+        mid, hi = fold_result["bars"]
+        execution = fold_result["execution"]
+        rows.append({
+            "status": "SUCCESS",
+            "summary": {"params": fold_result["params"], **fold_result["fold"],
+                        "in_sample_sharpe": fold_result["in_sample_sharpe"], **fold_result["summary"]},
+            **_series_fields(timestamps[mid:hi], execution, dates[mid:hi]),
+        })
+        overview.append({**fold_result["fold"], "params": fold_result["params"],
+                         "in_sample_sharpe": fold_result["in_sample_sharpe"],
+                         "out_of_sample_sharpe": fold_result["summary"].get("sharpe_ratio")})
+        succeeded.append(fold_result)
+
+    if not succeeded:
+        rows.append({"status": "FAILURE", "summary": {"walk_forward": {**walk_forward_params, "folds": overview},
+                                                      "error": "All walk-forward folds failed."}})
+        return rows
+
+    initial_cash = succeeded[0]["summary"]["initial_equity"]
+    executions = [r["execution"] for r in succeeded]
+    equity, scales, final_equity = walk_forward.stitch(executions, initial_cash)
+    # 每折期末未平仓的买单不参与配对，避免与下一折的成交错位
+    trade_prices = [execution.trade_price[:len(execution.trade_price) // 2 * 2] for execution in executions]
+
+    first_bar, last_bar = succeeded[0]["bars"][0], succeeded[-1]["bars"][1] - 1
+    summary = analytics.summarize(
+        equity,
+        days=int(timestamps[last_bar] - timestamps[first_bar]) // NS_PER_DAY,
+        initial_equity=initial_cash,
+        final_equity=final_equity,
+        trade_price=np.concatenate(trade_prices),
+        position=np.concatenate([r["execution"].position for r in succeeded]),
+    )
+    stitched_bars = np.concatenate([np.arange(*r["bars"]) for r in succeeded])
+    rows.append({
+        "status": "SUCCESS",
+        # 最后一折选出的参数即当前推荐使用的参数
+        "summary": {"params": succeeded[-1]["params"], "walk_forward": {**walk_forward_params, "folds": overview},
+                    **summary},
+        **_series_fields(timestamps[stitched_bars], walk_forward.stitched_execution(executions, scales, final_equity),
+                         dates[stitched_bars]),
+    })
+    return rows
+
+
+def _run_walk_forward(strategy_id: int, params_for_db: Dict[str, Any], make_optimizer: Callable[..., optimizers.Optimizer],
+                      walk_forward_params: Dict[str, Any], optimization_id: str):
+    """
+    步进优化：按日期滚动划分样本内/样本外，完整区间的K线只加载一次并按折切片，
+    各折在本地进程池中并行优化，选出的参数在样本外评估，样本外权益拼接为一条曲线。
+    """
+    folds = walk_forward.make_folds(params_for_db["start_dt"].date(), params_for_db["end_dt"].date(),
+                                    walk_forward_params["in_sample_days"], walk_forward_params["out_of_sample_days"])
+    out_of_sample_ranges = [
+        {"start_dt": datetime.combine(fold.out_of_sample_start, datetime.min.time()),
+         "end_dt": datetime.combine(fold.out_of_sample_end, datetime.min.time())}
+        for fold in folds
+    ]
+    out_of_sample_ranges.append({"start_dt": out_of_sample_ranges[0]["start_dt"],
+                                 "end_dt": out_of_sample_ranges[-1]["end_dt"]})
+
+    db = SessionLocal()
+    try:
+        backtest_ids = crud_backtest.create_backtest_results(db, objs_in=[
+            BacktestResultCreate(strategy_id=strategy_id, optimization_id=optimization_id, status="RUNNING",
+                                 **{**params_for_db, **out_of_sample_range})
+            for out_of_sample_range in out_of_sample_ranges
+        ])
+        try:
+            backtester_params, strategy_class, data, dates = _load_sweep_inputs(db, strategy_id, params_for_db)
+            # 多折时按折并行，每折内部顺序求值；只有一折时把进程池留给该折内部的参数搜索
+            inner_processes = SWEEP_PROCESSES if len(folds) == 1 else 1
+            evaluate_fold = _walk_forward_fold_evaluator(
+                backtester_params, strategy_class, data, dates, folds,
+                lambda: make_optimizer(batch_size=sweep.pool_size(inner_processes)), inner_processes,
             )
-            db_backtest = crud_backtest.create_backtest_result(db, obj_in=backtest_create)
-            run_backtest_task.delay(db_backtest.id, params_override=param_set)
+            with indicators.memoize():
+                fold_results = sweep.run_sweep(evaluate_fold, [{"fold": fold.index} for fold in folds], SWEEP_PROCESSES)
+            results = _walk_forward_results(fold_results, data, dates, walk_forward_params)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            results = [{"status": "FAILURE", "summary": {"error": str(e)}} for _ in backtest_ids]
+
+        crud_backtest.update_backtest_results(db, [
+            {"id": backtest_id, **result} for backtest_id, result in zip(backtest_ids, results)
+        ])
     finally:
         db.close()
-    
-    print(f"Optimization {optimization_id} finished dispatching all tasks.")
\ No newline at end of file
+
+
+@celery_app.task
+def prefetch_klines_task():
+    """
+    预热K线：收集活跃策略的合约与近期回测用到的 (symbol, duration)，
+    在预算内把它们补齐到本地存储，让早上第一次回测不必冷启动下载。返回预热报告。
+    """
+    db = SessionLocal()
+    try:
+        scripts = []
+        for strategy in crud_strategy.get_all_strategies(db):
+            if not strategy.is_active or not strategy.script_path:
+                continue
+            try:
+                with open(strategy.script_path, 'r', encoding='utf-8') as f:
+                    scripts.append(f.read())
+            except FileNotFoundError:
+                continue
+        since = datetime.utcnow() - timedelta(days=PREFETCH_RECENT_DAYS)
+        backtests = [
+            (result.symbol, KlineDuration(result.duration).value, result.start_dt)
+            for result in crud_backtest.get_recent_backtest_results(db, since)
+        ]
+    finally:
+        db.close()
+
+    today = (datetime.utcnow() + timedelta(hours=8)).date()
+    targets = prefetcher.plan_targets(scripts, backtests, today, PREFETCH_HISTORY_DAYS)
+    report = prefetcher.warm(data_service, targets, PREFETCH_MAX_SYMBOLS, PREFETCH_MAX_BYTES)
+    print(f"Prefetch: warmed {len(report['warmed'])} series ({report['symbols']} symbols, {report['bytes']} bytes), "
+          f"skipped {len(report['skipped'])}, failed {len(report['failed'])}.")
+    return report
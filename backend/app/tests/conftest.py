@@ -0,0 +1,27 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# app.db / app.tasks 在导入时创建数据库引擎，测试中使用内存 SQLite 即可
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import tasks
+from app.db.base import Base
+from app.services import progress
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(tasks, "SessionLocal", factory)
+    monkeypatch.setattr(tasks, "data_service", DataService(provider=SyntheticProvider(seed=7)))
+    # 进度事件留在进程内，不连接 Redis
+    monkeypatch.setattr(progress, "channel", progress.MemoryChannel())
+    return factory
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from app.services import analytics
+
+
+def test_drawdown_and_duration():
+    equity = np.array([100.0, 110.0, 99.0, 105.0, 120.0, 90.0])
+    metrics = analytics.equity_metrics(equity, days=5)
+
+    assert metrics["total_return"] == pytest.approx(-0.1)
+    assert metrics["max_drawdown"] == pytest.approx(-0.25)
+    assert metrics["max_drawdown_duration"] == 2
+
+
+def test_batch_matches_single_runs():
+    rng = np.random.default_rng(7)
+    curves = 100.0 * np.cumprod(1 + rng.normal(0, 0.01, size=(4, 500)), axis=1)
+
+    batch = analytics.equity_metrics(curves, days=30)
+    for i, curve in enumerate(curves):
+        single = analytics.equity_metrics(curve, days=30)
+        for key, value in single.items():
+            assert batch[key][i] == pytest.approx(value)
+
+
+def test_rolling_sharpe_matches_direct_computation():
+    rng = np.random.default_rng(3)
+    equity = 100.0 * np.cumprod(1 + rng.normal(0.001, 0.01, size=50))
+    window = 10
+
+    result = analytics.rolling_sharpe(equity, window)
+
+    returns = np.diff(equity) / equity[:-1]
+    last = returns[-window:]
+    assert np.isnan(result[window - 2])
+    assert result[-1] == pytest.approx(last.mean() / last.std(ddof=1) * 252 ** 0.5)
+
+
+def test_trade_metrics_pairs_buys_and_sells():
+    metrics = analytics.trade_metrics(np.array([10.0, 11.0, 10.0, 9.0, 12.0]))
+
+    assert metrics["total_trades"] == 2
+    assert metrics["winning_trades"] == 1
+    assert metrics["win_rate"] == 0.5
+    assert metrics["profit_factor"] == pytest.approx(0.1 / 0.1)
+
+
+def test_exposure_time():
+    assert analytics.exposure_time(np.array([0.0, 1.0, 1.0, 0.0])) == 0.5
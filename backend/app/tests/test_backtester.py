@@ -1,75 +1,85 @@
+import numpy as np
 import pytest
-from unittest.mock import MagicMock, patch
-import pandas as pd
-from sqlalchemy.orm import Session
 
-from app.services.backtester import SimpleBacktester, run_backtest_for_strategy
-from app.schemas.backtest import KlineDuration, BacktestResultCreate
+from app import tasks
+from app.schemas.backtest import KlineDuration
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
 
-# A simple strategy for testing
-TEST_STRATEGY_CODE = """
+VECTOR_STRATEGY_CODE = """
 import pandas as pd
 
-def run_strategy(data: pd.DataFrame):
-    signals = []
-    if len(data) > 1:
-        if data['close'].iloc[-1] > data['close'].iloc[-2]:
-            signals.append({'date': data.index[-1], 'signal': 'buy'})
-        else:
-            signals.append({'date': data.index[-1], 'signal': 'sell'})
-    return signals
+class Strategy(BaseStrategy):
+    def set_parameters(self):
+        self.short_window = 5
+        self.long_window = 20
+
+    def initialize(self):
+        pass
+
+    def generate_signals(self, data):
+        short_mavg = data['close'].rolling(window=self.short_window).mean()
+        long_mavg = data['close'].rolling(window=self.long_window).mean()
+        signals = pd.Series(0, index=data.index, dtype='int8')
+        signals[(short_mavg > long_mavg) & (short_mavg.shift(1) < long_mavg.shift(1))] = 1
+        signals[(short_mavg < long_mavg) & (short_mavg.shift(1) > long_mavg.shift(1))] = -1
+        return signals
+
+    def handle_data(self, data):
+        return []
+"""
+
+BAR_STRATEGY_CODE = """
+class Strategy(BaseStrategy):
+    def set_parameters(self):
+        self.short_window = 5
+        self.long_window = 20
+
+    def initialize(self):
+        pass
+
+    def handle_data(self, data):
+        short_mavg = data['close'].rolling(window=self.short_window).mean()
+        long_mavg = data['close'].rolling(window=self.long_window).mean()
+        if short_mavg.iloc[-1] > long_mavg.iloc[-1] and short_mavg.iloc[-2] < long_mavg.iloc[-2]:
+            return [{'datetime': data['datetime'].iloc[-1], 'signal': 'buy'}]
+        if short_mavg.iloc[-1] < long_mavg.iloc[-1] and short_mavg.iloc[-2] > long_mavg.iloc[-2]:
+            return [{'datetime': data['datetime'].iloc[-1], 'signal': 'sell'}]
+        return []
 """
 
+
 @pytest.fixture
-def mock_data_service():
-    with patch('app.services.backtester.data_service') as mock:
-        # Create a sample DataFrame for testing
-        dates = pd.to_datetime(['2023-01-01', '2023-01-02', '2023-01-03', '2023-01-04'])
-        mock_data = pd.DataFrame({
-            'trade_date': dates.strftime('%Y%m%d'),
-            'close': [100, 110, 105, 115]
-        })
-        mock_data = mock_data.set_index(dates)
-        mock.get_kline_data.return_value = mock_data
-        yield mock
-
-def test_simple_backtester_run(mock_data_service):
-    """Test the SimpleBacktester run method."""
-    backtester = SimpleBacktester(
-        symbol='test.symbol',
-        duration=KlineDuration.one_day,
-        start_date='20230101',
-        end_date='20230104',
-        strategy_code=TEST_STRATEGY_CODE
+def synthetic_data(monkeypatch):
+    service = DataService(provider=SyntheticProvider(seed=7))
+    monkeypatch.setattr(tasks, "data_service", service)
+    return service
+
+
+def run_backtest(strategy_code, params=None):
+    backtester = tasks.SimpleBacktester(
+        backtest_id=1, symbol="SHFE.rb2410", duration=KlineDuration.fifteen_minutes,
+        start_date="20240102", end_date="20240329", strategy_code=strategy_code,
+        commission_rate=0.0001, slippage=1.0, params_override=params,
     )
-    result = backtester.run()
+    return backtester, backtester.run()
+
 
-    assert 'summary' in result
-    assert 'daily_pnl' in result
-    assert len(result['daily_pnl']) == 4
+def test_simple_backtester_run(synthetic_data):
+    backtester, result = run_backtest(VECTOR_STRATEGY_CODE)
+
+    bars = synthetic_data.get_kline_data("SHFE.rb2410", KlineDuration.fifteen_minutes, "20240102", "20240329")
+    records = backtester.to_records()
+    assert 'error' not in result['summary']
     assert result['summary']['final_equity'] > 0
+    assert len(records['pnl']) == len(bars)
+    assert records['trades']
+
+
+def test_bar_by_bar_matches_vectorized_signals(synthetic_data):
+    vectorized, vectorized_result = run_backtest(VECTOR_STRATEGY_CODE, {"short_window": 8})
+    bar_by_bar, bar_result = run_backtest(BAR_STRATEGY_CODE, {"short_window": 8})
 
-def test_run_backtest_for_strategy(mock_data_service):
-    """Test the main backtest runner function."""
-    mock_db = MagicMock(spec=Session)
-    
-    with patch('app.crud.crud_backtest.create_backtest_result') as mock_create_backtest:
-        result = run_backtest_for_strategy(
-            db=mock_db,
-            strategy_id=1,
-            strategy_code=TEST_STRATEGY_CODE,
-            symbol='test.symbol',
-            duration=KlineDuration.one_day,
-            start_dt='2023-01-01T00:00:00',
-            end_dt='2023-01-04T00:00:00'
-        )
-
-        assert result['strategy_id'] == 1
-        assert 'summary' in result
-        assert 'error' not in result['summary']
-        mock_create_backtest.assert_called_once()
-        
-        # Check the type of the argument passed to create_backtest_result
-        call_args = mock_create_backtest.call_args[1]
-        assert 'obj_in' in call_args
-        assert isinstance(call_args['obj_in'], BacktestResultCreate)
+    # 逐 bar 模式从第 lookback 根开始产生信号，之后两种模式的成交应完全一致
+    assert bar_result['summary'] == pytest.approx(vectorized_result['summary'])
+    np.testing.assert_array_equal(bar_by_bar.execution.position, vectorized.execution.position)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from app.services.bar_window import BarWindow
+
+
+def make_frame(n: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'trade_date': [f"2024010{i}" for i in range(n)],
+        'close': np.arange(n, dtype=float),
+    })
+
+
+def test_window_keeps_last_capacity_bars():
+    window = BarWindow.from_frame(make_frame(3), capacity=4)
+    assert len(window) == 3 and not window.full
+
+    for i in range(3, 10):
+        window.push([f"2024010{i}", float(i)])
+
+    assert window.full
+    frame = window.frame()
+    assert frame['close'].tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert frame['trade_date'].iloc[-1] == "20240109"
+
+
+def test_replace_last_updates_newest_bar():
+    window = BarWindow.from_frame(make_frame(5), capacity=3)
+    window.replace_last(["20240104", 42.0])
+
+    assert window.last('close') == 42.0
+    assert window.frame()['close'].tolist() == [2.0, 3.0, 42.0]
+
+
+def test_view_is_read_only():
+    window = BarWindow.from_frame(make_frame(5), capacity=3)
+    view = window.view('close')
+    assert not view.flags.writeable
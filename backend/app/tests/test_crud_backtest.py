@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.crud import crud_backtest
+from app.db.base import Base
+from app.models.backtest import BacktestResult
+from app.models.strategy import Strategy  # noqa: F401  注册 strategies 表（外键目标）
+from app.schemas.backtest import BacktestResultCreate, KlineDuration
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def backtest_create(symbol):
+    return BacktestResultCreate(
+        strategy_id=1, optimization_id="opt", symbol=symbol, duration=KlineDuration.one_day,
+        start_dt=datetime(2024, 1, 1), end_dt=datetime(2024, 3, 1), commission_rate=0.0003, slippage=0.0,
+    )
+
+
+def test_bulk_create_returns_ids_in_order_and_bulk_update_applies_per_row(db):
+    ids = crud_backtest.create_backtest_results(db, objs_in=[backtest_create(f"S{i}") for i in range(5)])
+
+    assert [db.get(BacktestResult, backtest_id).symbol for backtest_id in ids] == [f"S{i}" for i in range(5)]
+    assert crud_backtest.create_backtest_results(db, objs_in=[]) == []
+
+    crud_backtest.update_backtest_results(db, [
+        {"id": ids[0], "status": "SUCCESS", "summary": {"sharpe_ratio": 1.5}, "daily_pnl": {"pnl": [], "trades": []}},
+        {"id": ids[1], "status": "FAILURE", "summary": {"error": "boom"}},
+    ])
+    db.expire_all()
+
+    rows = [db.get(BacktestResult, backtest_id) for backtest_id in ids]
+    assert [row.status for row in rows] == ["SUCCESS", "FAILURE", "PENDING", "PENDING", "PENDING"]
+    assert rows[0].summary == {"sharpe_ratio": 1.5}
+    assert rows[1].summary == {"error": "boom"} and rows[1].daily_pnl is None
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services import analytics, downsample, series_codec
+from app.services.execution import execute_signals
+
+
+def reference_lttb(y, resolution):
+    """逐桶循环的 LTTB 参考实现（x 为序号）。"""
+    n = len(y)
+    edges = np.linspace(1, n - 1, resolution - 1).astype(np.int64)
+    selected, a = [0], 0
+    for i in range(resolution - 2):
+        if i + 1 < resolution - 2:
+            c = (np.arange(edges[i + 1], edges[i + 2]).mean(), y[edges[i + 1]:edges[i + 2]].mean())
+        else:
+            c = (n - 1, y[-1])
+        areas = [abs((a - c[0]) * (y[j] - y[a]) - (a - j) * (c[1] - y[a])) for j in range(edges[i], edges[i + 1])]
+        a = int(edges[i] + np.argmax(areas))
+        selected.append(a)
+    return selected + [n - 1]
+
+
+@pytest.mark.parametrize("n, resolution", [(7, 3), (500, 150), (3000, 1000)])
+def test_lttb_matches_the_sequential_algorithm(n, resolution):
+    y = np.cumsum(np.random.default_rng(n).normal(size=n))
+    assert downsample.downsample(y, resolution, "lttb").tolist() == reference_lttb(y, resolution)
+
+
+def test_minmax_keeps_every_bucket_extreme_and_long_series_are_preselected():
+    y = np.cumsum(np.random.default_rng(0).normal(size=100000))
+
+    points = downsample.downsample(y, 200, "minmax")
+    assert len(points) <= 202 and points[0] == 0 and points[-1] == len(y) - 1
+    assert {int(y.argmin()), int(y.argmax())} <= set(points.tolist())
+
+    points = downsample.downsample(y, 2000, "lttb")
+    assert len(points) == 2000 and np.all(np.diff(points) > 0)
+    assert downsample.downsample(y[:50], 2000, "lttb").tolist() == list(range(50))
+    with pytest.raises(ValueError):
+        downsample.downsample(y, 100, "every_nth")
+
+
+@pytest.fixture
+def columns():
+    rng = np.random.default_rng(1)
+    close = 3500 + np.cumsum(rng.normal(size=5000))
+    signals = rng.choice([-1, 0, 1], size=5000, p=[0.01, 0.98, 0.01]).astype(np.int8)
+    timestamps = 1704160800 * 10**9 + np.arange(5000, dtype=np.int64) * 900 * 10**9
+    return series_codec.decode(series_codec.encode(timestamps, execute_signals(close, signals, 100000.0, 0.0001, 1.0)))
+
+
+def test_equity_view_windows_downsamples_and_keeps_trade_bars(columns):
+    full = series_codec.records(columns)
+    view = downsample.equity_view(columns, 300, "lttb", datetime(2024, 1, 10), datetime(2024, 1, 20, 23, 59))
+
+    inside = [p for p in full["pnl"] if "20240110" <= p["date"] <= "20240120 23:59:00"]
+    assert view["downsample"] == {"method": "lttb", "resolution": 300, "total_points": len(inside)}
+    assert view["trades"] == [t for t in full["trades"] if "20240110" <= t["date"] <= "20240120 23:59:00"]
+    # 降采样的点都取自原曲线，首尾保留，且每笔成交所在的 bar 都在曲线上
+    assert view["pnl"][0] == inside[0] and view["pnl"][-1] == inside[-1]
+    assert all(point in inside for point in view["pnl"])
+    assert {t["date"] for t in view["trades"]} <= {p["date"] for p in view["pnl"]}
+    assert 300 <= len(view["pnl"]) <= 300 + len(view["trades"])
+
+    # 滚动夏普与降采样后的点逐一对齐，取值与在整条曲线上计算的相同
+    window = view["rolling_sharpe"]["window"]
+    expected = analytics.rolling_sharpe(columns["equity"], window)
+    index = {point["date"]: i for i, point in enumerate(full["pnl"])}
+    assert len(view["rolling_sharpe"]["values"]) == len(view["pnl"])
+    assert view["rolling_sharpe"]["values"] == pytest.approx([expected[index[p["date"]]] for p in view["pnl"]])
+    assert downsample.equity_view(columns)["rolling_sharpe"]["values"][:window] == [None] * (window - 1) + [0.0]
+
+    # 旧格式的 JSON 结果得到相同的视图
+    legacy = series_codec.from_records(full)
+    assert downsample.equity_view(legacy, 300, "lttb", datetime(2024, 1, 10), datetime(2024, 1, 20, 23, 59)) == view
+
+
+def test_views_of_finished_backtests_are_cached(columns, monkeypatch):
+    monkeypatch.setattr(downsample, "view_cache", downsample.DownsampleCache(8))
+    loads = []
+
+    def load_columns():
+        loads.append(1)
+        return columns
+
+    first = downsample.cached_equity_view(1, True, load_columns, 500)
+    assert downsample.cached_equity_view(1, True, load_columns, 500) is first
+    downsample.cached_equity_view(1, True, load_columns, 1000, "minmax")
+    downsample.cached_equity_view(2, False, load_columns, 500)
+    downsample.cached_equity_view(2, False, load_columns, 500)
+    # 不降采样的完整窗口不缓存
+    downsample.cached_equity_view(1, True, load_columns, None, start_dt=datetime(2024, 1, 10))
+    downsample.cached_equity_view(1, True, load_columns, None, start_dt=datetime(2024, 1, 10))
+    assert len(loads) == 6
+    assert downsample.view_cache.stats() == {"hits": 1, "misses": 2, "entries": 2}
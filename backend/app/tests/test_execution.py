@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from app.services.execution import execute_signals, trade_records
+
+
+def test_execute_signals_fills_with_commission_and_slippage():
+    close = np.array([10.0, 11.0, 12.0, 13.0, 12.0])
+    signals = np.array([0, 1, 1, -1, -1], dtype=np.int8)
+
+    result = execute_signals(close, signals, initial_cash=1000.0, commission_rate=0.001, slippage=0.5)
+
+    shares = 1000.0 / 11.5
+    cash_after_buy = 1000.0 - shares * 11.5 * 0.001
+    sale_value = shares * 12.5
+    assert result.trade_index.tolist() == [1, 3]
+    assert result.trade_side.tolist() == [1, -1]
+    assert result.trade_price.tolist() == [11.5, 12.5]
+    assert result.equity[0] == 1000.0
+    assert result.equity[2] == pytest.approx(cash_after_buy + shares * 12.0)
+    assert result.final_equity == pytest.approx(sale_value - sale_value * 0.001)
+
+
+def test_open_position_is_closed_at_last_price():
+    close = np.array([10.0, 20.0])
+    result = execute_signals(close, np.array([1, 0]), initial_cash=100.0, commission_rate=0.0, slippage=0.0)
+
+    assert result.position[-1] == 10.0
+    assert result.final_equity == 200.0
+
+
+def test_sell_without_position_is_ignored():
+    close = np.array([10.0, 11.0, 12.0])
+    result = execute_signals(close, np.array([-1, 1, -1]), initial_cash=100.0, commission_rate=0.0, slippage=0.0)
+
+    records = trade_records(['a', 'b', 'c'], result)
+    assert [(r['date'], r['type']) for r in records] == [('b', 'buy'), ('c', 'sell')]
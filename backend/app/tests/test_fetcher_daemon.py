@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from app.schemas.backtest import KlineDuration
+from app.services.data_service import DataService
+from app.services.fetcher_daemon import FetcherClient, FetcherDaemon, FetcherError, StubBackend
+from app.services.kline_store import KlineStore
+
+
+class CountingBackend(StubBackend):
+    def __init__(self):
+        self.calls = []
+        self.batches = []
+
+    def fetch_batch(self, requests):
+        self.batches.append(list(requests))
+        return super().fetch_batch(requests)
+
+    def fetch(self, symbol, duration, start, end):
+        if symbol == "BAD":
+            raise ValueError("unknown symbol")
+        self.calls.append((symbol, duration, start, end))
+        return super().fetch(symbol, duration, start, end)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    backend = CountingBackend()
+    daemon = FetcherDaemon(str(tmp_path / "fetcher.sock"), lambda: backend, idle_interval=0.1)
+    daemon.backend = backend
+    daemon.start()
+    yield daemon
+    daemon.stop()
+
+
+def test_fetch_round_trip(daemon):
+    client = FetcherClient(daemon.socket_path)
+
+    assert client.ping()
+    frame = client.fetch("SHFE.rb2501", "1h", "20240102", "20240103")
+
+    assert len(frame) == 12
+    assert frame['datetime'].is_monotonic_increasing
+
+
+def test_concurrent_requests_share_the_backend(daemon):
+    client = FetcherClient(daemon.socket_path)
+    results = []
+
+    def worker():
+        results.append(client.fetch("SHFE.rb2501", "1d", "20240101", "20240131"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    assert all(result.equals(results[0]) for result in results)
+    assert 1 <= len(daemon.backend.calls) <= 8
+
+
+def test_backend_errors_are_reported(daemon):
+    with pytest.raises(FetcherError, match="unknown symbol"):
+        FetcherClient(daemon.socket_path).fetch("BAD", "1d", "20240101", "20240102")
+
+
+def test_batch_fetch_in_one_backend_call(daemon):
+    client = FetcherClient(daemon.socket_path)
+    requests = [("SHFE.rb2501", "1h", "20240102", "20240103"), ("DCE.m2501", "1d", "20240101", "20240131")]
+
+    frames = client.fetch_batch(requests)
+
+    assert [len(frame) for frame in frames] == [12, 23]
+    assert daemon.backend.batches == [requests]
+
+
+def test_batch_failure_only_fails_bad_requests(daemon):
+    client = FetcherClient(daemon.socket_path)
+
+    with pytest.raises(FetcherError, match="unknown symbol"):
+        client.fetch_batch([("SHFE.rb2501", "1d", "20240101", "20240105"), ("BAD", "1d", "20240101", "20240102")])
+    assert len(client.fetch("SHFE.rb2501", "1d", "20240101", "20240105")) == 5
+
+
+def test_data_service_batch_fills_store_with_one_request(daemon, tmp_path):
+    pytest.importorskip("pyarrow")
+    service = DataService(store=KlineStore(tmp_path / "store"), daemon=FetcherClient(daemon.socket_path),
+                          fetcher=lambda *args: pytest.fail("should not fall back"))
+    requests = [("SHFE.rb2501", KlineDuration.one_day, "20240102", "20240105"),
+                ("DCE.m2501", KlineDuration.one_hour, "20240102", "20240102")]
+
+    first = service.get_kline_batch(requests)
+    second = service.get_kline_batch(requests)
+
+    assert [len(frame) for frame in first] == [4, 6]
+    assert all(a.equals(b) for a, b in zip(first, second))
+    assert daemon.backend.batches == [[("SHFE.rb2501", "1d", "20240102", "20240105"),
+                                       ("DCE.m2501", "1h", "20240102", "20240102")]]
+
+
+def test_data_service_falls_back_when_daemon_is_down(tmp_path):
+    calls = []
+
+    def fetcher(symbol, duration, start, end):
+        calls.append(symbol)
+        return StubBackend().fetch(symbol, duration.value, start, end)
+
+    service = DataService(fetcher=fetcher, daemon=FetcherClient(str(tmp_path / "missing.sock")))
+    data = service.get_kline_data("SHFE.rb2501", KlineDuration.one_day, "20240102", "20240105")
+
+    assert calls == ["SHFE.rb2501"]
+    assert len(data) == 4
@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import tasks
+from app.crud.crud_strategy import MA_CROSSOVER_TEMPLATE
+from app.schemas.backtest import KlineDuration
+from app.services import indicators, sweep
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+from app.services.kline_store import format_timestamps
+from app.services.strategy_base import compile_strategy
+
+BACKTEST_PARAMS = {
+    "backtest_id": 0, "symbol": "SHFE.rb2410", "duration": KlineDuration.one_hour,
+    "start_date": "20240102", "end_date": "20240628", "strategy_code": MA_CROSSOVER_TEMPLATE,
+    "commission_rate": 0.0001, "slippage": 1.0,
+}
+
+
+@pytest.fixture(scope="module")
+def data():
+    return DataService(provider=SyntheticProvider(seed=5)).get_kline_data(
+        "SHFE.rb2410", KlineDuration.one_hour, "20240102", "20240628")
+
+
+def test_indicators_match_reference_formulas(data):
+    bound = indicators.Indicators(data)
+    close, high, low = data['close'], data['high'], data['low']
+
+    pd.testing.assert_series_equal(bound.sma(10), close.rolling(10).mean(), check_names=False)
+    pd.testing.assert_series_equal(bound.ema(10), close.ewm(span=10, adjust=False).mean(), check_names=False)
+    pd.testing.assert_series_equal(bound.rolling_max(5, 'high'), high.rolling(5).max(), check_names=False)
+    pd.testing.assert_series_equal(bound.rolling_min(5, 'low'), low.rolling(5).min(), check_names=False)
+
+    middle, upper, lower = bound.bollinger(20, 2)
+    np.testing.assert_allclose((upper - middle).dropna(), 2 * close.rolling(20).std(ddof=0).dropna())
+    np.testing.assert_allclose((middle - lower).dropna(), (upper - middle).dropna())
+
+    # Wilder 平滑的逐根递推
+    true_range = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
+    expected_atr = [true_range.iloc[:14].mean()]
+    for value in true_range.iloc[14:]:
+        expected_atr.append(expected_atr[-1] + (value - expected_atr[-1]) / 14)
+    np.testing.assert_allclose(bound.atr(14).iloc[13:], expected_atr, rtol=1e-9)
+
+    rsi = bound.rsi(14)
+    assert rsi.iloc[:14].isna().all() and rsi.iloc[14:].between(0, 100).all()
+
+
+def test_sweep_computes_each_window_once_and_evicts_afterwards(data):
+    dates = format_timestamps(data['datetime'])
+    evaluator = tasks._sweep_evaluator(BACKTEST_PARAMS, compile_strategy(MA_CROSSOVER_TEMPLATE), data, dates)
+    param_sets = [{"short_window": s, "long_window": l} for s in (5, 10, 15) for l in (40, 60)]
+
+    with indicators.memoize():
+        memoized = sweep.run_sweep(evaluator, param_sets, processes=1)
+        info = indicators.cache_info()
+    # 3 条短均线 + 2 条长均线，其余 7 次直接命中
+    assert (info["misses"], info["hits"]) == (5, 7)
+    assert indicators.cache_info()["entries"] == 0
+
+    uncached = sweep.run_sweep(evaluator, param_sets, processes=1)
+    assert [r["summary"] for r in memoized] == [r["summary"] for r in uncached]
+
+
+def test_parallel_sweep_computes_each_window_at_most_once_per_process(data, tmp_path, monkeypatch):
+    # 子进程中的计算写入文件计数，父进程的 cache_info 看不到子进程各自的缓存
+    log = tmp_path / "computed"
+    original_sma = indicators.sma
+
+    def counting_sma(frame, window, column='close'):
+        with open(log, 'a') as f:
+            f.write(f"{os.getpid()} {window}\n")
+        return original_sma(frame, window, column)
+
+    monkeypatch.setattr(indicators, "sma", counting_sma)
+    dates = format_timestamps(data['datetime'])
+    evaluator = tasks._sweep_evaluator(BACKTEST_PARAMS, compile_strategy(MA_CROSSOVER_TEMPLATE), data, dates)
+    shorts, longs = (5, 10, 15, 20), (30, 40, 50, 60, 70, 80)
+    # 打乱顺序，run_sweep 按取值排序后分批，结果仍按传入的顺序返回
+    param_sets = [{"short_window": s, "long_window": l} for l in longs for s in shorts]
+
+    with indicators.memoize():
+        memoized = sweep.run_sweep(evaluator, param_sets, processes=2)
+
+    computed = log.read_text().split("\n")[:-1]
+    windows = {line.split()[1] for line in computed}
+    assert windows == {str(w) for w in shorts + longs}
+    # 每个子进程对每个窗口最多计算一次：最多 P·(N+M) 条，远少于不缓存时的 2·N·M 条
+    assert len(computed) == len(set(computed))
+    assert len(shorts) + len(longs) <= len(computed) <= 2 * (len(shorts) + len(longs))
+    monkeypatch.setattr(indicators, "sma", original_sma)
+    uncached = sweep.run_sweep(evaluator, param_sets, processes=1)
+    assert [r["summary"] for r in memoized] == [r["summary"] for r in uncached]
+
+
+def test_rolling_windows_are_not_cached(data):
+    window = data.iloc[:30]
+    with indicators.memoize():
+        bound = indicators.Indicators(window)
+        bound.sma(5)
+        bound.sma(5)
+        assert indicators.cache_info() == {"hits": 0, "misses": 0, "entries": 0}
+
+        keyed = indicators.Indicators(window, key="full")
+        first = keyed.sma(5)
+        # 策略拿到的是可写副本，原地修改不影响缓存中的结果
+        first.fillna(0, inplace=True)
+        first.iloc[-1] = -1.0
+        second = keyed.sma(5)
+        assert second.isna().sum() == 4 and second.iloc[-1] == pytest.approx(window['close'].iloc[-5:].mean())
+        assert indicators.cache_info()["hits"] == 1
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from app.schemas.backtest import KlineDuration
+from app.services.data_service import DataService
+from app.services.kline_cache import KlineCache, frame_nbytes
+
+
+def daily_klines(start_date: str, end_date: str) -> pd.DataFrame:
+    days = pd.date_range(pd.Timestamp(start_date), pd.Timestamp(end_date), freq='D')
+    closes = np.arange(len(days), dtype=np.float64)
+    return pd.DataFrame({
+        'datetime': (days + pd.Timedelta(hours=2)).as_unit('ns').asi8,
+        'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': 1.0,
+    })
+
+
+def test_narrower_range_is_sliced_from_cached_range():
+    cache = KlineCache(max_bytes=10**8)
+    cache.put("rb", "1d", "20240101", "20240131", daily_klines("20240101", "20240131"))
+
+    sliced = cache.get("rb", "1d", "20240110", "20240112")
+
+    assert sliced['close'].tolist() == [9.0, 10.0, 11.0]
+    assert cache.get("rb", "1d", "20231231", "20240105") is None
+    assert cache.get("rb", "1h", "20240110", "20240112") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_eviction_is_by_bytes():
+    frame = daily_klines("20240101", "20240131")
+    cache = KlineCache(max_bytes=2 * frame_nbytes(frame))
+
+    cache.put("a", "1d", "20240101", "20240131", frame)
+    cache.put("b", "1d", "20240101", "20240131", frame)
+    cache.get("a", "1d", "20240101", "20240131")  # a 变为最近使用
+    cache.put("c", "1d", "20240101", "20240131", frame)
+
+    assert cache.get("b", "1d", "20240101", "20240131") is None
+    assert cache.get("a", "1d", "20240101", "20240131") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_data_service_fetches_once_for_repeated_requests():
+    calls = []
+
+    def fetcher(symbol, duration, start, end):
+        calls.append((start, end))
+        return daily_klines(start, end)
+
+    service = DataService(fetcher=fetcher, cache=KlineCache(max_bytes=10**8))
+    for _ in range(5):
+        service.get_kline_data("rb", KlineDuration.one_day, "20240101", "20240131")
+    service.get_kline_data("rb", KlineDuration.one_day, "20240105", "20240106")
+
+    assert calls == [("20240101", "20240131")]
+    assert service.cache_stats()["hits"] == 5
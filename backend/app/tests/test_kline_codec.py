@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from app.services import kline_codec
+
+
+def sample_frame(n: int = 1000) -> pd.DataFrame:
+    return pd.DataFrame({
+        'datetime': np.arange(n, dtype=np.int64) * 60 * 10**9,
+        'open': np.linspace(3500, 3600, n),
+        'close': np.linspace(3501, 3601, n),
+        'volume': np.arange(n, dtype=np.float64),
+        'symbol': ['SHFE.rb2501'] * n,
+    })
+
+
+def test_binary_round_trip_drops_string_columns():
+    frame = sample_frame()
+    decoded = kline_codec.decode(kline_codec.encode(frame))
+
+    pd.testing.assert_frame_equal(decoded, frame.drop(columns=['symbol']))
+
+
+def test_file_round_trip(tmp_path):
+    frame = sample_frame().drop(columns=['symbol'])
+    path = tmp_path / "klines.bin"
+    kline_codec.write_file(frame, path)
+
+    pd.testing.assert_frame_equal(kline_codec.read_file(path), frame)
+
+
+def test_empty_frame():
+    empty = pd.DataFrame({'datetime': np.array([], dtype=np.int64), 'close': np.array([], dtype=np.float64)})
+    assert kline_codec.decode(kline_codec.encode(empty)).empty
+
+
+def test_batch_round_trip_keeps_order_and_empty_frames():
+    frames = [sample_frame(10).drop(columns=['symbol']), pd.DataFrame(), sample_frame(3).drop(columns=['symbol'])]
+
+    decoded = kline_codec.decode_batch(kline_codec.encode_batch(frames))
+
+    assert len(decoded) == 3
+    pd.testing.assert_frame_equal(decoded[0], frames[0])
+    assert decoded[1].empty
+    pd.testing.assert_frame_equal(decoded[2], frames[2])
@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.schemas.backtest import KlineDuration
+from app.services.data_service import DataService, _create_store
+from app.services.kline_store import KlineStore, shanghai_date_bounds_ns
+
+
+def fake_klines(start_date: str, end_date: str) -> pd.DataFrame:
+    """每个北京时间自然日 10:00 一根K线，收盘价为 YYYYMMDD 数值，便于断言。"""
+    days = pd.date_range(pd.Timestamp(start_date), pd.Timestamp(end_date), freq='D')
+    timestamps = (days + pd.Timedelta(hours=2)).as_unit('ns').asi8  # 10:00 北京时间 = 02:00 UTC
+    closes = days.strftime('%Y%m%d').astype(float)
+    return pd.DataFrame({
+        'datetime': timestamps, 'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': 1.0,
+    })
+
+
+class RecordingFetcher:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol, duration, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        return fake_klines(start_date, end_date)
+
+
+def test_repeat_request_is_served_from_store(tmp_path):
+    fetcher = RecordingFetcher()
+    service = DataService(store=KlineStore(tmp_path), fetcher=fetcher)
+
+    first = service.get_kline_data("SHFE.rb2501", KlineDuration.one_day, "20240125", "20240205")
+    second = service.get_kline_data("SHFE.rb2501", KlineDuration.one_day, "20240125", "20240205")
+
+    assert fetcher.calls == [("20240125", "20240205")]
+    pd.testing.assert_frame_equal(first, second)
+    assert first['close'].tolist()[0] == 20240125.0
+    assert len(first) == 12
+    assert sorted(p.name for p in (tmp_path / "SHFE.rb2501" / "1d").glob("*.parquet")) == ["2024-01.parquet", "2024-02.parquet"]
+
+
+def test_only_missing_ranges_are_fetched(tmp_path):
+    fetcher = RecordingFetcher()
+    service = DataService(store=KlineStore(tmp_path), fetcher=fetcher)
+
+    service.get_kline_data("SHFE.rb2501", KlineDuration.one_day, "20240110", "20240120")
+    result = service.get_kline_data("SHFE.rb2501", KlineDuration.one_day, "20240105", "20240125")
+
+    assert fetcher.calls == [("20240110", "20240120"), ("20240105", "20240109"), ("20240121", "20240125")]
+    assert result['close'].tolist() == [float(d) for d in pd.date_range("20240105", "20240125").strftime('%Y%m%d')]
+
+
+def test_failed_fetch_is_not_marked_as_covered(tmp_path):
+    store = KlineStore(tmp_path)
+
+    def failing_fetcher(*args):
+        raise RuntimeError("network down")
+
+    assert DataService(store=store, fetcher=failing_fetcher).get_kline_data(
+        "SHFE.rb2501", KlineDuration.one_day, "20240101", "20240102").empty
+    assert store.missing_ranges("SHFE.rb2501", "1d", "20240101", "20240102") == [("20240101", "20240102")]
+
+
+def test_unwritable_store_is_disabled_at_startup(tmp_path, capsys):
+    assert _create_store(str(tmp_path / "store")).root == tmp_path / "store"
+    (tmp_path / "file").write_text("")
+    assert _create_store(str(tmp_path / "file" / "store")) is None
+    assert "kline store disabled" in capsys.readouterr().out
+    assert _create_store("") is None
+
+
+def test_shanghai_date_bounds():
+    lo, hi = shanghai_date_bounds_ns("20240102", "20240102")
+    assert pd.Timestamp(lo, tz="UTC") == pd.Timestamp("2024-01-02", tz="Asia/Shanghai")
+    assert hi - lo == 24 * 3600 * 10**9
+
+
+def test_prefetch_tops_up_store_and_reports_fetched_ranges(tmp_path):
+    fetcher = RecordingFetcher()
+    service = DataService(store=KlineStore(tmp_path), fetcher=fetcher)
+    service.get_kline_data("SHFE.rb2501", KlineDuration.one_day, "20240101", "20240110")
+
+    assert service.estimate_prefetch("SHFE.rb2501", KlineDuration.one_day, "20240101", "20240120") == 7 * 48
+
+    result = service.prefetch("SHFE.rb2501", KlineDuration.one_day, "20240101", "20240120")
+
+    # 只计新下载的区间
+    assert result["fetched_ranges"] == [["20240111", "20240120"]]
+    assert result["rows"] == 10
+    assert fetcher.calls == [("20240101", "20240110"), ("20240111", "20240120")]
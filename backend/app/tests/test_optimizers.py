@@ -0,0 +1,153 @@
+from datetime import datetime
+
+import pytest
+
+from app import tasks
+from app.models.backtest import BacktestResult
+from app.models.strategy import Strategy
+from app.schemas.backtest import KlineDuration
+from app.services import optimizers, sweep
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+from app.services.kline_store import format_timestamps
+from app.services.strategy_base import compile_strategy
+from app.tests.test_backtester import VECTOR_STRATEGY_CODE
+
+BACKTEST_PARAMS = {
+    "symbol": "SHFE.rb2410", "duration": "15m",
+    "start_dt_iso": datetime(2024, 1, 2).isoformat(), "end_dt_iso": datetime(2024, 3, 29).isoformat(),
+    "commission_rate": 0.0001, "slippage": 1.0,
+}
+
+SPACE = sweep.param_space([
+    {"name": "x", "start": 0, "end": 29, "step": 1},
+    {"name": "y", "start": 0, "end": 29, "step": 1},
+])
+
+
+class QuadraticEvaluator:
+    """夏普比率为 -((x-21)^2 + (y-8)^2) 的假求值函数，记录每次调用。"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, param_sets, fraction):
+        self.calls.append((list(param_sets), fraction))
+        return [
+            {"status": "SUCCESS", "summary": {"params": p, "sharpe_ratio": -((p["x"] - 21) ** 2 + (p["y"] - 8) ** 2)}}
+            for p in param_sets
+        ]
+
+
+def evaluated_params(evaluator):
+    return [tuple(p.values()) for param_sets, _ in evaluator.calls for p in param_sets]
+
+
+def test_random_search_draws_budget_distinct_points_reproducibly():
+    first, second = QuadraticEvaluator(), QuadraticEvaluator()
+    results = optimizers.RandomSearch(SPACE, budget=40, seed=3).run(first)
+    optimizers.RandomSearch(SPACE, budget=40, seed=3).run(second)
+
+    assert len(results) == 40 and len(set(evaluated_params(first))) == 40
+    assert evaluated_params(first) == evaluated_params(second)
+    # 预算超过组合数时只评估全部组合
+    assert optimizers.RandomSearch(SPACE[:1], budget=100).planned_results() == 30
+
+
+def test_tpe_converges_near_the_optimum_without_repeating_points():
+    evaluator = QuadraticEvaluator()
+    optimizer = optimizers.TPESearch(SPACE, budget=60, seed=1, batch_size=4)
+    results = optimizer.run(evaluator)
+
+    assert len(results) == optimizer.planned_results() == 60
+    assert len(set(evaluated_params(evaluator))) == 60
+    assert all(len(param_sets) <= 4 for param_sets, _ in evaluator.calls)
+    # 60 次评估（900 个组合的 1/15）就找到与最优点相距不超过 2 的参数
+    assert max(optimizers.score(result) for result in results) >= -4
+
+
+def test_successive_halving_keeps_the_best_on_growing_windows():
+    evaluator = QuadraticEvaluator()
+    optimizer = optimizers.SuccessiveHalving(SPACE, budget=52, seed=0)
+    results = optimizer.run(evaluator)
+
+    assert [len(param_sets) for param_sets, _ in evaluator.calls] == [36, 12, 4]
+    assert [fraction for _, fraction in evaluator.calls] == pytest.approx([1 / 9, 1 / 3, 1])
+    assert len(results) == optimizer.planned_results() == 4
+    first_rung = sorted(optimizers.score(result) for result in evaluator(evaluator.calls[0][0], 1))
+    assert sorted(optimizers.score(result) for result in results) == first_rung[-4:]
+
+
+def test_small_budgets_and_large_batches_stay_within_budget():
+    for budget in (1, 2, 4):
+        evaluator = QuadraticEvaluator()
+        results = optimizers.SuccessiveHalving(SPACE, budget=budget, seed=0).run(evaluator)
+        assert sum(len(param_sets) for param_sets, _ in evaluator.calls) <= budget
+        assert len(results) == 1
+
+    # 批大小（CPU 数）超过预算时，随机求值仍只占预算的一部分，其余由 TPE 提出
+    evaluator = QuadraticEvaluator()
+    optimizer = optimizers.TPESearch(SPACE, budget=50, seed=0, batch_size=64)
+    assert optimizer.startup == 15
+    assert len(optimizer.run(evaluator)) == 50
+    assert [len(param_sets) for param_sets, _ in evaluator.calls] == [15, 35]
+
+
+def test_score_treats_failures_and_invalid_sharpe_as_worst():
+    assert optimizers.score({"status": "FAILURE", "summary": {"error": "boom"}}) == float("-inf")
+    assert optimizers.score({"status": "SUCCESS", "summary": {"sharpe_ratio": None}}) == float("-inf")
+    assert optimizers.score({"status": "SUCCESS", "summary": {"sharpe_ratio": 1.25}}) == 1.25
+
+
+def test_only_full_window_evaluations_build_series():
+    data = DataService(provider=SyntheticProvider(seed=7)).get_kline_data(
+        "SHFE.rb2410", KlineDuration.fifteen_minutes, "20240102", "20240329")
+    backtester_params = {
+        "backtest_id": 0, "symbol": "SHFE.rb2410", "duration": KlineDuration.fifteen_minutes,
+        "start_date": "20240102", "end_date": "20240329", "strategy_code": VECTOR_STRATEGY_CODE,
+        "commission_rate": 0.0001, "slippage": 1.0,
+    }
+    evaluate = tasks._batch_evaluator(backtester_params, compile_strategy(VECTOR_STRATEGY_CODE), data,
+                                      format_timestamps(data['datetime']), processes=1)
+    param_sets = [{"short_window": 3, "long_window": 20}]
+
+    # 逐次减半的较短窗口只用于筛选，不编码权益曲线和成交
+    partial, = evaluate(param_sets, 1 / 3)
+    full, = evaluate(param_sets, 1.0)
+    assert partial["status"] == full["status"] == "SUCCESS"
+    assert not {"series", "daily_pnl"} & set(partial)
+    assert {"series", "daily_pnl"} & set(full)
+
+
+def test_adaptive_method_writes_one_row_per_planned_evaluation(session_factory, tmp_path):
+    script = tmp_path / "strategy.py"
+    script.write_text(VECTOR_STRATEGY_CODE, encoding='utf-8')
+    db = session_factory()
+    db.add(Strategy(id=1, name="ma", script_path=str(script), owner="tester"))
+    db.commit()
+
+    tasks.run_optimization_task(
+        strategy_id=1,
+        backtest_params=BACKTEST_PARAMS,
+        optimization_params=[
+            {"name": "short_window", "start": 2, "end": 10, "step": 1},
+            {"name": "long_window", "start": 20, "end": 60, "step": 5},
+        ],
+        optimization_id="opt-halving",
+        method="halving",
+        budget=13,
+        seed=5,
+    )
+
+    rows = db.query(BacktestResult).filter(BacktestResult.optimization_id == "opt-halving").all()
+    assert len(rows) == 1
+    assert rows[0].status == "SUCCESS" and set(rows[0].summary["params"]) == {"short_window", "long_window"}
+    db.close()
+
+
+def test_tasks_mode_rejects_adaptive_methods():
+    with pytest.raises(ValueError, match="cannot run in mode"):
+        tasks.run_optimization_task(
+            strategy_id=1, backtest_params=BACKTEST_PARAMS, optimization_params=[{"name": "k", "start": 1, "end": 3, "step": 1}],
+            optimization_id="opt", mode="tasks", method="random", budget=2,
+        )
@@ -0,0 +1,67 @@
+from datetime import date, datetime
+
+from app.services.prefetcher import PrefetchTarget, plan_targets, strategy_symbol, warm
+
+LIVE_SCRIPT = '''
+class Strategy(BaseStrategy):
+    def initialize(self):
+        self.symbol = "SHFE.rb2501"  # 交易的合约
+'''
+
+
+def test_strategy_symbol_is_parsed_from_script():
+    assert strategy_symbol(LIVE_SCRIPT) == "SHFE.rb2501"
+    assert strategy_symbol("class Strategy: pass") is None
+
+
+def test_plan_prefers_strategy_symbols_then_backtest_frequency():
+    backtests = [
+        ("DCE.m2501", "1h", datetime(2024, 3, 1)),
+        ("DCE.m2501", "1h", datetime(2024, 2, 1)),
+        ("SHFE.rb2501", "1d", datetime(2024, 1, 1)),
+        ("CZCE.SR501", "5m", datetime(2024, 3, 5)),
+    ]
+
+    targets = plan_targets([LIVE_SCRIPT], backtests, today=date(2024, 4, 10), history_days=30)
+
+    assert [(t.symbol, t.duration) for t in targets] == [
+        ("SHFE.rb2501", "1d"), ("SHFE.rb2501", "1m"), ("DCE.m2501", "1h"), ("CZCE.SR501", "5m"),
+    ]
+    assert (targets[1].start_date, targets[1].end_date) == ("20240311", "20240409")
+    assert targets[2].start_date == "20240201"
+    assert targets[2].backtests == 2
+
+
+class FakeService:
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.batches = []
+
+    def prefetch_batch(self, requests):
+        self.batches.append([(symbol, duration.value) for symbol, duration, _, _ in requests])
+        if any(symbol == "BAD" for symbol, _, _, _ in requests):
+            raise RuntimeError("fetch failed")
+        return [{"fetched_ranges": [[start_date, end_date]], "rows": 10, "bytes": self.sizes[symbol]}
+                for symbol, _, start_date, end_date in requests]
+
+    def estimate_prefetch(self, symbol, duration, start_date, end_date):
+        return self.sizes.get(symbol, 0)
+
+
+def target(symbol, duration="1d"):
+    return PrefetchTarget(symbol, duration, "20240101", "20240131")
+
+
+def test_warm_respects_symbol_and_byte_budgets():
+    service = FakeService({"a": 60, "b": 300, "c": 10, "d": 20})
+    targets = [target("a"), target("BAD"), target("a", "1m"), target("b"), target("c"), target("d")]
+
+    report = warm(service, targets, max_symbols=3, max_bytes=150, batch_size=2)
+
+    # b 估算会超出字节预算，在获取前跳过，之后更小的 c 仍然预热；第一批整体失败后逐个重试，只有 BAD 记为失败
+    assert service.batches == [[("a", "1d"), ("BAD", "1d")], [("a", "1d")], [("BAD", "1d")],
+                               [("a", "1m"), ("c", "1d")]]
+    assert [(e["symbol"], e["duration"]) for e in report["warmed"]] == [("a", "1d"), ("a", "1m"), ("c", "1d")]
+    assert report["failed"][0]["error"] == "fetch failed"
+    assert [(e["symbol"], e["reason"]) for e in report["skipped"]] == [("b", "byte budget"), ("d", "symbol budget")]
+    assert (report["symbols"], report["bytes"]) == (2, 130)
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime
+
+from app import tasks
+from app.crud import crud_backtest
+from app.models.strategy import Strategy
+from app.schemas.backtest import BacktestResultCreate, KlineDuration
+from app.services import progress
+from app.tests.test_backtester import BAR_STRATEGY_CODE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_updates_are_throttled_and_report_eta():
+    channel, clock = progress.MemoryChannel(), FakeClock()
+    reporter = progress.ProgressReporter(7, channel, interval=1.0, clock=clock)
+    equity_calls = []
+
+    def equity():
+        equity_calls.append(1)
+        return 101000.0
+
+    reporter.stage("execution", total_bars=100)
+    for bar in range(1, 101):
+        clock.now = bar * 0.1
+        reporter.update(bar, equity)
+    reporter.finish("SUCCESS")
+
+    events = [message["data"] for message in channel.published]
+    assert all(message["type"] == progress.MESSAGE_TYPE for message in channel.published)
+    assert events[0]["stage"] == "execution" and events[0]["bars_processed"] == 0
+    # 每 10 根 bar（1 秒）发布一次，权益只在发布时计算
+    updates = events[1:-1]
+    assert [event["bars_processed"] for event in updates] == list(range(10, 101, 10))
+    assert len(equity_calls) == len(updates)
+    assert updates[1]["progress"] == 0.2 and updates[1]["equity"] == 101000.0
+    assert abs(updates[1]["eta_seconds"] - 8.0) < 1e-9
+    assert events[-1]["status"] == "SUCCESS" and "summary" not in events[-1]
+
+
+def test_memory_channel_forwards_messages_published_from_other_threads():
+    channel = progress.MemoryChannel()
+    received = []
+
+    async def broadcast(message):
+        received.append(message)
+
+    async def main():
+        forwarder = asyncio.create_task(progress.forward(channel, broadcast))
+        await asyncio.sleep(0)
+        reporter = progress.ProgressReporter(3, channel)
+        await asyncio.to_thread(reporter.stage, "loading")
+        await asyncio.to_thread(reporter.finish, "FAILURE", "boom")
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+        forwarder.cancel()
+
+    asyncio.run(main())
+    assert [message["data"]["status"] for message in received] == ["RUNNING", "FAILURE"]
+    assert received[1]["data"]["error"] == "boom"
+
+
+def test_backtest_task_publishes_stages_bar_progress_and_result(session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(progress, "PROGRESS_INTERVAL", 0.0)
+    script = tmp_path / "strategy.py"
+    script.write_text(BAR_STRATEGY_CODE, encoding='utf-8')
+    db = session_factory()
+    db.add(Strategy(id=1, name="bar", script_path=str(script), owner="tester"))
+    db.commit()
+    backtest_id = crud_backtest.create_backtest_result(db, obj_in=BacktestResultCreate(
+        strategy_id=1, symbol="SHFE.rb2410", duration=KlineDuration.one_hour, start_dt=datetime(2024, 1, 2),
+        end_dt=datetime(2024, 2, 29), commission_rate=0.0001, slippage=1.0)).id
+
+    tasks.run_backtest_task(backtest_id)
+
+    events = [message["data"] for message in progress.channel.published]
+    assert all(event["backtest_id"] == backtest_id for event in events)
+    stages = [event["stage"] for event in events if event.get("bars_processed") == 0]
+    assert stages[:3] == ["loading", "signals", "execution"]
+    updates = [event for event in events if event["stage"] == "signals" and event.get("bars_processed")]
+    total = updates[-1]["total_bars"]
+    assert updates[-1]["bars_processed"] == total and updates[-1]["eta_seconds"] == 0
+
+    result = crud_backtest.get_backtest_result(db, backtest_id)
+    db.refresh(result)
+    # 结果汇总不经过广播通道
+    assert events[-1]["status"] == "SUCCESS" and "summary" not in events[-1]
+    # 最后一根 bar 时的权益即回测结束时的权益
+    assert updates[-1]["equity"] == crud_backtest.get_daily_pnl(result)["pnl"][-1]["pnl"]
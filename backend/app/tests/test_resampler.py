@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.schemas.backtest import KlineDuration
+from app.services.data_service import DataService
+from app.services.resampler import resample_klines
+from app.services.trading_calendar import session_bar_times
+
+# 上期所螺纹钢：夜盘 21:00-23:00，日盘 09:00-10:15, 10:30-11:30, 13:30-15:00
+SESSIONS = [("21:00", "23:00"), ("09:00", "10:15"), ("10:30", "11:30"), ("13:30", "15:00")]
+
+
+def session_minutes(start_date: str, end_date: str) -> pd.DataFrame:
+    """按交易时段生成 1m K线（夜盘在前一晚，归属于下一交易日）。"""
+    stamps = []
+    for day in pd.bdate_range(start_date, end_date):
+        night_day = day - pd.offsets.BDay(1)
+        for session_start, session_end in SESSIONS:
+            base = night_day if session_start >= "21:00" else day
+            begin = pd.Timestamp(f"{base:%Y-%m-%d} {session_start}")
+            stamps.extend(pd.date_range(begin, pd.Timestamp(f"{base:%Y-%m-%d} {session_end}"), freq='min', inclusive='left'))
+    local = pd.DatetimeIndex(sorted(stamps))
+    rng = np.random.default_rng(0)
+    close = 3500 + np.cumsum(rng.normal(0, 1, len(local)))
+    return pd.DataFrame({
+        'datetime': (local - pd.Timedelta(hours=8)).as_unit('ns').asi8,
+        'open': close + rng.normal(0, 0.5, len(local)),
+        'high': close + 2.0,
+        'low': close - 2.0,
+        'close': close,
+        'volume': rng.integers(1, 100, len(local)).astype(np.float64),
+    })
+
+
+@pytest.mark.parametrize("duration, rule", [("5m", "5min"), ("15m", "15min"), ("1h", "1h")])
+def test_intraday_matches_pandas_resample(duration, rule):
+    minute = session_minutes("20240102", "20240112")
+
+    resampled = resample_klines(minute, duration)
+
+    indexed = minute.set_index(pd.to_datetime(minute['datetime'], unit='ns'))
+    expected = indexed.resample(rule).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    ).dropna()
+    assert resampled['datetime'].tolist() == expected.index.as_unit('ns').asi8.tolist()
+    for column in ['open', 'high', 'low', 'close', 'volume']:
+        np.testing.assert_allclose(resampled[column].to_numpy(), expected[column].to_numpy())
+
+
+def test_hourly_bar_spans_the_morning_break_like_the_calendar():
+    minute = session_minutes("20240103", "20240105")
+
+    hourly = resample_klines(minute, "1h")
+
+    # 与交易日历（及天勤原生 1h K线）的整点K线一一对应
+    assert hourly['datetime'].tolist() == session_bar_times("SHFE.rb2410", 3600, "20240103", "20240105").tolist()
+    ten = pd.Timestamp("2024-01-04 10:00", tz="Asia/Shanghai").value
+    members = minute[(minute['datetime'] >= ten) & (minute['datetime'] < ten + 3600 * 10**9)]
+    local = pd.to_datetime(members['datetime'] + 8 * 3600 * 10**9, unit='ns').dt.strftime('%H:%M')
+    # 10:00 的K线包含 10:15-10:30 休市前后的两段
+    assert (local.iloc[0], local.iloc[14], local.iloc[15], local.iloc[-1]) == ("10:00", "10:14", "10:30", "10:59")
+    bar = hourly[hourly['datetime'] == ten].iloc[0]
+    assert bar['open'] == members['open'].iloc[0] and bar['close'] == members['close'].iloc[-1]
+    assert bar['volume'] == members['volume'].sum()
+
+
+def test_daily_bars_include_previous_night_session():
+    minute = session_minutes("20240105", "20240109")  # 周五到下周二
+
+    daily = resample_klines(minute, "1d")
+
+    local_days = pd.to_datetime(daily['datetime'] + 8 * 3600 * 10**9, unit='ns').dt.strftime('%Y%m%d').tolist()
+    assert local_days == ["20240105", "20240108", "20240109"]
+    # 周一的日线从上周五 21:00 的夜盘开盘
+    monday = minute[(minute['datetime'] >= pd.Timestamp("2024-01-05 13:00").value)
+                    & (minute['datetime'] < pd.Timestamp("2024-01-08 07:30").value)]
+    assert daily['open'].iloc[1] == monday['open'].iloc[0]
+    assert daily['close'].iloc[1] == monday['close'].iloc[-1]
+    assert daily['volume'].iloc[1] == monday['volume'].sum()
+
+
+def test_data_service_derives_durations_from_one_minute_download():
+    requests = []
+
+    def fetcher(symbol, duration, start_date, end_date):
+        requests.append((duration.value, start_date))
+        return session_minutes("20240102", "20240112")
+
+    service = DataService(fetcher=fetcher, resample_from_1m=True)
+
+    hourly = service.get_kline_data("rb", KlineDuration.one_hour, "20240103", "20240110")
+    daily = service.get_kline_data("rb", KlineDuration.one_day, "20240103", "20240110")
+
+    assert requests == [("1m", "20240103"), ("1m", "20231231")]
+    assert hourly['datetime'].iloc[0] == pd.Timestamp("2024-01-03 01:00").value  # 北京时间 09:00
+    assert daily['datetime'].iloc[0] == pd.Timestamp("2024-01-02 16:00").value
+    assert len(daily) == 6
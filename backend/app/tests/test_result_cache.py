@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from app import tasks
+from app.crud import crud_backtest
+from app.models.backtest import BacktestResult
+from app.models.strategy import Strategy
+from app.schemas.backtest import BacktestResultCreate, KlineDuration
+from app.services import result_cache
+from app.tests.test_backtester import VECTOR_STRATEGY_CODE
+
+INPUTS = dict(symbol="SHFE.rb2410", duration=KlineDuration.one_hour, start_dt=datetime(2024, 1, 2),
+              end_dt=datetime(2024, 3, 29), commission_rate=0.0001, slippage=1.0)
+
+
+def test_fingerprint_covers_every_input_and_skips_live_ranges():
+    base = result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **INPUTS)
+
+    assert base == result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **{**INPUTS, "duration": "1h"}, params={})
+    assert base == result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **{**INPUTS, "end_dt": datetime(2024, 3, 29, 15)})
+    changed = [
+        result_cache.fingerprint(2, VECTOR_STRATEGY_CODE, **INPUTS),
+        result_cache.fingerprint(1, VECTOR_STRATEGY_CODE + "\n# edited", **INPUTS),
+        result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **{**INPUTS, "slippage": 2.0}),
+        result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **{**INPUTS, "start_dt": datetime(2024, 1, 3)}),
+        result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **INPUTS, params={"short_window": 3}),
+    ]
+    assert len({base, *changed}) == 6
+    assert result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **{**INPUTS, "end_dt": datetime.utcnow() + timedelta(days=1)}) is None
+
+
+def test_successful_backtest_is_found_by_its_fingerprint(session_factory, tmp_path):
+    script = tmp_path / "strategy.py"
+    script.write_text(VECTOR_STRATEGY_CODE, encoding='utf-8')
+    db = session_factory()
+    db.add(Strategy(id=1, name="ma", script_path=str(script), owner="tester"))
+    db.commit()
+    first, second = (
+        crud_backtest.create_backtest_result(db, obj_in=BacktestResultCreate(strategy_id=1, **INPUTS)).id
+        for _ in range(2)
+    )
+    fingerprint = result_cache.fingerprint(1, VECTOR_STRATEGY_CODE, **INPUTS)
+    assert crud_backtest.get_backtest_by_fingerprint(db, fingerprint) is None
+
+    tasks.run_backtest_task(first)
+    assert crud_backtest.get_backtest_by_fingerprint(db, fingerprint).id == first
+
+    # 强制重跑（bypass_cache）得到的新结果替换旧结果
+    tasks.run_backtest_task(second)
+    db.expire_all()
+    hit = crud_backtest.get_backtest_by_fingerprint(db, fingerprint)
+    assert hit.id == second and hit.status == "SUCCESS"
+    assert hit.summary == db.get(BacktestResult, first).summary
+
+    # 修改策略后指纹不同，不会命中旧结果
+    assert crud_backtest.get_backtest_by_fingerprint(
+        db, result_cache.fingerprint(1, VECTOR_STRATEGY_CODE + "\n# edited", **INPUTS)) is None
+    db.close()
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app import tasks
+from app.crud import crud_backtest
+from app.crud.crud_strategy import MA_CROSSOVER_TEMPLATE
+from app.models.backtest import BacktestResult, BacktestSeries
+from app.models.strategy import Strategy
+from app.schemas.backtest import BacktestResultCreate, KlineDuration
+from app.services import series_codec
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+from app.services.execution import equity_records, execute_signals, trade_records
+from app.services.kline_store import TRADE_DATE_FORMAT, format_timestamps
+
+
+def test_format_timestamps_matches_strftime():
+    timestamps = np.array([0, 1704160800 * 10**9, 1719590399 * 10**9, 4102444799 * 10**9], dtype=np.int64)
+    expected = pd.to_datetime(timestamps, unit='ns').strftime(TRADE_DATE_FORMAT).tolist()
+
+    assert format_timestamps(timestamps).tolist() == expected
+    assert format_timestamps(np.empty(0, dtype=np.int64)).tolist() == []
+
+
+def test_round_trip_is_bit_exact_and_matches_json_records():
+    rng = np.random.default_rng(0)
+    close = 3500 + np.cumsum(rng.normal(size=2000))
+    signals = rng.choice([-1, 0, 1], size=2000, p=[0.02, 0.96, 0.02]).astype(np.int8)
+    execution = execute_signals(close, signals, 100000.0, 0.0001, 1.0)
+    timestamps = 1704160800 * 10**9 + np.arange(2000, dtype=np.int64) * 900 * 10**9
+
+    columns = series_codec.decode(series_codec.encode(timestamps, execution))
+    np.testing.assert_array_equal(columns["datetime"], timestamps)
+    assert columns["equity"].tobytes() == execution.equity.tobytes()
+    for name in ("trade_index", "trade_side", "trade_price", "trade_shares"):
+        np.testing.assert_array_equal(columns[name], getattr(execution, name))
+
+    dates = format_timestamps(timestamps)
+    assert series_codec.to_records(series_codec.encode(timestamps, execution)) == {
+        "pnl": equity_records(dates, execution), "trades": trade_records(dates, execution)}
+
+    empty = execute_signals(close[:0], signals[:0], 100000.0, 0.0001, 1.0)
+    assert series_codec.to_records(series_codec.encode(timestamps[:0], empty)) == {"pnl": [], "trades": []}
+
+
+def test_binary_series_is_over_ten_times_smaller_than_json():
+    data = DataService(provider=SyntheticProvider(seed=0)).get_kline_data(
+        "SHFE.rb2410", KlineDuration.fifteen_minutes, "20240102", "20240628")
+    backtester = tasks.SimpleBacktester(
+        backtest_id=0, symbol="SHFE.rb2410", duration=KlineDuration.fifteen_minutes, start_date="20240102",
+        end_date="20240628", strategy_code=MA_CROSSOVER_TEMPLATE, commission_rate=0.0001, slippage=1.0)
+    backtester.run(data)
+
+    payload = series_codec.encode(backtester.timestamps, backtester.execution)
+    assert len(json.dumps(backtester.to_records())) > 10 * len(payload)
+
+
+def test_backtest_stores_series_in_side_table_and_decodes_on_read(session_factory, tmp_path, monkeypatch):
+    script = tmp_path / "strategy.py"
+    script.write_text(MA_CROSSOVER_TEMPLATE, encoding='utf-8')
+    db = session_factory()
+    db.add(Strategy(id=1, name="ma", script_path=str(script), owner="tester"))
+    db.commit()
+    inputs = dict(strategy_id=1, symbol="SHFE.rb2410", duration=KlineDuration.one_hour, start_dt=datetime(2024, 1, 2),
+                  end_dt=datetime(2024, 3, 29), commission_rate=0.0001, slippage=1.0)
+    binary, legacy = (crud_backtest.create_backtest_result(db, obj_in=BacktestResultCreate(**inputs)).id for _ in range(2))
+
+    tasks.run_backtest_task(binary)
+    monkeypatch.setattr(tasks, "SERIES_STORAGE", "json")
+    tasks.run_backtest_task(legacy)
+    db.expire_all()
+
+    binary_row, legacy_row = db.get(BacktestResult, binary), db.get(BacktestResult, legacy)
+    assert binary_row.status == "SUCCESS" and binary_row.daily_pnl is None
+    assert db.get(BacktestSeries, binary) is not None and db.get(BacktestSeries, legacy) is None
+    # 旧的 JSON 结果原样返回，压缩存储的结果解码为相同的结构
+    assert crud_backtest.get_daily_pnl(legacy_row) == legacy_row.daily_pnl
+    assert crud_backtest.get_daily_pnl(binary_row) == legacy_row.daily_pnl
+    assert crud_backtest.get_daily_pnl(binary_row)["trades"]
+    db.close()
@@ -0,0 +1,167 @@
+import json
+import multiprocessing
+import os
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.schemas.backtest import KlineDuration
+from app.services import kline_codec
+from app.services.data_service import DataService
+from app.services.kline_cache import KlineCache
+from app.services.kline_store import slice_by_dates
+from app.services.shared_klines import SharedKlineManager, segment_name
+
+SERIES = ("rb", "1m")
+JANUARY = ("20240101", "20240131")
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def minute_klines(start_date: str = "20240101", end_date: str = "20240131") -> pd.DataFrame:
+    # 每天 100 根 1m K线（北京时间 09:00 起）
+    days = pd.date_range(start_date, end_date, freq='D').as_unit('ns').asi8 - 8 * 3600 * 10**9
+    timestamps = (days[:, None] + 9 * 3600 * 10**9 + np.arange(100) * 60 * 10**9).ravel()
+    closes = np.arange(len(timestamps), dtype=np.float64)
+    return pd.DataFrame({
+        'datetime': timestamps, 'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': 1.0,
+    })
+
+
+def segment_exists(name: str) -> bool:
+    try:
+        SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = SharedKlineManager(tmp_path, MAX_BYTES)
+    yield manager
+    manager.clear()
+
+
+def _attach_and_sum(state_dir, queue):
+    manager = SharedKlineManager(state_dir, MAX_BYTES)
+    frame = manager.get(*SERIES, *JANUARY, lambda *dates: pytest.fail("segment should already exist"))
+    queue.put(float(frame['close'].sum()))
+    manager.release_all()
+
+
+def test_second_process_attaches_without_loading(manager, tmp_path):
+    frame = manager.get(*SERIES, *JANUARY, minute_klines)
+
+    queue = multiprocessing.get_context("fork").Queue()
+    child = multiprocessing.get_context("fork").Process(target=_attach_and_sum, args=(tmp_path, queue))
+    child.start()
+    child.join(10)
+
+    assert queue.get(timeout=1) == frame['close'].sum()
+    # 进程关闭映射后内存段仍保留在节点上，clear 后才 unlink
+    manager.release_all()
+    assert segment_exists(segment_name(SERIES + JANUARY))
+    manager.clear()
+    assert not segment_exists(segment_name(SERIES + JANUARY))
+
+
+def attached_pids(state_dir, name):
+    return json.loads((state_dir / "index.json").read_text())[name]["attached"]
+
+
+def _attach_and_report(state_dir, queue, release):
+    manager = SharedKlineManager(state_dir, MAX_BYTES, idle_seconds=0)
+    manager.get(*SERIES, *JANUARY, lambda *dates: pytest.fail("segment should already exist"))
+    queue.put(attached_pids(state_dir, segment_name(SERIES + JANUARY)))
+    queue.close()
+    queue.join_thread()
+    if release:
+        manager.release_all()
+    # 跳过 atexit，模拟没有 release_all 就退出的进程
+    os._exit(0)
+
+
+def test_segments_are_reference_counted_and_unlinked_after_the_last_detach(tmp_path):
+    manager = SharedKlineManager(tmp_path, MAX_BYTES, idle_seconds=0)
+    name = segment_name(SERIES + JANUARY)
+    manager.get(*SERIES, *JANUARY, minute_klines)
+    assert attached_pids(tmp_path, name) == [os.getpid()]
+
+    context = multiprocessing.get_context("fork")
+    for release in (True, False):
+        queue = context.Queue()
+        child = context.Process(target=_attach_and_report, args=(tmp_path, queue, release))
+        child.start()
+        assert queue.get(timeout=10) == [os.getpid(), child.pid]
+        child.join(10)
+        # 正常退出的进程自行移除，异常退出的进程在下次读取索引时剔除；本进程仍在使用，段保留
+        assert manager._load_index()[name]["attached"] == [os.getpid()]
+        assert segment_exists(name)
+
+    # 最后一个进程断开后，空闲超过 idle_seconds 的段随即 unlink
+    manager.release_all()
+    assert not segment_exists(name)
+    assert json.loads((tmp_path / "index.json").read_text()) == {}
+
+
+def test_ranges_are_sliced_from_one_segment_per_series(manager):
+    loads = []
+
+    def loader(start_date, end_date):
+        loads.append((start_date, end_date))
+        return minute_klines(start_date, end_date)
+
+    january = manager.get(*SERIES, *JANUARY, loader)
+    week = manager.get(*SERIES, "20240108", "20240114", loader)
+    assert loads == [JANUARY]
+    assert len(week) == 700 and np.shares_memory(week['close'].to_numpy(), january['close'].to_numpy())
+    with pytest.raises(ValueError):
+        week['close'].to_numpy()[0] = 1.0
+
+    # 超出已加载的区间时按并集重新加载，旧段被替换
+    overlap = manager.get(*SERIES, "20240115", "20240210", loader)
+    assert loads == [JANUARY, ("20240101", "20240210")]
+    assert len(overlap) == 27 * 100
+    assert not segment_exists(segment_name(SERIES + JANUARY))
+    assert manager.stats()["segments"] == 1
+    manager.get(*SERIES, *JANUARY, loader)
+    assert len(loads) == 2
+
+
+def test_least_recently_used_segments_are_evicted_over_budget(tmp_path):
+    size = len(kline_codec.encode(minute_klines()))
+    manager = SharedKlineManager(tmp_path, int(size * 2.5))
+    for symbol in ("rb", "hc", "rb", "i"):
+        manager.get(symbol, "1m", *JANUARY, minute_klines)
+
+    # hc 最久未使用，被淘汰；本进程已关闭它的映射
+    assert not segment_exists(segment_name(("hc", "1m") + JANUARY))
+    assert segment_exists(segment_name(("rb", "1m") + JANUARY))
+    assert manager.stats()["segments"] == 2
+
+    # 单个合约超出预算时不放进共享内存
+    small = SharedKlineManager(tmp_path, size // 2)
+    assert len(small.get("j", "1m", *JANUARY, minute_klines)) == 3100
+    assert small.stats()["segments"] == 0
+    manager.clear()
+
+
+def test_data_service_caches_slices_of_shared_memory(manager):
+    loads = []
+    service = DataService(fetcher=lambda *args: loads.append(args) or minute_klines(*args[2:]),
+                          cache=KlineCache(MAX_BYTES), shared=manager)
+
+    klines = service.get_kline_data("rb", KlineDuration.one_minute, *JANUARY)
+    shared = manager.get(*SERIES, *JANUARY, minute_klines)
+    assert np.shares_memory(klines['close'].to_numpy(), shared['close'].to_numpy())
+    assert np.shares_memory(klines['datetime'].to_numpy(), shared['datetime'].to_numpy())
+
+    # 后续请求先命中进程内缓存（包括子区间切片），不再访问共享内存索引
+    service.get_kline_data("rb", KlineDuration.one_minute, *JANUARY)
+    week = service.get_kline_data("rb", KlineDuration.one_minute, "20240108", "20240114")
+    assert len(week) == 700 and len(loads) == 1
+    assert service.cache.stats()["hits"] == 2
+    expected = slice_by_dates(minute_klines(), "20240108", "20240114")
+    assert week['close'].tolist() == expected['close'].tolist()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.crud import crud_strategy
+from app.db.base import Base
+from app.models.backtest import BacktestResult  # noqa: F401  注册 backtest_results 表（关系目标）
+from app.models.strategy import Strategy
+from app.schemas.strategy import StrategyUpdate
+from app.services.kline_store import format_timestamps, parse_timestamps
+from app.services.strategy_base import StrategyCache, compile_strategy, strategy_cache, uses_trade_date, with_trade_date
+
+STRATEGY_CODE = """
+import pandas as pd
+
+class Strategy(BaseStrategy):
+    def set_parameters(self):
+        self.window = 5
+
+    def initialize(self):
+        pass
+
+    def handle_data(self, data):
+        return []
+"""
+
+
+def test_timestamps_round_trip_through_trade_date_strings():
+    timestamps = np.array([pd.Timestamp("2024-01-02 01:00").value, pd.Timestamp("2024-01-02 13:05").value])
+
+    formatted = format_timestamps(timestamps)
+
+    assert formatted.tolist() == ["20240102 01:00:00", "20240102 13:05:00"]
+    assert parse_timestamps(formatted).tolist() == timestamps.tolist()
+    assert parse_timestamps(["20240102"]).tolist() == [pd.Timestamp("2024-01-02").value]
+
+
+def test_trade_date_shim_only_for_legacy_strategies():
+    data = pd.DataFrame({'datetime': [pd.Timestamp("2024-01-02 01:00").value], 'close': [1.0]})
+
+    shimmed = with_trade_date(data)
+
+    assert shimmed.columns.tolist() == ['trade_date', 'datetime', 'close']
+    assert shimmed['trade_date'].iloc[0] == "20240102 01:00:00"
+    assert 'trade_date' not in data
+    assert uses_trade_date("data['trade_date'].iloc[-1]")
+    assert not uses_trade_date("data['datetime'].iloc[-1]")
+
+
+def test_compile_cache_reuses_the_module_and_instantiates_per_parameter_set():
+    strategy_cache.clear()
+    first, second = compile_strategy(STRATEGY_CODE), compile_strategy(STRATEGY_CODE)
+
+    assert first is second
+    assert first(context=None, window=8).window == 8 and second(context=None).window == 5
+    assert compile_strategy(STRATEGY_CODE.replace("= 5", "= 6")) is not first
+    assert strategy_cache.stats()["entries"] == 2
+
+
+def test_compile_cache_evicts_least_recently_used():
+    cache = StrategyCache(max_entries=2)
+    codes = [STRATEGY_CODE.replace("= 5", f"= {i}") for i in range(3)]
+    modules = [cache.get(code) for code in codes[:2]]
+    cache.get(codes[0])  # codes[0] 变为最近使用
+    cache.get(codes[2])
+
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 3, "evictions": 1}
+    assert cache.get(codes[0]) is modules[0]
+    assert cache.get(codes[1]) is not modules[1]
+
+
+def test_update_strategy_invalidates_the_old_source(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    script = tmp_path / "strategy.py"
+    script.write_text(STRATEGY_CODE, encoding="utf-8")
+    db.add(Strategy(id=1, name="s", script_path=str(script), owner="tester"))
+    db.commit()
+
+    compile_strategy(STRATEGY_CODE)
+    entries = strategy_cache.stats()["entries"]
+    crud_strategy.update_strategy(db, 1, StrategyUpdate(script_content=STRATEGY_CODE.replace("= 5", "= 7")))
+
+    assert strategy_cache.stats()["entries"] == entries - 1
+    assert compile_strategy(script.read_text(encoding="utf-8"))(context=None).window == 7
+    db.close()
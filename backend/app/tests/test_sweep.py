@@ -0,0 +1,88 @@
+from datetime import datetime
+
+from app import tasks
+from app.crud import crud_backtest
+from app.models.backtest import BacktestResult
+from app.models.strategy import Strategy
+from app.schemas.backtest import KlineDuration
+from app.services import series_codec, sweep
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+from app.services.kline_store import format_timestamps
+from app.services.strategy_base import compile_strategy
+from app.tests.test_backtester import VECTOR_STRATEGY_CODE
+
+BACKTEST_PARAMS = {
+    "backtest_id": 0, "symbol": "SHFE.rb2410", "duration": KlineDuration.fifteen_minutes,
+    "start_date": "20240102", "end_date": "20240329", "strategy_code": VECTOR_STRATEGY_CODE,
+    "commission_rate": 0.0001, "slippage": 1.0,
+}
+
+
+def test_expand_grid_matches_the_exhaustive_product():
+    grid = sweep.expand_grid([
+        {"name": "short_window", "start": 5, "end": 10, "step": 5},
+        {"name": "long_window", "start": 20, "end": 40, "step": 10},
+    ])
+    assert sweep.expand_grid([{"name": "k", "start": 0.5, "end": 1.0, "step": 0.25}]) == [
+        {"k": 0.5}, {"k": 0.75}, {"k": 1}]
+    assert grid == [
+        {"short_window": 5, "long_window": 20}, {"short_window": 5, "long_window": 30},
+        {"short_window": 5, "long_window": 40}, {"short_window": 10, "long_window": 20},
+        {"short_window": 10, "long_window": 30}, {"short_window": 10, "long_window": 40},
+    ]
+
+
+def test_parallel_sweep_matches_sequential_backtests():
+    data = DataService(provider=SyntheticProvider(seed=7)).get_kline_data(
+        "SHFE.rb2410", KlineDuration.fifteen_minutes, "20240102", "20240329")
+    evaluator = tasks._sweep_evaluator(BACKTEST_PARAMS, compile_strategy(VECTOR_STRATEGY_CODE), data,
+                                       format_timestamps(data['datetime']))
+    param_sets = [{"short_window": s, "long_window": l} for s in (3, 5, 8) for l in (20, 30)]
+
+    parallel = sweep.run_sweep(evaluator, param_sets, processes=2)
+
+    assert len({result["summary"]["final_equity"] for result in parallel}) == len(param_sets)
+    for params, result in zip(param_sets, parallel):
+        backtester = tasks.SimpleBacktester(params_override=params, **BACKTEST_PARAMS)
+        expected = backtester.run(data)
+        assert result["status"] == "SUCCESS"
+        assert result["summary"] == {"params": params, **expected["summary"]}
+        assert series_codec.to_records(result["series"]) == backtester.to_records()
+
+
+
+def test_sweep_mode_writes_every_combination(session_factory, tmp_path):
+    script = tmp_path / "strategy.py"
+    failing_initialize = "    def initialize(self):\n        if self.short_window == 5:\n            raise ValueError('bad window')"
+    script.write_text(VECTOR_STRATEGY_CODE.replace("    def initialize(self):\n        pass", failing_initialize),
+                      encoding='utf-8')
+    db = session_factory()
+    db.add(Strategy(id=1, name="ma", script_path=str(script), owner="tester"))
+    db.commit()
+
+    tasks.run_optimization_task(
+        strategy_id=1,
+        backtest_params={
+            "symbol": "SHFE.rb2410", "duration": "15m",
+            "start_dt_iso": datetime(2024, 1, 2).isoformat(), "end_dt_iso": datetime(2024, 3, 29).isoformat(),
+            "commission_rate": 0.0001, "slippage": 1.0,
+        },
+        optimization_params=[
+            {"name": "short_window", "start": 3, "end": 5, "step": 2},
+            {"name": "long_window", "start": 20, "end": 30, "step": 10},
+        ],
+        optimization_id="opt-1",
+        mode="sweep",
+    )
+
+    rows = db.query(BacktestResult).filter(BacktestResult.optimization_id == "opt-1").order_by(BacktestResult.id).all()
+    assert [row.summary["params"] for row in rows] == [
+        {"short_window": 3, "long_window": 20}, {"short_window": 3, "long_window": 30},
+        {"short_window": 5, "long_window": 20}, {"short_window": 5, "long_window": 30},
+    ]
+    # 出错的组合记为失败，不影响其它组合
+    assert [row.status for row in rows] == ["SUCCESS", "SUCCESS", "FAILURE", "FAILURE"]
+    assert "bad window" in rows[2].summary["error"]
+    assert crud_backtest.get_daily_pnl(rows[0])["pnl"]
+    db.close()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from app.services.data_providers import SyntheticProvider
+from app.services.resampler import resample_klines
+from app.services.synthetic_klines import generate_klines
+from app.services.trading_calendar import session_bar_times, shanghai_date_bounds_ns
+
+
+def test_bars_follow_the_trading_sessions():
+    klines = generate_klines("SHFE.rb2410", "1m", "20240102", "20240131")
+
+    lo, hi = shanghai_date_bounds_ns("20240102", "20240131")
+    expected = session_bar_times("SHFE.rb2410", 60, "20240102", "20240201")
+    np.testing.assert_array_equal(klines['datetime'], expected[(expected >= lo) & (expected < hi)])
+    assert klines.dtypes['datetime'] == np.int64
+    assert (klines['high'] >= klines[['open', 'close']].max(axis=1)).all()
+    assert (klines['low'] <= klines[['open', 'close']].min(axis=1)).all()
+    assert (klines['open'].iloc[1:].to_numpy() == klines['close'].iloc[:-1].to_numpy()).all()
+
+
+def test_values_do_not_depend_on_the_requested_range():
+    whole = generate_klines("SHFE.rb2410", "5m", "20240102", "20240131", seed=3)
+    part = generate_klines("SHFE.rb2410", "5m", "20240110", "20240112", seed=3)
+
+    merged = whole.merge(part, on='datetime', suffixes=('', '_part'))
+    assert len(merged) == len(part)
+    for column in ['open', 'high', 'low', 'close', 'volume']:
+        assert (merged[column] == merged[f'{column}_part']).all()
+    assert not generate_klines("SHFE.rb2410", "5m", "20240110", "20240112", seed=4)['close'].equals(part['close'])
+
+
+def test_intraday_bars_close_on_the_daily_close():
+    minute = generate_klines("DCE.m2501", "1m", "20240102", "20240329")
+    daily = generate_klines("DCE.m2501", "1d", "20240103", "20240329")
+
+    resampled = resample_klines(minute, "1d")
+    closes = pd.Series(resampled['close'].to_numpy(), index=resampled['datetime'])
+    np.testing.assert_allclose(closes.loc[daily['datetime']].to_numpy(), daily['close'].to_numpy())
+
+
+def test_provider_batch_matches_single_fetches():
+    provider = SyntheticProvider(seed=1)
+    requests = [("SHFE.au2412", "1h", "20240102", "20240105"), ("CFFEX.IF2401", "15m", "20240102", "20240105")]
+
+    for frame, request in zip(provider.fetch_batch(requests), requests):
+        pd.testing.assert_frame_equal(frame, provider.fetch(*request))
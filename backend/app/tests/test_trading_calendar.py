@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.services import data_fetcher, trading_calendar
+from app.services.trading_calendar import (
+    bar_count, has_night_session, product_code, session_bar_times,
+)
+
+HOUR = 3600
+MINUTE = 60
+
+
+def test_no_night_session_after_holidays():
+    days = np.array(['2024-10-08', '2024-10-14', '2024-04-08', '2024-01-09'], dtype='datetime64[D]')
+    assert has_night_session(days).tolist() == [False, True, False, True]
+
+
+def test_product_code_handles_main_contracts():
+    assert product_code("SHFE.rb2410") == "rb"
+    assert product_code("KQ.m@SHFE.au") == "au"
+    assert product_code("CZCE.SR501") == "SR"
+
+
+def test_minute_bars_per_trading_day_follow_sessions():
+    assert len(session_bar_times("SHFE.rb2410", MINUTE, "20240105", "20240105")) == 225 + 120
+    assert len(session_bar_times("SHFE.au2412", MINUTE, "20240105", "20240105")) == 225 + 330
+    assert len(session_bar_times("CFFEX.IF2401", MINUTE, "20240105", "20240105")) == 240
+    # 节后第一天没有夜盘
+    assert len(session_bar_times("SHFE.rb2410", MINUTE, "20241008", "20241008")) == 225
+
+
+def test_monday_night_session_starts_on_friday_evening():
+    times = session_bar_times("SHFE.rb2410", HOUR, "20240108", "20240108")
+    local = pd.to_datetime(times + 8 * 3600 * 10**9, unit='ns').strftime('%m-%d %H:%M').tolist()
+    assert local == ["01-05 21:00", "01-05 22:00", "01-08 09:00", "01-08 10:00", "01-08 11:00",
+                     "01-08 13:00", "01-08 14:00"]
+
+
+def test_bar_count_is_exact_up_to_now():
+    after_close = datetime(2024, 1, 8, 7, 0)  # 北京时间 15:00
+    night_open = datetime(2024, 1, 8, 13, 30)  # 北京时间 21:30，已进入 1月9日的夜盘
+    assert bar_count("SHFE.rb2410", HOUR, "20240108", now=after_close) == 5
+    assert bar_count("SHFE.rb2410", HOUR, "20240108", now=night_open) == 6
+    assert bar_count("SHFE.rb2410", 24 * HOUR, "20240105", now=night_open) == 3
+
+
+class FakeApi:
+    def __init__(self, frame):
+        self.frame = frame
+        self.requests = []
+
+    def get_kline_serial(self, symbol, duration_seconds, data_length):
+        self.requests.append(data_length)
+        return self.frame
+
+
+def test_fetch_klines_requests_exact_length_and_slices(monkeypatch):
+    times = session_bar_times("SHFE.rb2410", HOUR, "20240104", "20240109")
+    frame = pd.DataFrame({'datetime': times.astype(float), 'close': np.arange(len(times), dtype=float)})
+    frame = pd.concat([pd.DataFrame({'datetime': [np.nan], 'close': [np.nan]}), frame], ignore_index=True)
+    monkeypatch.setattr(data_fetcher.trading_calendar, "bar_count", lambda *args: 42)
+    api = FakeApi(frame)
+
+    result = data_fetcher.fetch_klines(api, "SHFE.rb2410", "1h", "20240105", "20240108")
+
+    assert api.requests == [42]
+    local = pd.to_datetime(result['datetime'] + 8 * 3600 * 10**9, unit='ns')
+    assert local.iloc[0] == pd.Timestamp("2024-01-05 09:00")
+    assert local.iloc[-1] == pd.Timestamp("2024-01-08 22:00")  # 按自然日截取，含当晚夜盘
+    assert result['datetime'].dtype == np.int64
+
+
+class FakeBatchApi(FakeApi):
+    """模拟 TqApi：create_task 的协程在下一次 wait_update 时运行，订阅的序列在再下一次 wait_update 后就绪。"""
+
+    def __init__(self, frame):
+        super().__init__(frame)
+        self.tasks = []
+        self.pending = []
+        self.ready = set()
+        self.updates = 0
+
+    def create_task(self, coroutine):
+        self.tasks.append(coroutine)
+
+    def get_kline_serial(self, symbol, duration_seconds, data_length):
+        self.requests.append((symbol, data_length))
+        serial = self.frame.copy()
+        self.pending.append(serial)
+        return serial
+
+    def is_serial_ready(self, serial):
+        return id(serial) in self.ready
+
+    def wait_update(self, deadline=None):
+        self.updates += 1
+        self.ready.update(id(serial) for serial in self.pending)
+        for task in self.tasks:
+            try:
+                task.send(None)
+            except StopIteration:
+                pass
+        self.tasks = []
+        return True
+
+
+def test_fetch_batch_subscribes_each_serial_once(monkeypatch):
+    times = session_bar_times("SHFE.rb2410", HOUR, "20240104", "20240109")
+    frame = pd.DataFrame({'datetime': times.astype(float), 'close': np.arange(len(times), dtype=float)})
+    monkeypatch.setattr(data_fetcher.trading_calendar, "bar_count", lambda symbol, seconds, start: 20 - int(start[-2:]))
+    api = FakeBatchApi(frame)
+
+    frames = data_fetcher.fetch_batch(api, [
+        ("SHFE.rb2410", "1h", "20240105", "20240105"),
+        ("SHFE.rb2410", "1h", "20240108", "20240108"),
+        ("SHFE.hc2410", "1h", "20240108", "20240109"),
+    ])
+
+    # 同一合约周期只订阅一次，长度取最早起始日所需的根数
+    assert api.requests == [("SHFE.rb2410", 15), ("SHFE.hc2410", 12)]
+    assert api.updates == 2
+    assert [len(f) for f in frames] == [7, 7, 12]
+
+
+
+def test_dates_past_the_holiday_table_warn_once(monkeypatch, capsys):
+    monkeypatch.setattr(trading_calendar, "_warned_past_end", False)
+    last_year = int(str(trading_calendar.CALENDAR_END)[:4])
+
+    session_bar_times("SHFE.rb2410", 24 * HOUR, f"{last_year}1201", f"{last_year}1231")
+    assert capsys.readouterr().out == ""
+
+    session_bar_times("SHFE.rb2410", 24 * HOUR, f"{last_year}1201", f"{last_year + 1}0131")
+    trading_calendar.roll_to_trading_day(np.array([f"{last_year + 1}-02-01"], dtype='datetime64[D]'))
+    out = capsys.readouterr().out
+    assert out.count("WARNING") == 1 and f"{last_year + 1}" in out
@@ -0,0 +1,121 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app import tasks
+from app.crud import crud_backtest
+from app.models.backtest import BacktestResult
+from app.models.strategy import Strategy
+from app.services import walk_forward
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+from app.services.execution import execute_signals
+from app.tests.test_backtester import VECTOR_STRATEGY_CODE
+
+
+def test_folds_roll_by_the_out_of_sample_length():
+    folds = walk_forward.make_folds(date(2024, 1, 1), date(2024, 4, 20), in_sample_days=60, out_of_sample_days=30)
+
+    assert [fold.describe() for fold in folds] == [
+        {"fold": 0, "in_sample_start": "20240101", "in_sample_end": "20240229",
+         "out_of_sample_start": "20240301", "out_of_sample_end": "20240330"},
+        {"fold": 1, "in_sample_start": "20240131", "in_sample_end": "20240330",
+         "out_of_sample_start": "20240331", "out_of_sample_end": "20240420"},
+    ]
+    with pytest.raises(ValueError):
+        walk_forward.make_folds(date(2024, 1, 1), date(2024, 2, 1), in_sample_days=60, out_of_sample_days=30)
+
+
+def test_stitch_equals_reinvesting_each_fold_in_the_next():
+    rng = np.random.default_rng(0)
+    closes = [100 + np.cumsum(rng.normal(size=50)) for _ in range(3)]
+    signals = [rng.choice([-1, 0, 1], size=50, p=[0.1, 0.8, 0.1]).astype(np.int8) for _ in range(3)]
+
+    executions = [execute_signals(c, s, 100000.0, 0.0003, 0.5) for c, s in zip(closes, signals)]
+    equity, scales, final_equity = walk_forward.stitch(executions, 100000.0)
+
+    cash, expected = 100000.0, []
+    for c, s in zip(closes, signals):
+        execution = execute_signals(c, s, cash, 0.0003, 0.5)
+        expected.append(execution.equity)
+        cash = execution.final_equity
+    np.testing.assert_allclose(equity, np.concatenate(expected))
+    assert final_equity == pytest.approx(cash)
+    assert scales[0] == 1.0
+
+
+def test_trade_start_uses_earlier_bars_only_for_warm_up():
+    data = DataService(provider=SyntheticProvider(seed=3)).get_kline_data(
+        "SHFE.rb2410", tasks.KlineDuration.one_hour, "20240102", "20240329")
+    params = {
+        "backtest_id": 0, "symbol": "SHFE.rb2410", "duration": tasks.KlineDuration.one_hour,
+        "start_date": "20240102", "end_date": "20240329", "strategy_code": VECTOR_STRATEGY_CODE,
+        "commission_rate": 0.0001, "slippage": 1.0, "params_override": {"short_window": 3, "long_window": 20},
+    }
+    backtester = tasks.SimpleBacktester(**params)
+    backtester.run(data, trade_start=100)
+
+    # 信号在完整K线上计算（指标已预热），撮合从第 100 根K线空仓开始
+    signals = backtester._execute_strategy_code(data.copy())
+    expected = execute_signals(data['close'].to_numpy()[100:], signals[100:], 100000.0, 0.0001, 1.0)
+    assert len(backtester.execution.equity) == len(data) - 100
+    np.testing.assert_array_equal(backtester.execution.equity, expected.equity)
+    assert backtester.timestamps[0] == data['datetime'].iloc[100]
+
+
+class CountingProvider(SyntheticProvider):
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.calls = 0
+
+    def fetch(self, symbol, duration, start_date, end_date):
+        self.calls += 1
+        return super().fetch(symbol, duration, start_date, end_date)
+
+
+def test_walk_forward_mode_loads_once_and_stitches_out_of_sample_rows(session_factory, tmp_path, monkeypatch):
+    provider = CountingProvider(seed=11)
+    monkeypatch.setattr(tasks, "data_service", DataService(provider=provider))
+    script = tmp_path / "strategy.py"
+    script.write_text(VECTOR_STRATEGY_CODE, encoding='utf-8')
+    db = session_factory()
+    db.add(Strategy(id=1, name="ma", script_path=str(script), owner="tester"))
+    db.commit()
+
+    tasks.run_optimization_task(
+        strategy_id=1,
+        backtest_params={
+            "symbol": "SHFE.rb2410", "duration": "1h",
+            "start_dt_iso": datetime(2024, 1, 1).isoformat(), "end_dt_iso": datetime(2024, 5, 31).isoformat(),
+            "commission_rate": 0.0001, "slippage": 1.0,
+        },
+        optimization_params=[
+            {"name": "short_window", "start": 2, "end": 6, "step": 2},
+            {"name": "long_window", "start": 10, "end": 30, "step": 10},
+        ],
+        optimization_id="opt-wf",
+        mode="walk_forward",
+        walk_forward_params={"in_sample_days": 60, "out_of_sample_days": 30},
+    )
+
+    assert provider.calls == 1
+    rows = db.query(BacktestResult).filter(BacktestResult.optimization_id == "opt-wf").order_by(BacktestResult.id).all()
+    *fold_rows, combined = rows
+    assert len(fold_rows) == 4
+    assert [row.status for row in rows] == ["SUCCESS"] * 5
+    assert [row.start_dt.date() for row in fold_rows] == [date(2024, 3, 1), date(2024, 3, 31),
+                                                          date(2024, 4, 30), date(2024, 5, 30)]
+    assert combined.start_dt.date() == date(2024, 3, 1) and combined.end_dt.date() == date(2024, 5, 31)
+
+    folds = combined.summary["walk_forward"]["folds"]
+    assert [fold["params"] for fold in folds] == [row.summary["params"] for row in fold_rows]
+    assert combined.summary["params"] == fold_rows[-1].summary["params"]
+
+    # 拼接的权益曲线由各折样本外曲线首尾相接，期末权益等于各折收益率连乘
+    combined_pnl, fold_pnls = crud_backtest.get_daily_pnl(combined), [crud_backtest.get_daily_pnl(row) for row in fold_rows]
+    assert [p["date"] for p in combined_pnl["pnl"]] == [p["date"] for fold_pnl in fold_pnls for p in fold_pnl["pnl"]]
+    assert len(combined_pnl["trades"]) == sum(len(fold_pnl["trades"]) for fold_pnl in fold_pnls)
+    growth = np.prod([row.summary["final_equity"] / row.summary["initial_equity"] for row in fold_rows])
+    assert combined.summary["final_equity"] == pytest.approx(100000.0 * growth)
+    db.close()
@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_optimizers.py
+"""
+在合成K线上比较各参数优化方法：评估次数、耗时和找到的最高夏普比率（以网格搜索的最优值为参照）。
+
+用法（在 backend 目录下）: DATABASE_URL=sqlite:// python -m benchmarks.bench_optimizers --budget 60 --duration 15m
+"""
+import argparse
+import math
+import time
+
+from app import tasks
+from app.crud.crud_strategy import MA_CROSSOVER_TEMPLATE
+from app.schemas.backtest import KlineDuration, OptimizationMethod
+from app.services import optimizers, sweep
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+from app.services.kline_store import format_timestamps
+from app.services.strategy_base import compile_strategy
+
+OPTIMIZATION_PARAMS = [
+    {"name": "short_window", "start": 2, "end": 30, "step": 1},
+    {"name": "long_window", "start": 20, "end": 200, "step": 5},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimizer comparison on synthetic klines")
+    parser.add_argument("--symbol", default="SHFE.rb2410")
+    parser.add_argument("--duration", default="15m", choices=[d.value for d in KlineDuration])
+    parser.add_argument("--start", default="20220104")
+    parser.add_argument("--end", default="20231229")
+    parser.add_argument("--budget", type=int, default=60)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=0)
+    args = parser.parse_args()
+
+    duration = KlineDuration(args.duration)
+    data = DataService(provider=SyntheticProvider(0)).get_kline_data(args.symbol, duration, args.start, args.end)
+    dates = format_timestamps(data['datetime'])
+    backtester_params = {
+        "backtest_id": 0, "symbol": args.symbol, "duration": duration, "start_date": args.start,
+        "end_date": args.end, "strategy_code": MA_CROSSOVER_TEMPLATE, "commission_rate": 0.0001, "slippage": 1.0,
+    }
+    strategy_class = compile_strategy(MA_CROSSOVER_TEMPLATE)
+    space = sweep.param_space(OPTIMIZATION_PARAMS)
+    evaluations = 0
+
+    def evaluate(param_sets, fraction):
+        nonlocal evaluations
+        evaluations += len(param_sets)
+        bars = len(data) if fraction >= 1 else max(1, math.ceil(len(data) * fraction))
+        evaluator = tasks._sweep_evaluator(backtester_params, strategy_class, data.iloc[:bars], dates[:bars])
+        return sweep.run_sweep(evaluator, param_sets, args.processes)
+
+    print(f"{len(data)} {args.duration} bars, {len(sweep.grid_params(space))} combinations, budget {args.budget}")
+    for method in OptimizationMethod:
+        for seed in range(1 if method == OptimizationMethod.grid else args.seeds):
+            evaluations = 0
+            optimizer = optimizers.create_optimizer(method.value, space, args.budget, seed,
+                                                    batch_size=sweep.pool_size(args.processes))
+            started = time.perf_counter()
+            best = max(optimizers.score(result) for result in optimizer.run(evaluate))
+            print(f"{method.value:<8} seed {seed}  {evaluations:5d} evaluations  "
+                  f"{time.perf_counter() - started:7.2f} s  best sharpe {best:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_resample.py
+"""
+对比 resampler.resample_klines 与 pandas.resample 合成K线的耗时。
+
+用法（在 backend 目录下）: python -m benchmarks.bench_resample --days 750
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.resampler import resample_klines, trading_days_ns
+from app.services.trading_calendar import session_bar_times
+
+PANDAS_RULES = {"5m": "5min", "15m": "15min", "1h": "1h"}
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def session_minutes(days: int) -> pd.DataFrame:
+    """按螺纹钢的日盘/夜盘时段和交易日历生成 days 个交易日的 1m K线。"""
+    end_date = (pd.Timestamp("2020-01-02") + pd.Timedelta(days=days * 2)).strftime('%Y%m%d')
+    times = session_bar_times("SHFE.rb", 60, "20200102", end_date)
+    day_keys = trading_days_ns(times)
+    times = times[day_keys < np.unique(day_keys)[days]]
+
+    rng = np.random.default_rng(0)
+    close = 3500 + np.cumsum(rng.normal(0, 1, len(times)))
+    return pd.DataFrame({
+        'datetime': times,
+        'open': close, 'high': close + 1.0, 'low': close - 1.0, 'close': close,
+        'volume': rng.integers(1, 100, len(times)).astype(np.float64),
+    })
+
+
+def pandas_resample(minute: pd.DataFrame, duration: str) -> pd.DataFrame:
+    if duration == "1d":
+        # pandas 没有交易日概念，按同样的交易日键 groupby
+        return minute.groupby(trading_days_ns(minute['datetime'].to_numpy())).agg(AGG)
+    indexed = minute.set_index(pd.to_datetime(minute['datetime'], unit='ns'))
+    return indexed.resample(PANDAS_RULES[duration]).agg(AGG).dropna()
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resampler benchmark")
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    minute = session_minutes(args.days)
+    print(f"{len(minute)} 1m bars over {args.days} trading days")
+    for duration in ["5m", "15m", "1h", "1d"]:
+        ours = best_of(lambda: resample_klines(minute, duration), args.repeat)
+        theirs = best_of(lambda: pandas_resample(minute, duration), args.repeat)
+        rows = len(resample_klines(minute, duration))
+        print(f"{duration:>4}: {rows:>8} bars  resampler {ours * 1000:8.1f} ms  "
+              f"pandas {theirs * 1000:8.1f} ms  x{theirs / ours:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_series.py
+"""
+比较回测权益曲线与成交列表的两种存储格式：daily_pnl JSON 列与 backtest_series 压缩二进制。
+同一结果按两种格式各写入 --rows 行到临时 SQLite 文件，报告存储字节数、读取单个报告（还原为 daily_pnl 结构）
+的耗时，以及列出回测历史（只需要汇总，不需要序列）的耗时。
+
+用法（在 backend 目录下）: DATABASE_URL=sqlite:// python -m benchmarks.bench_series --duration 15m
+"""
+import argparse
+import json
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import tasks
+from app.crud import crud_backtest
+from app.crud.crud_strategy import MA_CROSSOVER_TEMPLATE
+from app.db.base import Base
+from app.models.backtest import BacktestResult
+from app.models.strategy import Strategy  # noqa: F401  注册 strategies 表（外键目标）
+from app.schemas.backtest import BacktestResultCreate, KlineDuration
+from app.services import series_codec
+from app.services.data_providers import SyntheticProvider
+from app.services.data_service import DataService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest series storage comparison")
+    parser.add_argument("--symbol", default="SHFE.rb2410")
+    parser.add_argument("--duration", default="15m", choices=[d.value for d in KlineDuration])
+    parser.add_argument("--start", default="20220104")
+    parser.add_argument("--end", default="20231229")
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    duration = KlineDuration(args.duration)
+    data = DataService(provider=SyntheticProvider(0)).get_kline_data(args.symbol, duration, args.start, args.end)
+    backtester = tasks.SimpleBacktester(
+        backtest_id=0, symbol=args.symbol, duration=duration, start_date=args.start, end_date=args.end,
+        strategy_code=MA_CROSSOVER_TEMPLATE, commission_rate=0.0001, slippage=1.0,
+    )
+    backtester.run(data)
+    records = backtester.to_records()
+    payload = series_codec.encode(backtester.timestamps, backtester.execution)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        # strategy_id 1 的结果使用 JSON 列，2 使用压缩二进制
+        ids = {}
+        for strategy_id, fields in ((1, {"daily_pnl": records}), (2, {"series": payload})):
+            ids[strategy_id] = crud_backtest.create_backtest_results(db, objs_in=[
+                BacktestResultCreate(strategy_id=strategy_id, symbol=args.symbol, duration=duration,
+                                     start_dt=datetime(2024, 1, 1), end_dt=datetime(2024, 1, 2),
+                                     commission_rate=0.0001, slippage=1.0)
+                for _ in range(args.rows)
+            ])
+            crud_backtest.update_backtest_results(db, [
+                {"id": backtest_id, "status": "SUCCESS", "summary": {"sharpe_ratio": 1.0}, **fields}
+                for backtest_id in ids[strategy_id]
+            ])
+        db.close()
+
+        print(f"{len(data)} {args.duration} bars, {len(records['trades'])} trades")
+        print(f"json    {len(json.dumps(records)):10d} bytes")
+        print(f"binary  {len(payload):10d} bytes  ({len(json.dumps(records)) / len(payload):.1f}x smaller)")
+        for name, strategy_id in (("json", 1), ("binary", 2)):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                db = sessionmaker(bind=engine)()
+                loaded = crud_backtest.get_daily_pnl(db.get(BacktestResult, ids[strategy_id][0]))
+                db.close()
+            report = (time.perf_counter() - started) / args.repeat
+            assert loaded == records
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                db = sessionmaker(bind=engine)()
+                crud_backtest.get_backtest_results_by_strategy(db, strategy_id, limit=args.rows)
+                db.close()
+            history = (time.perf_counter() - started) / args.repeat
+            print(f"{name:<7} report {report * 1000:8.2f} ms   history of {args.rows} rows {history * 1000:8.2f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
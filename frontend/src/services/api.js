@@ -44,7 +44,7 @@ export default {
     runBacktest(strategyId, params) { return apiClient.post(`/backtests/run/${strategyId}`, params); },
     runOptimization(strategyId, params) { return apiClient.post(`/backtests/optimize/${strategyId}`, params); },
     getBacktestHistory(strategyId) { return apiClient.get(`/backtests/history/${strategyId}`); },
-    getBacktestReport(backtestId) { return apiClient.get(`/backtests/${backtestId}`); },
+    getBacktestReport(backtestId, params = {}) { return apiClient.get(`/backtests/${backtestId}`, { params }); },
     getOptimizationResults(optimizationId) { return apiClient.get(`/backtests/optimization/${optimizationId}`); },
 
     // --- Login method using apiClient ---
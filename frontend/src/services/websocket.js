@@ -40,6 +40,9 @@ function handleMessage(event) {
     case 'live_update':
       dashboardStore.setLiveUpdate(message.data);
       break;
+    case 'backtest_progress': // 运行中回测的进度（阶段、已处理 bar 数、当前权益、预计剩余时间）及最终状态
+      dashboardStore.setBacktestProgress(message.data);
+      break;
     case 'backtest_result': // 新增：统一处理回测结果
       // 将交易点位存入 orderEvents，方便图表绘制
       if(message.daily_pnl && message.daily_pnl.trades) {
@@ -5,6 +5,7 @@ export const useDashboardStore = defineStore('dashboard', {
     logs: [],
     orderEvents: [],
     backtestResult: null,
+    backtestProgress: null,
     backtestHistory: [],
     liveAccount: { equity: 0, available: 0 },
     livePosition: { symbol: '', volume: 0, average_price: 0 },
@@ -22,6 +23,9 @@ export const useDashboardStore = defineStore('dashboard', {
     setBacktestResult(result) {
       this.backtestResult = result;
     },
+    setBacktestProgress(progress) {
+      this.backtestProgress = progress;
+    },
     setLiveUpdate(data) {
       // 【修正】: 不替换整个对象，而是逐个属性更新
       if (data.account) {